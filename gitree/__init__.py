@@ -3,6 +3,19 @@
 """
 Houses the version of the project. Any changes to the version number
 should also be made in pyproject.toml
+
+The in-process API (scan, Tree) lives in gitree.api and is imported on first
+access, so the CLI's startup does not pay for it.
 """
 
 __version__ = "0.0.0 (dev)"
+
+__all__ = ["scan", "Tree"]
+
+
+def __getattr__(name: str):
+    """ Import the API on first access of gitree.scan or gitree.Tree """
+    if name in __all__:
+        from . import api
+        return getattr(api, name)
+    raise AttributeError(f"module 'gitree' has no attribute '{name}'")
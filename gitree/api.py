@@ -0,0 +1,256 @@
+# gitree/api.py
+
+"""
+Code file for the in-process API of gitree.
+
+Use scan() to get a Tree, which is resolved on first use and rendered to any
+text or binary stream, without argparse, stdout or a subprocess:
+
+    import gitree
+
+    tree = gitree.scan("src", max_depth=3, exclude=["*.pyc"])
+    for entry in tree.files():
+        print(entry.rel, entry.size)
+    tree.render(sys.stdout)
+    tree.export(open("context.md", "w"), format="md")
+    tree.archive("src.zip")
+"""
+
+# Default libs
+import argparse, io
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Iterator
+
+# Deps from this project
+from .objects.app_context import AppContext
+from .objects.config import Config
+from .objects.tree_manifest import ManifestEntry, TreeManifest
+from .services.drawing_service import DrawingService
+from .services.resolve_items_service import ResolveItemsService
+from .utilities.logging_utility import Logger
+
+
+# Options that differ from the CLI defaults: rendered text goes to streams, not terminals
+_API_DEFAULTS = {"no_color": True}
+
+# Options of the CLI that only make sense for a CLI run
+_CLI_ONLY = frozenset({"version", "init_config", "config_user", "no_config", "verbose",
+    "profile", "profile_json", "interactive", "copy", "export", "zip", "no_printing"})
+
+
+def scan(paths: str | Path | Iterable[str | Path] = ".", **options: Any) -> "Tree":
+    """
+    Scan paths with the given options, lazily: nothing is read until the
+    tree is used.
+
+    Args:
+        paths (str | Path | Iterable): The root paths or glob patterns, like the CLI's
+        options: Any option of the CLI or config.json, by its name with
+            underscores (e.g. max_depth=3, exclude=["*.pyc"], no_gitignore=True),
+            except those that only make sense for a CLI run (zip, export,
+            verbose, ...). Sizes are given in bytes.
+
+    Returns:
+        Tree: The lazy tree
+
+    Raises:
+        TypeError: If an option is unknown
+    """
+
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+
+    ctx = AppContext()
+    ctx.logger.set_level(Logger.WARNING)
+
+    config = Config(ctx, argparse.Namespace(paths=[str(p) for p in paths]))
+    for name in options:
+        if name not in config.defaults or name in _CLI_ONLY:
+            raise TypeError(f"scan() got an unexpected option '{name}'")
+    config.cli.update({**_API_DEFAULTS, **options})
+
+    return Tree(ctx, config)
+
+
+class Tree:
+    """
+    A resolved tree, as returned by scan(). It is resolved on first use and
+    iterates over its entries (dirs and files) in tree order.
+
+    The CLI builds one from its parsed config as well, so both share the
+    resolving and rendering code.
+    """
+
+    def __init__(self, ctx: AppContext, config: Config,
+        data: dict[str, Any] | None = None) -> None:
+        """
+        Args:
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            data (dict[str, Any] | None): An already resolved tree dict (e.g.
+                from the interactive selection), None to resolve on first use
+        """
+        self.ctx = ctx
+        self.config = config
+        self._data = data
+
+
+    @property
+    def data(self) -> dict[str, Any]:
+        """
+        The resolved tree dict, resolved on first access ({} if no paths
+        matched, see logs).
+
+        Raises:
+            OSError: If a root path cannot be listed (e.g. it does not exist)
+        """
+        if self._data is None:
+            self._data = ResolveItemsService.resolve_items(self.ctx, self.config)
+        return self._data
+
+
+    @property
+    def root(self) -> Path | None:
+        """ The root dir of the tree, None if no paths matched """
+        return self.data.get("self")
+
+
+    @property
+    def manifest(self) -> TreeManifest | None:
+        """ The flat manifest of the tree, None if no paths matched """
+        return TreeManifest.of(self.data) if self.data else None
+
+
+    @property
+    def logs(self) -> list[str]:
+        """ The warnings and errors logged so far while resolving and rendering """
+        return self.ctx.logger.get_logs()
+
+
+    def files(self) -> list[ManifestEntry]:
+        """ Return the file entries, in tree order """
+        return self.manifest.files() if self.data else []
+
+
+    def __iter__(self) -> Iterator[ManifestEntry]:
+        return iter(self.manifest) if self.data else iter(())
+
+
+    def __len__(self) -> int:
+        return len(self.manifest) if self.data else 0
+
+
+    def render(self, out: IO[str] | IO[bytes] | None = None,
+        format: str | None = None) -> str | None:
+        """
+        Render the structure of the tree, as the CLI prints it.
+
+        Args:
+            out (IO | None): A text or binary (UTF-8) stream, None to return a str
+            format (str | None): "txt", "md" or "json", the scan's format by default
+
+        Returns:
+            str | None: The rendered tree if no stream was given
+        """
+        config = self._with(format)
+        lines = self._draw(config)
+        self.ctx.output_buffer.clear()
+        return self._write(out, lambda stream: stream.writelines(line + "\n" for line in lines))
+
+
+    def export(self, out: IO[str] | IO[bytes] | None = None,
+        format: str | None = None) -> str | None:
+        """
+        Export the structure of the tree followed by the file contents, as
+        --export writes it.
+
+        Args:
+            out (IO | None): A text or binary (UTF-8) stream, None to return a str
+            format (str | None): "txt", "md", "json" or "ndjson", the scan's
+                format by default
+
+        Returns:
+            str | None: The export if no stream was given
+        """
+        from .services.export_service import ExportService
+
+        ndjson = format == "ndjson"
+        config = self._with("json" if ndjson else format)
+        self._draw(config)
+        try:
+            return self._write(out, lambda stream: ExportService.write(self.ctx, config,
+                self.data, stream, ndjson=ndjson))
+        finally:
+            self.ctx.output_buffer.clear()
+
+
+    def archive(self, out: str | Path | IO[bytes], format: str | None = None) -> None:
+        """
+        Archive the files of the tree, as --zip does.
+
+        Args:
+            out (str | Path | IO[bytes]): A file path or a binary stream
+            format (str | None): "zip", "tar", "tar.gz" or "tar.xz", the scan's
+                archive_format by default
+
+        Raises:
+            OSError, ValueError, tarfile.TarError: If the archive cannot be written
+        """
+        from .services.zipping_service import ZippingService
+
+        config = self._with(archive_format=format) if format else self.config
+        if isinstance(out, (str, Path)):
+            with open(out, "wb") as f:
+                ZippingService.write(self.ctx, config, self.data, f)
+        else:
+            ZippingService.write(self.ctx, config, self.data, out)
+
+
+    def _with(self, format: str | None = None, **options: Any) -> Config:
+        """ Return the config with some options overridden """
+        if format:
+            options["format"] = format
+        if not options:
+            return self.config
+
+        return self.config.override(**options)
+
+
+    def _draw(self, config: Config) -> list[str]:
+        """ Draw the structure into the output buffer and return its lines """
+        self.ctx.output_buffer.clear()
+        if self.data:
+            DrawingService.draw(self.ctx, config, self.data)
+        return self.ctx.output_buffer.get_value()
+
+
+    @staticmethod
+    def _write(out: IO[str] | IO[bytes] | None,
+        write: Callable[[IO[str]], Any]) -> str | None:
+        """
+        Call write with a text stream for out: out itself, a UTF-8 wrapper of
+        a binary stream, or a buffer whose value is returned if out is None.
+        """
+        if out is None:
+            buffer = io.StringIO()
+            write(buffer)
+            return buffer.getvalue()
+
+        if isinstance(out, io.TextIOBase) or not Tree._is_binary(out):
+            write(out)
+            return None
+
+        wrapper = io.TextIOWrapper(out, encoding="utf-8", newline="")
+        try:
+            write(wrapper)
+            wrapper.flush()
+        finally:
+            wrapper.detach()
+        return None
+
+
+    @staticmethod
+    def _is_binary(out: Any) -> bool:
+        """ Tell if a stream takes bytes """
+        return (isinstance(out, (io.RawIOBase, io.BufferedIOBase))
+            or "b" in getattr(out, "mode", ""))
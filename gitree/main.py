@@ -12,17 +12,15 @@ if sys.platform.startswith('win'):      # fix windows unicode error on CI
 # Deps from this project
 from .services.parsing_service import ParsingService
 from .services.general_options_service import GeneralOptionsService
-from .services.resolve_items_service import ResolveItemsService
 from .services.drawing_service import DrawingService
-from .services.zipping_service import ZippingService
-from .services.export_service import ExportService
-from .services.copy_service import CopyService
-
-# from .services.zipping_service import ZippingService
+from .api import Tree
 from .objects.app_context import AppContext
 from .objects.config import Config
 from .utilities.logging_utility import Logger
-from .services.interactive_selection_service import InteractiveSelectionService
+
+# NOTE: The zip, export/copy and interactive services (and their zipfile, pyperclip
+# and prompt_toolkit dependencies) are imported in main() only when their mode is
+# used, to keep startup fast for plain listings. tests/test_startup.py checks this.
 
 
 def flush_buffers(ctx: AppContext, config: Config):
@@ -34,19 +32,21 @@ def flush_buffers(ctx: AppContext, config: Config):
     if not config.no_printing and not ctx.output_buffer.empty():
         ctx.output_buffer.flush()
 
-    # print the log if verbose mode
+    # print the log if verbose mode, to stderr if stdout carries an archive or export
     if config.verbose:
+        log_file = sys.stderr if "-" in (config.zip, config.export) else sys.stdout
         if not config.no_printing and not ctx.output_buffer.empty(): 
             print()
-        print("LOG:")
-        ctx.logger.flush()
+        print("LOG:", file=log_file)
+        ctx.logger.flush(file=log_file)
 
 
 def main() -> None:
     """
     Main entry point for the gitree CLI tool.
 
-    Handles the main workflow of the app.
+    Parses the args, runs the app (profiled with --profile) and flushes
+    the buffers.
     """
     
     # Record time for performance noting
@@ -55,10 +55,53 @@ def main() -> None:
 
     # Initialize app context
     ctx = AppContext()
+    profiler = ctx.profiler
 
 
     # Prepare the config object (this has all the args now)
-    config = ParsingService.parse_args(ctx)
+    with profiler.phase("parse_args"):
+        config = ParsingService.parse_args(ctx)
+
+    # Counters are only collected when the profile is written
+    profiler.enabled = bool(config.profile_json)
+
+    # The log is only shown with --verbose, otherwise messages are discarded
+    ctx.logger.set_level(Logger.DEBUG if config.verbose else Logger.OFF)
+
+
+    # The capture stops before the flush so its summary is part of the log
+    if config.profile:
+        profiler.start_capture(config.profile)
+        _run(ctx, config)
+        profiler.stop_capture(ctx.logger)
+    else:
+        _run(ctx, config)
+
+
+    # Log performance (time)
+    ctx.logger.log(Logger.INFO, "Total time for run: %d ms", (time.time()-start_time)*1000)
+
+
+    # Flush the buffers to the console before exiting
+    with profiler.phase("flush"):
+        flush_buffers(ctx, config)
+
+
+    # Written last so the flush is part of it, errors go straight to stderr
+    if config.profile_json:
+        try:
+            profiler.write_json(config.profile_json)
+        except OSError as e:
+            print(f"Could not write profile {config.profile_json}: {e}", file=sys.stderr)
+
+
+def _run(ctx: AppContext, config: Config) -> None:
+    """
+    Handles the main workflow of the app, from the general options to the
+    listing, archive or export written to the buffers.
+    """
+
+    profiler = ctx.profiler
 
 
     # if general options used, they are executed here 
@@ -66,38 +109,37 @@ def main() -> None:
     GeneralOptionsService.handle_args(ctx, config)
 
 
-    # This service returns all the items to include resolved in a dict
-    # Hover over ResolveItemsService to check the format which it returns
-    resolved_root = ResolveItemsService.resolve_items(ctx, config)
-
-
-    # Select files interactively if requested
-    # NOTE: this one is currently broken
+    # Select files interactively if requested, it resolves dirs as they are expanded
     if config.interactive:
-        resolved_root = InteractiveSelectionService.run(ctx, config, resolved_root)
+        from .services.interactive_selection_service import InteractiveSelectionService
+        with profiler.phase("interactive"):
+            tree = Tree(ctx, config, InteractiveSelectionService.run(ctx, config))
+
+    # Otherwise the tree resolves all the items to include into a dict on first use
+    # Hover over ResolveItemsService to check the format which it returns
+    else:
+        tree = Tree(ctx, config)
+    
+    with profiler.phase("resolve"):
+        resolved_root = tree.data
 
 
     # Everything is ready
     # Now do the final operations
     if config.zip:
-        ZippingService.run(ctx, config, resolved_root)
+        from .services.zipping_service import ZippingService
+        with profiler.phase("zip"):
+            ZippingService.run(ctx, config, resolved_root)
 
     else:
-        DrawingService.draw(ctx, config, resolved_root)
+        with profiler.phase("drawing"):
+            DrawingService.draw(ctx, config, resolved_root)
         
-        if config.copy:
-            CopyService.run(ctx, config, resolved_root)
-
-        elif config.export:
-            ExportService.run(ctx, config, resolved_root)
-
-
-    # Log performance (time)
-    ctx.logger.log(Logger.INFO, f"Total time for run: {int((time.time()-start_time)*1000)} ms")
-
-
-    # Flush the buffers to the console before exiting
-    flush_buffers(ctx, config)
+        # The export is rendered once for the file/stdout and the clipboard
+        if config.copy or config.export:
+            from .services.export_service import ExportService
+            with profiler.phase("export"):
+                ExportService.run(ctx, config, resolved_root)
 
 
 if __name__ == "__main__":
@@ -9,10 +9,12 @@ for the app context.
 
 # Deps in the same project
 from ..utilities.logging_utility import Logger, OutputBuffer
+from ..utilities.profiling_utility import Profiler
 
 
 class AppContext:
     def __init__(self) -> None:
         """ Constructor for app ctx """
-        self.logger = Logger()
+        self.logger = Logger(capacity=Logger.DEFAULT_CAPACITY)
         self.output_buffer = OutputBuffer()
+        self.profiler = Profiler()
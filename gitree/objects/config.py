@@ -10,6 +10,7 @@ from typing import Any
 
 # Deps from this project
 from .app_context import AppContext
+from .settings import Settings
 
 
 class Config:
@@ -42,7 +43,8 @@ class Config:
         Returns the default configuration values.
 
         NOTE: This must contain all the configuration keys, since it is
-        meant to be a last resort.
+        meant to be a last resort. Settings has no defaults of its own and
+        takes them from here.
         """
 
         return {
@@ -52,10 +54,26 @@ class Config:
             "config_user": False,
             "no_config": False,
             "verbose": False,
+            "profile_json": "",
+            "profile": "",
 
             # Output & export options
             "zip": "",
+            "zip_level": None,
+            "zip_incremental": False,
+            "archive_format": "zip",
             "export": "",
+            "export_max_size": None,
+            "copy_max_size": None,
+            "export_dedup": False,
+            "compress_level": None,
+            "export_cache": False,
+            "export_cache_size": 64 * 1024 * 1024,
+            "max_file_size": None,
+            "export_shard_size": None,
+            "export_shard_files": None,
+            "jobs": 1,
+            "changed_since": "",
 
             # Listing options
             "format": "txt",
@@ -113,6 +131,37 @@ class Config:
         return ".gitree/config.json"
     
 
+    def snapshot(self) -> Settings:
+        """
+        Returns the merged settings as an immutable Settings object, for
+        reading options in hot loops. The snapshot is cached until an
+        attribute of the config is set.
+        """
+        settings = self.__dict__.get("_settings")
+        if settings is None:
+            settings = Settings.from_config(self)
+            self.__dict__["_settings"] = settings
+        return settings
+
+
+    def override(self, **options: Any) -> "Config":
+        """
+        Returns a copy of the config with some options overridden at the CLI
+        level. The other layers are shared with this config.
+        """
+        config = object.__new__(Config)
+        config.__dict__.update(self.__dict__)
+        config.__dict__.pop("_settings", None)
+        config.__dict__["cli"] = {**self.cli, **options}
+        return config
+
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """ Set the attribute and drop the cached snapshot """
+        super().__setattr__(name, value)
+        self.__dict__.pop("_settings", None)
+
+
     def __getattr__(self, name: str) -> Any:
         """
         Allow attribute-style access:
@@ -0,0 +1,175 @@
+# gitree/objects/content_cache.py
+
+"""
+Code file for housing ContentCache class.
+"""
+
+# Default libs
+import json, os, time
+from pathlib import Path
+from typing import Any
+
+# Deps from this project
+from .app_context import AppContext
+from ..utilities.logging_utility import Logger
+
+
+class ContentCache:
+    """
+    Persistent cache of already-read file contents for repeated exports.
+
+    - All entries live in one JSON file which is read and written in bulk.
+    - Entries are keyed by absolute path and only served while the file's
+      (size, mtime_ns, inode) still match the values seen when it was cached.
+    - The total cached text is bounded; least recently used entries are
+      evicted when saving.
+    """
+
+    # Bump this when the stored entry format changes
+    VERSION = 2
+
+    # Files modified this recently (ns) are not cached, since a later write
+    # within the same mtime tick would go unnoticed
+    RACY_WINDOW_NS = 2_000_000_000
+
+
+    def __init__(self, ctx: AppContext, cache_path: Path, max_bytes: int,
+        max_file_size: int | None) -> None:
+        """
+        Load the cache file if present. A missing, corrupt or incompatible
+        cache file simply results in an empty cache.
+
+        Args:
+            ctx (AppContext): The application context
+            cache_path (Path): Path of the packed cache file
+            max_bytes (int): Upper bound for the total size of cached text
+            max_file_size (int | None): The file size limit the contents were
+                classified with; entries made with another limit are dropped
+        """
+
+        self.ctx = ctx
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+
+        self._clock = 0
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+
+    def get(self, path: Path, st: os.stat_result) -> dict[str, Any] | None:
+        """
+        Return the cached content for the path if the file is unchanged.
+
+        Args:
+            path (Path): The file path
+            st (os.stat_result): A fresh stat of the file
+
+        Returns:
+            dict[str, Any] | None: The cached content dict, or None on a miss
+        """
+
+        entry = self._entries.get(str(path))
+        if entry is None or entry["key"] != self._stat_key(st):
+            return None
+
+        self._clock += 1
+        entry["used"] = self._clock
+        self._dirty = True
+        return entry["content"]
+
+
+    def put(self, path: Path, st: os.stat_result, content: dict[str, Any]) -> None:
+        """
+        Store the content read for the path. Nothing is stored if the file
+        changed since st was taken, or was modified too recently to trust
+        its mtime.
+
+        Args:
+            path (Path): The file path
+            st (os.stat_result): The stat taken before the file was read
+            content (dict[str, Any]): The content dict to cache
+        """
+
+        try:
+            after = os.stat(path)
+        except OSError:
+            return
+
+        key = self._stat_key(st)
+        if self._stat_key(after) != key:
+            return
+        if time.time_ns() - st.st_mtime_ns < self.RACY_WINDOW_NS:
+            return
+
+        self._clock += 1
+        self._entries[str(path)] = {"key": key, "used": self._clock, "content": content}
+        self._dirty = True
+
+
+    def save(self) -> None:
+        """
+        Evict least recently used entries down to the size limit and write
+        the cache file atomically. Does nothing if the cache was not touched.
+        """
+
+        if not self._dirty:
+            return
+
+        kept: dict[str, dict[str, Any]] = {}
+        total = 0
+        for path, entry in sorted(self._entries.items(),
+            key=lambda kv: kv[1]["used"], reverse=True):
+            total += len(entry["content"].get("text", ""))
+            if total > self.max_bytes:
+                break
+            kept[path] = entry
+
+        payload = {
+            "version": self.VERSION,
+            "max_file_size": self.max_file_size,
+            "clock": self._clock,
+            "entries": kept,
+        }
+
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            self.ctx.logger.log(Logger.WARNING, "Could not write content cache: %s", e)
+            return
+
+        self.ctx.logger.log(Logger.DEBUG,
+            "Saved %d entries to content cache at %s", len(kept), self.cache_path)
+
+
+    def _load(self) -> None:
+        """ Read the whole cache file into memory """
+
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.ctx.logger.log(Logger.WARNING, "Ignoring unreadable content cache: %s", e)
+            return
+
+        if (not isinstance(payload, dict) or payload.get("version") != self.VERSION
+            or payload.get("max_file_size") != self.max_file_size):
+            return
+
+        self._clock = payload.get("clock", 0)
+        self._entries = payload.get("entries", {})
+        self.ctx.logger.log(Logger.DEBUG,
+            "Loaded %d entries from content cache", len(self._entries))
+
+
+    @staticmethod
+    def _stat_key(st: os.stat_result) -> list[int]:
+        """ Return the validation key for a stat result (a list, to match JSON) """
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
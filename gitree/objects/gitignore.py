@@ -6,10 +6,11 @@ Code file for housing GitIgnore class
 
 # Defualt libs
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 
-# Dependencies
-import pathspec
+# Dependencies (pathspec is imported on first use, it is slow to import)
+if TYPE_CHECKING:
+    import pathspec
 
 # Deps from this project
 from ..objects.app_context import AppContext
@@ -40,12 +41,17 @@ class GitIgnore:
         self.config = config
 
         # Object attr
-        self.enabled = not config.no_gitignore
-        self.gitignore_depth = config.gitignore_depth
+        settings = config.snapshot()
+        self.enabled = not settings.no_gitignore
+        self.gitignore_depth = settings.gitignore_depth
 
         # Setup specs for gitignore
-        self._specs: list[tuple[Path, pathspec.PathSpec]]
-        self._load_spec_from_gitignore(gitignore_path)
+        self._specs: list[tuple[Path, "pathspec.PathSpec"]]
+        with ctx.profiler.phase("gitignore_load"):
+            self._load_spec_from_gitignore(gitignore_path)
+
+        # Number of rules evaluated per path, for the profile counters
+        self._rule_count = sum(len(spec.patterns) for _, spec in self._specs)
 
 
     def excluded(self, item_path: Path) -> bool:
@@ -61,6 +67,7 @@ class GitIgnore:
         if not self.enabled:
             return False
 
+        self.ctx.profiler.count("gitignore_rules", self._rule_count)
         p = item_path.resolve(strict=False)
 
         for root, spec in self._specs:
@@ -84,6 +91,8 @@ class GitIgnore:
         Args:
             roots (Iterable[Path]): Root directories to scan for .gitignore files
         """
+        import pathspec
+
         # Clears the specs if already present
         self._specs = []
 
@@ -100,6 +109,8 @@ class GitIgnore:
         Args:
             gitignore_path (Path): Path to the .gitignore file to load
         """
+        import pathspec
+
         self._specs = []
 
         gi = Path(gitignore_path).resolve(strict=False)
@@ -0,0 +1,133 @@
+# gitree/objects/search_index.py
+
+"""
+Code file for housing SearchIndex class.
+"""
+
+# Default libs
+from bisect import bisect_right
+from typing import Any
+
+
+class SearchIndex:
+    """
+    Index of the relative paths of the interactive selector's rows, used by
+    its "/" search.
+
+    - A query is one or more space separated terms, all of which must be
+      substrings of a row's path (case-insensitive).
+    - The lowercase paths are joined into one newline separated haystack, so
+      a term is located with str.find over the whole index at C speed, and
+      only the matches cost Python work. The paths of rows added since are
+      appended to it lazily, so adding rows in batches stays linear.
+    - Results are kept per query: a query that extends a previous one only
+      filters that query's results, so typing narrows incrementally.
+    """
+
+    # Terms shorter than this are matched by scanning the paths, not the haystack
+    _SCAN_BELOW = 3
+
+
+    def __init__(self) -> None:
+        self.rows: list[dict[str, Any]] = []
+        self.paths: list[str] = []
+
+        self._haystack = ""
+        self._starts: list[int] = []        # Offset of each path in the haystack
+        self._indexed = 0                   # Number of paths in the haystack
+
+        # (query, matching row ids) of the current query and the ones it extends
+        self._history: list[tuple[str, list[int]]] = []
+
+
+    def add(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Add rows to the index. Their id is their position in self.rows.
+
+        Args:
+            rows (list[dict[str, Any]]): Rows with their relative "path"
+        """
+        self.rows.extend(rows)
+        self.paths.extend(row["path"].lower() for row in rows)
+
+        # Cached results do not include the new rows
+        self._history.clear()
+
+
+    def search(self, query: str) -> list[int] | None:
+        """
+        Return the ids of the rows matching a query, in the order they were added.
+
+        Args:
+            query (str): The search query
+
+        Returns:
+            list[int] | None: The matching ids, or None for an empty query
+        """
+        query = query.lower()
+        terms = query.split()
+        if not terms:
+            self._history.clear()
+            return None
+
+        # Drop the cached queries that this one does not extend
+        while self._history and not query.startswith(self._history[-1][0]):
+            self._history.pop()
+
+        # Narrow the previous results by the terms that changed, or start
+        # from the matches of the longest term
+        if self._history:
+            previous, matches = self._history[-1]
+            previous_terms = set(previous.split())
+            remaining = [term for term in terms if term not in previous_terms]
+        else:
+            longest = max(terms, key=len)
+            matches = self._find(longest)
+            remaining = [term for term in terms if term != longest]
+
+        paths = self.paths
+        for term in remaining:
+            matches = [i for i in matches if term in paths[i]]
+
+        self._history.append((query, matches))
+        return matches
+
+
+    def _find(self, term: str) -> list[int]:
+        """
+        Scan the haystack for a term.
+
+        Args:
+            term (str): A lowercase term without newlines
+
+        Returns:
+            list[int]: The ids of the paths containing the term, ascending
+        """
+
+        # Very short terms match most paths, a plain scan is cheaper then
+        if len(term) < self._SCAN_BELOW:
+            return [i for i, path in enumerate(self.paths) if term in path]
+
+        if self._indexed != len(self.paths):
+            added = self.paths[self._indexed:]
+            offset = len(self._haystack)
+            for path in added:
+                self._starts.append(offset)
+                offset += len(path) + 1
+            self._haystack += "\n".join(added) + "\n"
+            self._indexed = len(self.paths)
+
+        haystack, starts = self._haystack, self._starts
+        ids: list[int] = []
+
+        pos = haystack.find(term)
+        while pos != -1:
+            i = bisect_right(starts, pos) - 1
+            ids.append(i)
+
+            # Continue from the next path, one match per path is enough
+            if i + 1 >= len(starts):
+                break
+            pos = haystack.find(term, starts[i + 1])
+
+        return ids
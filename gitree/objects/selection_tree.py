@@ -0,0 +1,162 @@
+# gitree/objects/selection_tree.py
+
+"""
+Code file for housing SelectionTree class.
+"""
+
+# Default libs
+from typing import Any
+
+
+class SelectionTree:
+    """
+    Checked state of the listed rows of the interactive selector.
+
+    - Each dir row keeps its child rows in "children", so listing a dir only
+      touches the new rows, whatever the size of the tree.
+    - A row's "checked" flag is set only while its whole subtree is checked.
+      For dirs that are not listed yet, it is a recursive selection of their
+      contents.
+    - Dirs count their fully checked children ("full") and their children
+      with anything checked ("some"), so a toggle updates each ancestor in
+      O(1) and stops at the first one whose state did not change.
+    - A dir that is fully checked or unchecked decides the state of its whole
+      subtree: its rows are only updated once something in it is toggled
+      on its own, so toggling a dir does not visit its subtree.
+    - Each row dict gets its "parent" row and a "key" that sorts rows in
+      render order.
+    """
+
+    def __init__(self, root: dict[str, Any]) -> None:
+        """
+        Args:
+            root (dict[str, Any]): The root dir row
+        """
+        root.update(parent=None, key=(), checked=False, full=0, some=0)
+        self.root = root
+
+
+    def add_children(self, row: dict[str, Any], children: list[dict[str, Any]]) -> None:
+        """
+        Attach the rows of a dir that was just listed. They inherit its
+        checked state.
+
+        Args:
+            row (dict[str, Any]): The dir row, with no children added yet
+            children (list[dict[str, Any]]): Its child rows, in render order
+        """
+        checked = row["checked"]
+        for i, child in enumerate(children):
+            child.update(parent=row, key=row["key"] + (i,), checked=checked)
+            if child["type"] == "dir":
+                child.update(full=0, some=0)
+
+        row["children"] = children
+        row["full"] = row["some"] = len(children) if checked else 0
+
+
+    def set(self, row: dict[str, Any], state: bool) -> None:
+        """
+        Check or uncheck a row and, for a dir, its whole subtree. Costs one
+        step per ancestor, plus handing the state of the fully (un)checked
+        ancestors down to their children.
+
+        Args:
+            row (dict[str, Any]): The row to toggle
+            state (bool): The new checked state
+        """
+        self._settle(row)
+        old, new = self.own_state(row), state
+        self._fill(row, state)
+
+        # Each ancestor counts its children by state, up to the first one whose
+        # own state did not change
+        parent = row["parent"]
+        while parent is not None and old != new:
+            parent_old = self.own_state(parent)
+            parent["full"] += (new is True) - (old is True)
+            parent["some"] += (new is not False) - (old is not False)
+            parent["checked"] = parent["full"] == len(parent["children"])
+            old, new = parent_old, self.own_state(parent)
+            parent = parent["parent"]
+
+
+    def set_many(self, rows: list[dict[str, Any]], state: bool) -> None:
+        """
+        Check or uncheck several rows (and their subtrees) at once.
+
+        Args:
+            rows (list[dict[str, Any]]): The rows to toggle
+            state (bool): The new checked state
+        """
+        for row in rows:
+            self.set(row, state)
+
+
+    def state(self, row: dict[str, Any]) -> bool | None:
+        """
+        Return the tri-state of a row.
+
+        Args:
+            row (dict[str, Any]): The row
+
+        Returns:
+            bool | None: True if it is checked (with its whole subtree), False if
+                nothing in it is checked, None if only part of it is
+        """
+
+        # The topmost fully (un)checked ancestor decides for its whole subtree
+        state = self.own_state(row)
+        parent = row["parent"]
+        while parent is not None:
+            parent_state = self.own_state(parent)
+            if parent_state is not None:
+                state = parent_state
+            parent = parent["parent"]
+        return state
+
+
+    @staticmethod
+    def own_state(row: dict[str, Any]) -> bool | None:
+        """
+        Return the tri-state stored in a row, which is its state as long as
+        its ancestors are all partly checked (see state()).
+
+        Args:
+            row (dict[str, Any]): The row
+
+        Returns:
+            bool | None: True, False, or None if only part of it is checked
+        """
+        if row["checked"]:
+            return True
+        if row["type"] == "dir" and row["some"]:
+            return None
+        return False
+
+
+    def _settle(self, row: dict[str, Any]) -> None:
+        """
+        Hand the state of the fully (un)checked ancestors of a row down to
+        their children, top down, so the states stored along its path are
+        its real ones.
+        """
+        path: list[dict[str, Any]] = []
+        parent = row["parent"]
+        while parent is not None:
+            path.append(parent)
+            parent = parent["parent"]
+
+        for parent in reversed(path):
+            state = self.own_state(parent)
+            if state is not None:
+                for child in parent["children"]:
+                    self._fill(child, state)
+
+
+    @staticmethod
+    def _fill(row: dict[str, Any], state: bool) -> None:
+        """ Store a full state in a row; its listed rows are left as they are """
+        row["checked"] = state
+        if row["type"] == "dir":
+            row["full"] = row["some"] = len(row["children"] or ()) if state else 0
@@ -0,0 +1,100 @@
+# gitree/objects/settings.py
+
+"""
+Code file to house Settings class.
+"""
+
+# Default libs
+from dataclasses import dataclass, fields
+from typing import Any
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """
+    Immutable snapshot of a Config with every layer (CLI > user > global >
+    defaults) already merged, made with Config.snapshot(). The fields have no
+    defaults of their own: they come from Config's default layer.
+
+    Reading a field is a plain slot access, so hot loops (resolving, drawing)
+    use this instead of going through Config.__getattr__ for every read.
+    List values are stored as tuples.
+    """
+
+    # Positional args
+    paths: tuple[str, ...]
+
+    # General Options
+    version: bool
+    init_config: bool
+    config_user: bool
+    no_config: bool
+    verbose: bool
+    profile_json: str | None
+    profile: str | None
+
+    # Output & export options
+    zip: str | None
+    zip_level: int | None
+    zip_incremental: bool
+    archive_format: str
+    export: str | None
+    export_max_size: int | None
+    copy_max_size: int | None
+    export_dedup: bool
+    compress_level: int | None
+    export_cache: bool
+    export_cache_size: int
+    max_file_size: int | None
+    export_shard_size: int | None
+    export_shard_files: int | None
+    jobs: int
+    changed_since: str | None
+
+    # Listing options
+    format: str
+    max_items: int
+    max_entries: int
+    max_depth: int | None
+    gitignore_depth: int | None
+    hidden_items: bool
+    exclude: tuple[str, ...]
+    exclude_depth: int | None
+    include: tuple[str, ...]
+    include_file_types: tuple[str, ...]
+    copy: bool
+    emoji: bool
+    interactive: bool
+    files_first: bool
+    no_color: bool
+    no_contents: bool
+    no_contents_for: tuple[str, ...]
+    override_files: bool
+
+    # Listing override options
+    no_gitignore: bool
+    no_files: bool
+    no_max_items: bool
+    no_max_entries: bool
+
+    # Inner tool behaviour control
+    no_printing: bool
+
+
+    @classmethod
+    def from_config(cls, config: Any) -> "Settings":
+        """
+        Resolve every field through the config's layered lookup once.
+
+        Args:
+            config (Config): The layered config to snapshot
+
+        Returns:
+            Settings: The merged, immutable settings
+        """
+
+        values: dict[str, Any] = {}
+        for field in fields(cls):
+            value = getattr(config, field.name)
+            values[field.name] = tuple(value) if isinstance(value, list) else value
+        return cls(**values)
@@ -0,0 +1,138 @@
+# gitree/objects/tree_manifest.py
+
+"""
+Code file for housing TreeManifest and ManifestEntry classes.
+"""
+
+# Default libs
+import os
+from pathlib import Path
+from typing import Any, Iterator
+
+
+class ManifestEntry:
+    """
+    One file or directory of the resolved tree.
+    """
+
+    __slots__ = ("rel", "path", "kind", "depth", "_size")
+
+
+    def __init__(self, rel: str, path: Path, kind: str, depth: int) -> None:
+        """
+        Args:
+            rel (str): Path relative to the tree root, with POSIX separators
+                ("" for the root itself)
+            path (Path): The absolute path
+            kind (str): "file" or "dir"
+            depth (int): Depth below the root (0 for the root itself)
+        """
+        self.rel = rel
+        self.path = path
+        self.kind = kind
+        self.depth = depth
+        self._size: int | None = None
+
+
+    @property
+    def size(self) -> int:
+        """ Size in bytes, stat'ed on first use (0 for unreadable entries) """
+        if self._size is None:
+            try:
+                self._size = os.stat(self.path).st_size
+            except OSError:
+                self._size = 0
+        return self._size
+
+
+    @property
+    def is_dir(self) -> bool:
+        return self.kind == "dir"
+
+
+class TreeManifest:
+    """
+    Flat list of the entries of a resolved tree, in tree order: each directory
+    is followed by its children, in the order of its "children" list.
+
+    The resolver builds it while traversing and stores it under the "manifest"
+    key of the resolved root dict, so consumers neither re-walk the nested dict
+    nor recompute relative paths.
+    """
+
+    def __init__(self, root: Path) -> None:
+        """
+        Args:
+            root (Path): The root directory of the tree
+        """
+        self.root = root
+        self.entries: list[ManifestEntry] = [ManifestEntry("", root, "dir", 0)]
+
+
+    def add(self, rel_dir: str, path: Path, kind: str, depth: int) -> str:
+        """
+        Append an entry for a child of the directory at rel_dir.
+
+        Args:
+            rel_dir (str): Relative path of the parent directory
+            path (Path): The absolute path of the child
+            kind (str): "file" or "dir"
+            depth (int): Depth of the child below the root
+
+        Returns:
+            str: The relative path of the added entry
+        """
+        rel = f"{rel_dir}/{path.name}" if rel_dir else path.name
+        self.entries.append(ManifestEntry(rel, path, kind, depth))
+        return rel
+
+
+    def files(self) -> list[ManifestEntry]:
+        """ Return the file entries, in tree order """
+        return [e for e in self.entries if e.kind == "file"]
+
+
+    def __iter__(self) -> Iterator[ManifestEntry]:
+        return iter(self.entries)
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+    @staticmethod
+    def of(tree_data: dict[str, Any]) -> "TreeManifest":
+        """
+        Return the manifest of a resolved tree dict, building it from the
+        nested dict for trees that were not produced by the resolver
+        (e.g. filtered by the interactive selection).
+
+        Args:
+            tree_data (dict[str, Any]): A resolved tree dict with "self" and "children"
+
+        Returns:
+            TreeManifest: The tree's manifest
+        """
+
+        manifest = tree_data.get("manifest")
+        if isinstance(manifest, TreeManifest):
+            return manifest
+
+        root = tree_data.get("self")
+        if root is not None and not isinstance(root, Path):
+            root = Path(str(root))
+        manifest = TreeManifest(root or Path())
+
+        def rec(node: dict[str, Any], rel_dir: str, depth: int) -> None:
+            for child in node.get("children", []):
+                if isinstance(child, dict):
+                    p = child.get("self")
+                    p = p if isinstance(p, Path) else Path(str(p))
+                    rec(child, manifest.add(rel_dir, p, "dir", depth), depth + 1)
+                else:
+                    p = child if isinstance(child, Path) else Path(str(child))
+                    manifest.add(rel_dir, p, "file", depth)
+
+        if root is not None:
+            rec(tree_data, "", 1)
+        return manifest
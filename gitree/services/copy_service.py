@@ -11,42 +11,25 @@ import pyperclip
 
 # Deps from this project
 from ..objects.app_context import AppContext
-from ..objects.config import Config
-from ..services.export_service import ExportService
 from ..utilities.logging_utility import Logger
 
 
 class CopyService:
     """
-    This class depends on file contents inclusion logic from ExportService.
+    Clipboard sink of the export; ExportService renders the contents.
     """
     
     @staticmethod
-    def run(ctx: AppContext, config: Config, tree_data: dict) -> None:
+    def copy(ctx: AppContext, text: str) -> None:
         """
-        Copy the exported project structure + file contents to clipboard,
-        using the same format as --export.
+        Copy the exported project structure + file contents to clipboard.
 
         Args:
             ctx (AppContext): The application context
-            config (Config): The application configuration
-            tree_data (dict): The resolved tree dict
+            text (str): The rendered export
         """
 
-        fmt = (getattr(config, "format", "") or "").strip().lower()
-
-        if fmt in ("txt", "tree"):
-            lines = ExportService._export_txt(ctx, tree_data)
-
-        elif fmt == "md":
-            lines = ExportService._export_md(ctx, tree_data)
-
-        elif fmt == "json":
-            lines = ExportService._export_json(ctx, tree_data)
-
         try:
-            pyperclip.copy("\n".join(lines))
+            pyperclip.copy(text)
         except Exception as e:
-            ctx.logger.log(Logger.ERROR, f"Failed to copy to clipboard: {e}")
-
-        ctx.output_buffer.clear()
+            ctx.logger.log(Logger.ERROR, "Failed to copy to clipboard: %s", e)
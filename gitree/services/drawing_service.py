@@ -56,6 +56,9 @@ class DrawingService:
             tree_data (dict[str, Any]): The resolved tree dict to draw
         """
 
+        # Options are read per line, so use the merged snapshot
+        settings = config.snapshot()
+
         def _p(x: Any) -> str:
             return x.as_posix() if hasattr(x, "as_posix") else str(x)
 
@@ -67,7 +70,7 @@ class DrawingService:
             return isinstance(node, dict)
 
         def _emoji_for(node: Any) -> str:
-            if not config.emoji:
+            if not settings.emoji:
                 return ""
             if _is_dir(node):
                 ch = node.get("children", [])
@@ -75,7 +78,7 @@ class DrawingService:
             return FILE_EMOJI
 
         def _children_sorted(children: list[Any]) -> list[Any]:
-            if config.files_first:
+            if settings.files_first:
                 return sorted(children, key=lambda c: (0 if not _is_dir(c) else 1, _name(_p(c.get("self") if _is_dir(c) else c)).lower()))
             return sorted(children, key=lambda c: (0 if _is_dir(c) else 1, _name(_p(c.get("self") if _is_dir(c) else c)).lower()))
 
@@ -84,7 +87,7 @@ class DrawingService:
             label = _name(p)
             em = _emoji_for(node)
 
-            if config.no_color:
+            if settings.no_color:
                 color = Color.default
             elif DrawingService._is_hidden(p):
                 color = Color.grey
@@ -104,9 +107,9 @@ class DrawingService:
 
         if root_emoji:
             ctx.output_buffer.write(f"{root_emoji} "
-                f"{Color.cyan(root_label) if not config.no_color else root_label}")
+                f"{Color.cyan(root_label) if not settings.no_color else root_label}")
         else:
-            ctx.output_buffer.write(f"{Color.cyan(root_label) if not config.no_color else root_label}")
+            ctx.output_buffer.write(f"{Color.cyan(root_label) if not settings.no_color else root_label}")
 
         def _rec(node: dict[str, Any], prefix: str) -> None:
             kids = _children_sorted(node.get("children", []))
@@ -1,112 +1,938 @@
-# gitree/services/drawing_service.py
+# gitree/services/export_service.py
 
 """
 Code file for housing ExportService Class
 """
 
 # Defualt libs
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, BinaryIO, Callable, Iterable, Iterator
+import codecs, hashlib, io, json, mmap, os, sys, zlib
 
 # Deps from this project
 from ..objects.app_context import AppContext
 from ..objects.config import Config
+from ..objects.content_cache import ContentCache
+from ..objects.tree_manifest import TreeManifest
+from ..utilities.decoding_utility import SNIFF_SIZE, decode_bytes, sniff_encoding
+from ..utilities.functions_utility import compress_levels
+from ..utilities.ingest_utility import MappedFile
+from ..utilities.logging_utility import Logger
+from ..utilities.tee_utility import OutputSink, TeeWriter
 
 
 class ExportService:
+
+    # Block size used for streaming hashes of file contents
+    _HASH_BLOCK = 64 * 1024
+
+    # Files at least this large are mapped into memory instead of read
+    _MMAP_THRESHOLD = 1024 * 1024
+
+    # Placeholder used to splice mapped contents into a dumped JSON object
+    _JSON_MARKER = "\0gitree-mapped-content\0"
+
+    # Location of the persistent content cache (--export-cache)
+    _CACHE_PATH = ".gitree/content_cache.json"
+
+    # Suffixes that wrap the export format (see _open_output)
+    _COMPRESSION_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+
     @staticmethod
     def run(ctx: AppContext, config: Config, tree_data: dict[str, Any]) -> None:
         """
         Export the already-drawn project structure in ctx.output_buffer, followed by file contents,
-        and save it to a file based on config.format.
+        based on config.format.
+
+        The export is rendered (and every file read) once and written to all
+        requested sinks: the config.export file (or stdout for "-") and the
+        clipboard with config.copy, each bounded by its own size limit.
         """
 
         fmt = (getattr(config, "format", "") or "").strip().lower()
-        output_path = Path(config.export)
+        output_path = Path(config.export) if config.export else None
 
-        if fmt in ("txt", "tree"):
-            lines = ExportService._export_txt(ctx, tree_data)
+        if output_path and (config.export_shard_size or config.export_shard_files):
+            if str(output_path) == "-":
+                # Rejected at parse time for the CLI, but config.json is not
+                ctx.logger.log(Logger.ERROR, "Sharded exports cannot be written to stdout")
+                return
+            if config.copy:
+                ctx.logger.log(Logger.WARNING, "--copy is ignored for sharded exports")
+            ExportService._run_sharded(ctx, config, tree_data, fmt, output_path)
+            ctx.output_buffer.clear()
+            return
 
-        elif fmt == "md":
-            lines = ExportService._export_md(ctx, tree_data)
+        ndjson = output_path is not None and ExportService._is_ndjson(output_path)
+        planned = ExportService._lines(ctx, config, tree_data, fmt, ndjson)
+        if planned is None:
+            return
+        lines, plan = planned
 
-        elif fmt == "json":
-            lines = ExportService._export_json(ctx, tree_data)
+        sinks = ExportService._open_sinks(ctx, config, output_path)
+        if not sinks:
+            return
 
+        try:
+            if len(sinks) == 1 and sinks[0].limit is None:
+                # Nothing to fan out, write to the stream directly
+                ExportService._write_lines(sinks[0].stream, lines)
+            else:
+                ExportService._write_lines(TeeWriter(sinks), lines)
+        finally:
+            for sink in sinks:
+                sink.close()
+                if sink.truncated:
+                    ctx.logger.log(Logger.WARNING,
+                        "Export to %s was cut off at %d bytes", sink.name, sink.limit)
+
+        # Files cut off from an export were not exported, so the baseline stays
+        if any(sink.truncated for sink in sinks):
+            if plan["baseline"] is not None:
+                ctx.logger.log(Logger.WARNING, "The export was cut off, manifest %s "
+                    "was not updated", config.changed_since)
         else:
+            ExportService._save_plan_baseline(ctx, config, plan)
+
+        if output_path is not None and str(output_path) != "-":
+            ctx.profiler.count_file("bytes_written", output_path)
+        ctx.output_buffer.clear()
+
+
+    @staticmethod
+    def write(ctx: AppContext, config: Config, tree_data: dict[str, Any],
+        out: IO[str], ndjson: bool = False) -> None:
+        """
+        Write the export of the already-drawn structure in ctx.output_buffer
+        to a text stream, in config.format. Unlike run(), there are no size
+        limits, shards or clipboard, and the buffer is left as it is.
+
+        Args:
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            tree_data (dict[str, Any]): The resolved tree dict
+            out (IO[str]): The stream to write to
+            ndjson (bool): Write a json export as newline-delimited JSON
+        """
+
+        fmt = (getattr(config, "format", "") or "").strip().lower()
+        planned = ExportService._lines(ctx, config, tree_data, fmt, ndjson)
+        if planned is not None:
+            lines, plan = planned
+            ExportService._write_lines(out, lines)
+            ExportService._save_plan_baseline(ctx, config, plan)
+
+
+    @staticmethod
+    def _lines(ctx: AppContext, config: Config, tree_data: dict[str, Any], fmt: str,
+        ndjson: bool) -> tuple[Iterator[Any], dict[str, Any]] | None:
+        """
+        Plan the export and return its lines in a format, along with the plan
+        (whose baseline the caller saves once the lines are written), or None
+        for unknown formats.
+        """
+
+        if fmt in ("txt", "tree"):
+            export = ExportService._export_txt
+        elif fmt == "md":
+            export = ExportService._export_md
+        elif fmt == "json" and ndjson:
+            export = ExportService._export_ndjson
+        elif fmt == "json":
+            export = ExportService._export_json
+        else:
+            return None
+
+        plan = ExportService._plan(ctx, config, tree_data)
+        return export(ctx, config, plan), plan
+
+
+    @staticmethod
+    def _open_sinks(ctx: AppContext, config: Config,
+        output_path: Path | None) -> list[OutputSink]:
+        """
+        Open the sinks the export is written to.
+
+        Args:
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            output_path (Path | None): The export path ("-" for stdout), if any
+
+        Returns:
+            list[OutputSink]: The file or stdout sink and/or the clipboard sink
+        """
+
+        sinks: list[OutputSink] = []
+
+        if output_path is not None and str(output_path) == "-":
+            sys.stdout.flush()
+            sinks.append(OutputSink("stdout", sys.stdout, config.export_max_size,
+                owned=False))
+
+        elif output_path is not None:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            out = ExportService._open_output(ctx, output_path, config.compress_level)
+            if out is not None:
+                sinks.append(OutputSink(str(output_path), out, config.export_max_size))
+
+        if config.copy:
+            def copy(stream: IO[str]) -> None:
+                from .copy_service import CopyService
+                CopyService.copy(ctx, stream.getvalue())
+
+            sinks.append(OutputSink("clipboard", io.StringIO(), config.copy_max_size,
+                on_close=copy))
+
+        return sinks
+
+
+    @staticmethod
+    def _write_lines(out: IO[str], lines: Iterable[Any]) -> None:
+        """
+        Write lines separated by newlines as they are produced, so memory stays
+        bounded by the largest single file rather than the whole export.
+
+        A line is a str, a MappedFile for the contents of a large file, or an
+        iterable of those pieces.
+        """
+        for i, line in enumerate(lines):
+            if i:
+                out.write("\n")
+
+            if isinstance(line, str):
+                out.write(line)
+            elif isinstance(line, MappedFile):
+                line.write_to(out)
+            else:
+                for piece in line:
+                    if isinstance(piece, MappedFile):
+                        piece.write_to(out)
+                    else:
+                        out.write(piece)
+
+
+    @staticmethod
+    def _run_sharded(ctx: AppContext, config: Config, tree_data: dict[str, Any],
+        fmt: str, output_path: Path) -> None:
+        """
+        Export into numbered shards (out.000.md, out.001.md, ...) bounded by
+        --export-shard-size and/or --export-shard-files, plus an index file
+        (out.index.json) mapping every exported path to its shard. Each shard
+        is cut off at --export-max-size.
+
+        The project structure goes into the first shard. Shards are planned up front
+        from file sizes, so they can be written concurrently with --jobs.
+
+        Args:
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            tree_data (dict[str, Any]): The resolved tree dict
+            fmt (str): The export format
+            output_path (Path): The export path the shard names are derived from
+        """
+
+        if fmt not in ("txt", "tree", "md", "json"):
             return
 
+        structure = ctx.output_buffer.get_value()
+        plan = ExportService._plan(ctx, config, tree_data)
+        shards = ExportService._split_shards(plan["files"],
+            config.export_shard_size, config.export_shard_files)
+        paths = [ExportService._shard_path(output_path, i) for i in range(len(shards))]
+        ndjson = ExportService._is_ndjson(output_path)
+        max_size = ExportService._max_file_size(config)
+        cache = ExportService._open_cache(ctx, config, max_size)
+        truncated: list[int] = []
+
+        def write_shard(i: int) -> bool:
+            out = ExportService._open_output(ctx, paths[i], config.compress_level)
+            if out is None:
+                return False
+
+            contents = ExportService._profiled(ctx,
+                ExportService._load_files(plan, shards[i], max_size, cache))
+            lines = ExportService._shard_lines(fmt, i, len(shards), shards[i],
+                contents, structure if i == 0 else None, ndjson)
+            sink = OutputSink(str(paths[i]), out, config.export_max_size)
+            try:
+                ExportService._write_lines(out if sink.limit is None else TeeWriter([sink]),
+                    lines)
+            finally:
+                sink.close()
+            if sink.truncated:
+                truncated.append(i)
+                ctx.logger.log(Logger.WARNING,
+                    "Export to %s was cut off at %d bytes", sink.name, sink.limit)
+            ctx.profiler.count_file("bytes_written", paths[i])
+            return True
+
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_text("\n".join(lines), encoding="utf-8")
+        jobs = max(1, config.jobs or 1)
+        try:
+            if jobs > 1 and len(shards) > 1:
+                with ThreadPoolExecutor(max_workers=jobs) as pool:
+                    ok = all(list(pool.map(write_shard, range(len(shards)))))
+            else:
+                ok = all([write_shard(i) for i in range(len(shards))])
+        finally:
+            if cache is not None:
+                cache.save()
 
-        ctx.output_buffer.clear()
+        if not ok:
+            return
+
+        index = {
+            "shards": [
+                {
+                    "path": paths[i].name,
+                    "files": len(shard),
+                    "first": str(shard[0]) if shard else None,
+                    "last": str(shard[-1]) if shard else None,
+                }
+                for i, shard in enumerate(shards)
+            ],
+            "files": {str(fp): paths[i].name for i, shard in enumerate(shards) for fp in shard},
+        }
+        if config.changed_since:
+            index["deleted"] = plan["deleted"]
+
+        index_path = output_path.with_name(ExportService._split_name(output_path)[0] + ".index.json")
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+
+        # Files cut off from a shard were not exported, so the baseline stays
+        if truncated:
+            if plan["baseline"] is not None:
+                ctx.logger.log(Logger.WARNING, "The export was cut off, manifest %s "
+                    "was not updated", config.changed_since)
+        else:
+            ExportService._save_plan_baseline(ctx, config, plan)
+
+        ctx.logger.log(Logger.DEBUG, "Wrote %d export shards, index at %s", len(shards), index_path)
+
+
+    @staticmethod
+    def _split_shards(files: list[Path], max_bytes: int | None,
+        max_files: int | None) -> list[list[Path]]:
+        """
+        Split files into consecutive shards, starting a new shard whenever the next
+        file would exceed the byte budget (by its size on disk) or the file count.
+        A single file larger than the budget gets a shard of its own.
+
+        Returns:
+            list[list[Path]]: The shards, always at least one (possibly empty)
+        """
+        shards: list[list[Path]] = [[]]
+        shard_bytes = 0
+
+        for fp in files:
+            try:
+                size = fp.stat().st_size
+            except OSError:
+                size = 0
+
+            current = shards[-1]
+            if current and ((max_files and len(current) >= max_files)
+                or (max_bytes and shard_bytes + size > max_bytes)):
+                shards.append([])
+                shard_bytes = 0
+
+            shards[-1].append(fp)
+            shard_bytes += size
+
+        return shards
 
 
     @staticmethod
-    def _export_txt(ctx: AppContext, tree_data: dict[str, Any]) -> list[str]:
+    def _shard_lines(fmt: str, index: int, total: int, files: list[Path],
+        contents: Iterator[tuple[Path, dict[str, Any]]],
+        structure: list[str] | None, ndjson: bool = False) -> Iterator[str]:
+        """
+        Produce the lines of one shard: a header with the shard's file range,
+        the structure (first shard only), then the file sections. With ndjson,
+        a json shard is a header record followed by one record per file.
+        """
+
+        first = str(files[0]) if files else "-"
+        last = str(files[-1]) if files else "-"
+
+        if fmt == "json" and ndjson:
+            header = {"shard": index, "shards": total, "first": first, "last": last}
+            if structure is not None:
+                header["structure"] = structure
+            yield json.dumps(header, ensure_ascii=False)
+            for fp, content in contents:
+                yield ExportService._json_dump(ExportService._json_file_entry(fp, content))
+            yield ""        # Every record ends with a newline
+            return
+
+        if fmt == "json":
+            yield "{"
+            yield f'  "shard": {index},'
+            yield f'  "shards": {total},'
+            yield f'  "first": {json.dumps(first, ensure_ascii=False)},'
+            yield f'  "last": {json.dumps(last, ensure_ascii=False)},'
+            if structure is not None:
+                yield f'  "structure": {json.dumps(structure, ensure_ascii=False)},'
+            yield '  "files": ['
+            for i, (fp, content) in enumerate(contents):
+                entry = ExportService._json_dump(ExportService._json_file_entry(fp, content))
+                yield ExportService._json_wrap("    ", entry, "" if i == len(files) - 1 else ",")
+            yield "  ]"
+            yield "}"
+            return
+
+        if fmt == "md":
+            yield f"## Shard {index:03d} of {total:03d}"
+            yield ""
+            yield f"Files {len(files)}: `{first}` .. `{last}`"
+            yield ""
+            if structure is not None:
+                yield "## Project Structure"
+                yield from structure
+            yield "## Files"
+            yield ""
+            for fp, content in contents:
+                yield from ExportService._md_file_lines(fp, content)
+            return
+
+        yield f"==== SHARD {index:03d} of {total:03d} ===="
+        yield f"FILES {len(files)}: {first} .. {last}"
+        if structure is not None:
+            yield ""
+            yield from structure
+        yield ""
+        yield "==== FILE CONTENTS ===="
+        for fp, content in contents:
+            yield from ExportService._txt_file_lines(fp, content)
+
+
+    @staticmethod
+    def _split_name(path: Path) -> tuple[str, str]:
+        """
+        Split an export file name into its base and extension, keeping a
+        compression suffix together with the format suffix (out, .txt.gz).
+        """
+        name = path.name
+        suffixes = path.suffixes[-2:] if path.suffix.lower() in ExportService._COMPRESSION_SUFFIXES \
+            else path.suffixes[-1:]
+        ext = "".join(suffixes)
+        return name[:len(name) - len(ext)], ext
+
+
+    @staticmethod
+    def _is_ndjson(path: Path) -> bool:
+        """ Check if the export path asks for newline-delimited JSON (.ndjson / .jsonl) """
+        ext = ExportService._split_name(path)[1].lower()
+        return ext.startswith((".ndjson", ".jsonl"))
+
+
+    @staticmethod
+    def _shard_path(path: Path, index: int) -> Path:
+        """ Return the path of shard number index, e.g. out.md -> out.003.md """
+        base, ext = ExportService._split_name(path)
+        return path.with_name(f"{base}.{index:03d}{ext}")
+
+
+    @staticmethod
+    def _open_output(ctx: AppContext, path: Path, level: int | None) -> IO[str] | None:
+        """
+        Open the export file for writing text, compressing on the fly based on
+        its suffix (.gz, .bz2, .xz, or .zst if a zstd module is available).
+
+        Args:
+            ctx (AppContext): The application context
+            path (Path): The export file path
+            level (int | None): Compression level, or None for the format's default
+
+        Returns:
+            IO[str] | None: A writable text stream, or None if the format is
+                unavailable or the level is out of its range
+        """
+
+        suffix = path.suffix.lower()
+
+        # Checked at parse time for the CLI, but config.json is not
+        levels = compress_levels(suffix)
+        if level is not None and levels and not levels[0] <= level <= levels[1]:
+            ctx.logger.log(Logger.ERROR, "Compression level %d is not in %d..%d for %s",
+                level, levels[0], levels[1], path)
+            return None
+
+        if suffix == ".gz":
+            import gzip
+            return gzip.open(path, "wt", encoding="utf-8",
+                compresslevel=6 if level is None else level)
+
+        if suffix == ".bz2":
+            import bz2
+            return bz2.open(path, "wt", encoding="utf-8",
+                compresslevel=9 if level is None else level)
+
+        if suffix == ".xz":
+            import lzma
+            return lzma.open(path, "wt", encoding="utf-8",
+                preset=6 if level is None else level)
+
+        if suffix == ".zst":
+            level = 3 if level is None else level
+            try:
+                from compression import zstd        # Python 3.14+
+                return zstd.open(path, "wt", encoding="utf-8", level=level)
+            except ImportError:
+                pass
+            try:
+                import zstandard
+            except ImportError:
+                ctx.logger.log(Logger.ERROR,
+                    "Exporting to .zst requires Python 3.14+ or the 'zstandard' package")
+                return None
+            writer = zstandard.ZstdCompressor(level=level).stream_writer(open(path, "wb"))
+            return io.TextIOWrapper(writer, encoding="utf-8")
+
+        return open(path, "w", encoding="utf-8")
+
+
+    @staticmethod
+    def _export_txt(ctx: AppContext, config: Config, plan: dict[str, Any]) -> Iterator[str]:
         structure = ctx.output_buffer.get_value()
-        out: list[str] = []
 
-        out.extend(structure)
-        out.append("")
-        out.append("==== FILE CONTENTS ====")
+        yield from structure
+        yield ""
+        yield "==== FILE CONTENTS ===="
 
-        for fp in ExportService._iter_files(tree_data):
-            out.append("")
-            out.append(f"FILE: {fp}")
-            out.append("-" * (6 + len(str(fp))))
-            out.append(ExportService._read_text(fp).rstrip("\n"))
+        for fp, content in ExportService._iter_contents(ctx, config, plan):
+            yield from ExportService._txt_file_lines(fp, content)
 
-        return out
+        if plan["deleted"]:
+            yield ""
+            yield "==== DELETED FILES ===="
+            yield ""
+            yield from plan["deleted"]
 
 
     @staticmethod
-    def _export_md(ctx: AppContext, tree_data: dict[str, Any]) -> list[str]:
+    def _export_md(ctx: AppContext, config: Config, plan: dict[str, Any]) -> Iterator[str]:
         structure = ctx.output_buffer.get_value()
-        out: list[str] = []
 
-        out.append("## Project Structure")
-        out.extend(structure)       # Assuming structure is already in md format
-        out.append("## Files")
-        out.append("")
+        yield "## Project Structure"
+        yield from structure        # Assuming structure is already in md format
+        yield "## Files"
+        yield ""
 
-        for fp in ExportService._iter_files(tree_data):
-            out.append(f"### File: {fp}")
-            out.append("")
-            out.append("```text")
-            out.append(ExportService._read_text(fp).rstrip("\n"))
-            out.append("```")
-            out.append("")
+        for fp, content in ExportService._iter_contents(ctx, config, plan):
+            yield from ExportService._md_file_lines(fp, content)
 
-        return out
+        if plan["deleted"]:
+            yield "## Deleted Files"
+            yield ""
+            yield from (f"- {rel}" for rel in plan["deleted"])
 
 
     @staticmethod
-    def _export_json(ctx: AppContext, tree_data: dict[str, Any]) -> list[str]:
-        import json
+    def _export_json(ctx: AppContext, config: Config, plan: dict[str, Any]) -> Iterator[str]:
+        """
+        Stream the JSON export one file object at a time, so the payload is never
+        held in memory as a whole. The output matches json.dumps(payload, indent=2).
+        """
+        structure = ctx.output_buffer.get_value()
+        entries = (
+            ExportService._json_file_entry(fp, content)
+            for fp, content in ExportService._iter_contents(ctx, config, plan)
+        )
+        has_deleted = bool(config.changed_since)
+
+        yield "{"
+        yield f'  "structure": {ExportService._json_indented(structure, 2)},'
+        yield from ExportService._json_array_lines("files", entries, last=not has_deleted)
+        if has_deleted:
+            yield from ExportService._json_array_lines("deleted", iter(plan["deleted"]), last=True)
+        yield "}"
+
 
+    @staticmethod
+    def _export_ndjson(ctx: AppContext, config: Config, plan: dict[str, Any]) -> Iterator[str]:
+        """
+        Stream the JSON export as newline-delimited JSON: a {"structure": ...} record,
+        one record per file, and a {"deleted": ...} record with --changed-since.
+        """
         structure = ctx.output_buffer.get_value()
 
-        files = [
-            {
-                "path": str(fp),
-                "content": ExportService._read_text(fp),
-            }
-            for fp in ExportService._iter_files(tree_data)
-        ]
-
-        payload = {
-            "structure": structure,
-            "files": files,
-        }
+        yield json.dumps({"structure": structure}, ensure_ascii=False)
+        for fp, content in ExportService._iter_contents(ctx, config, plan):
+            yield ExportService._json_dump(ExportService._json_file_entry(fp, content))
+        if config.changed_since:
+            yield json.dumps({"deleted": plan["deleted"]}, ensure_ascii=False)
+        yield ""        # Every record ends with a newline
+
+
+    @staticmethod
+    def _json_array_lines(key: str, items: Iterator[Any], last: bool) -> Iterator[str]:
+        """
+        Produce the lines of a top-level "key": [...] member one item at a time,
+        formatted the same way as json.dumps(..., indent=2).
+
+        Args:
+            key (str): The member name
+            items (Iterator[Any]): The JSON-serializable array items
+            last (bool): Whether this is the last member of the object (no comma)
+        """
+        comma = "" if last else ","
+
+        prev = next(items, None)
+        if prev is None:
+            yield f'  "{key}": []{comma}'
+            return
 
-        return [json.dumps(payload, indent=2, ensure_ascii=False)]
+        yield f'  "{key}": ['
+        for item in items:
+            yield ExportService._json_wrap("    ", ExportService._json_dump(prev, 4), ",")
+            prev = item
+        yield ExportService._json_wrap("    ", ExportService._json_dump(prev, 4), "")
+        yield f"  ]{comma}"
+
+
+    @staticmethod
+    def _json_indented(value: Any, level: int) -> str:
+        """ Dump a value with indent=2, nested by level spaces """
+        # Newlines inside strings are escaped by json, so this only hits structure
+        return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + " " * level)
+
+
+    @staticmethod
+    def _json_dump(value: Any, level: int | None = None) -> str | Iterator[str]:
+        """
+        Dump a value on one line, or with indent=2 nested by level spaces. A file
+        object whose content is a MappedFile is dumped as pieces, with the content
+        escaped slice by slice instead of as one string.
+        """
+        def dump(v: Any) -> str:
+            if level is None:
+                return json.dumps(v, ensure_ascii=False)
+            return ExportService._json_indented(v, level)
+
+        content = value.get("content") if isinstance(value, dict) else None
+        if not isinstance(content, MappedFile):
+            return dump(value)
+
+        marker = json.dumps(ExportService._JSON_MARKER)
+        head, tail = dump({**value, "content": ExportService._JSON_MARKER}).split(marker, 1)
+        return chain((head, '"'), content.iter_json(), ('"', tail))
+
+
+    @staticmethod
+    def _json_wrap(prefix: str, dumped: str | Iterator[str], suffix: str) -> str | Iterator[str]:
+        """ Surround a value from _json_dump with a prefix and suffix """
+        if isinstance(dumped, str):
+            return f"{prefix}{dumped}{suffix}"
+        return chain((prefix,), dumped, (suffix,))
+
+
+    @staticmethod
+    def _txt_file_lines(fp: Path, content: dict[str, Any]) -> Iterator[str]:
+        """ Produce the lines of one file section in the txt export """
+        header = f"FILE: {fp}"
+        if "status" in content:
+            header += f" ({content['status']})"
+        yield ""
+        yield header
+        yield "-" * len(header)
+        if "ref" in content:
+            yield f"[same contents as: {content['ref']}]"
+        else:
+            yield ExportService._content_body(fp, content, strip_newlines=True)
+
+
+    @staticmethod
+    def _md_file_lines(fp: Path, content: dict[str, Any]) -> Iterator[str]:
+        """ Produce the lines of one file section in the md export """
+        if "status" in content:
+            yield f"### File: {fp} ({content['status']})"
+        else:
+            yield f"### File: {fp}"
+        yield ""
+        if "ref" in content:
+            yield f"_Same contents as `{content['ref']}`_"
+            yield ""
+            return
+        yield "```text"
+        yield ExportService._content_body(fp, content, strip_newlines=True)
+        yield "```"
+        yield ""
+
+
+    @staticmethod
+    def _json_file_entry(fp: Path, content: dict[str, Any]) -> dict[str, Any]:
+        """
+        Build the JSON object for one exported file.
+
+        Args:
+            fp (Path): The file path
+            content (dict[str, Any]): The content dict from _iter_contents
+
+        Returns:
+            dict[str, Any]: The file object written under "files"
+        """
+        entry: dict[str, Any] = {"path": str(fp)}
+        if "status" in content:
+            entry["status"] = content["status"]
+
+        if "ref" in content:
+            entry["content_ref"] = str(content["ref"])
+            return entry
+
+        entry["content"] = ExportService._content_body(fp, content, strip_newlines=False)
+        if content["encoding"]:
+            entry["encoding"] = content["encoding"]
+        if content["binary"]:
+            entry["binary"] = True
+        if content["truncated"]:
+            entry["truncated"] = True
+        return entry
+
+
+    @staticmethod
+    def _plan(ctx: AppContext, config: Config, tree_data: dict[str, Any]) -> dict[str, Any]:
+        """
+        Decide which files of the tree to export.
+
+        Without --changed-since every file is exported. With it, the tree is compared
+        against the baseline manifest and only added or modified files are exported.
+
+        Args:
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            tree_data (dict[str, Any]): The resolved tree dict
+
+        Returns:
+            dict[str, Any]: "files" to export, their "status" (added/modified), the
+                "deleted" relative paths, the updated "baseline" to save (or None),
+                and "refs" from duplicate files to their first copy
+        """
+
+        files = ExportService._iter_files(tree_data)
+        plan: dict[str, Any] = {"files": files, "status": {}, "deleted": [],
+            "baseline": None, "refs": {}}
+
+        if config.changed_since:
+            ExportService._plan_changed(ctx, config, tree_data, plan)
+
+        if config.export_dedup:
+            plan["refs"] = ExportService._content_refs(plan["files"])
+        return plan
+
+
+    @staticmethod
+    def _plan_changed(ctx: AppContext, config: Config, tree_data: dict[str, Any],
+        plan: dict[str, Any]) -> None:
+        """
+        Narrow the plan down to files added or modified since the --changed-since
+        manifest, recording their status, the deleted paths and the new manifest.
+        """
+
+        old = ExportService._load_baseline(ctx, Path(config.changed_since))
+        new: dict[str, dict[str, Any]] = {}
+        changed: list[Path] = []
+
+        for item in TreeManifest.of(tree_data).files():
+            fp, rel = item.path, item.rel
+            try:
+                st = os.stat(fp)
+            except OSError:
+                continue
+
+            prev = old.get(rel)
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+            # Unchanged size and mtime: trust the baseline without reading the file
+            if prev and prev.get("size") == entry["size"] \
+                and prev.get("mtime_ns") == entry["mtime_ns"]:
+                new[rel] = prev
+                continue
+
+            digest = ExportService._full_hash(fp)
+            entry["hash"] = digest.hex() if digest is not None else ""
+            new[rel] = entry
+
+            # An entry without a hash (e.g. edited by hand) counts as modified
+            if prev and prev.get("hash") == entry["hash"]:
+                continue        # Only touched, contents are the same
+
+            changed.append(fp)
+            plan["status"][fp] = "modified" if prev else "added"
+
+        plan["files"] = changed
+        plan["deleted"] = sorted(rel for rel in old if rel not in new)
+        plan["baseline"] = new
+
+        ctx.logger.log(Logger.DEBUG, "Changed since baseline: %d changed, %d deleted, "
+            "%d unchanged", len(changed), len(plan["deleted"]), len(new) - len(changed))
+
+
+    @staticmethod
+    def _load_baseline(ctx: AppContext, path: Path) -> dict[str, dict[str, Any]]:
+        """
+        Load a manifest written by a previous --changed-since run.
+
+        Args:
+            ctx (AppContext): The application context
+            path (Path): Path of the manifest file
+
+        Returns:
+            dict[str, dict[str, Any]]: Relative posix path -> size, mtime_ns and hash.
+                Empty if the manifest does not exist yet or cannot be read.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["files"]
+        except FileNotFoundError:
+            ctx.logger.log(Logger.INFO,
+                "No manifest found at %s, exporting all files as added", path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            ctx.logger.log(Logger.WARNING, "Ignoring unreadable manifest %s: %s", path, e)
+
+        return {}
+
+
+    @staticmethod
+    def _save_plan_baseline(ctx: AppContext, config: Config, plan: dict[str, Any]) -> None:
+        """ Save the updated manifest of a plan, once its export has been written in full """
+        if plan["baseline"] is not None:
+            ExportService._save_baseline(ctx, Path(config.changed_since), plan["baseline"])
+
+
+    @staticmethod
+    def _save_baseline(ctx: AppContext, path: Path, files: dict[str, dict[str, Any]]) -> None:
+        """
+        Write the updated manifest for the next --changed-since run.
+
+        Args:
+            ctx (AppContext): The application context
+            path (Path): Path of the manifest file
+            files (dict[str, dict[str, Any]]): Relative posix path -> size, mtime_ns and hash
+        """
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "files": files}, f, indent=2)
+        except OSError as e:
+            ctx.logger.log(Logger.ERROR, "Could not write manifest %s: %s", path, e)
+
+
+    @staticmethod
+    def _iter_contents(ctx: AppContext, config: Config,
+        plan: dict[str, Any]) -> Iterator[tuple[Path, dict[str, Any]]]:
+        """
+        Yield every file of the export plan along with its loaded content.
+
+        The content is a dict with "text", "binary", "truncated", "size" and
+        "encoding" keys, or {"ref": first_path} for a duplicate when --export-dedup
+        is used, plus a "status" key when --changed-since is used. Contents are served from the
+        persistent cache when --export-cache is used.
+
+        Args:
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            plan (dict[str, Any]): The export plan from _plan
+
+        Yields:
+            tuple[Path, dict[str, Any]]: The file path and its content dict
+        """
+
+        max_size = ExportService._max_file_size(config)
+        cache = ExportService._open_cache(ctx, config, max_size)
+
+        try:
+            yield from ExportService._profiled(ctx,
+                ExportService._load_files(plan, plan["files"], max_size, cache))
+        finally:
+            if cache is not None:
+                cache.save()
+
+
+    @staticmethod
+    def _load_files(plan: dict[str, Any], files: list[Path], max_size: int | None,
+        cache: ContentCache | None) -> Iterator[tuple[Path, dict[str, Any]]]:
+        """
+        Yield the given files of the plan along with their content dicts
+        (see _iter_contents).
+        """
+        refs = plan["refs"]
+        status = plan["status"]
+
+        for fp in files:
+            if fp in refs:
+                content = {"ref": refs[fp]}
+            else:
+                content = ExportService._load_content(fp, max_size, cache)
+
+            if fp in status:
+                content = {**content, "status": status[fp]}
+            yield fp, content
+
+
+    @staticmethod
+    def _profiled(ctx: AppContext, contents: Iterator[tuple[Path, dict[str, Any]]]
+        ) -> Iterator[tuple[Path, dict[str, Any]]]:
+        """
+        Pass the loaded contents through, timing their loading as the
+        content_read phase and counting the bytes read.
+        """
+        profiler = ctx.profiler
+        for fp, content in profiler.timed("content_read", contents):
+            if "size" in content and not content["truncated"]:
+                profiler.count("bytes_read", content["size"])
+            yield fp, content
+
+
+    @staticmethod
+    def _open_cache(ctx: AppContext, config: Config,
+        max_size: int | None) -> ContentCache | None:
+        """ Return the persistent content cache if --export-cache is used """
+        if not config.export_cache:
+            return None
+
+        return ContentCache(ctx, Path(ExportService._CACHE_PATH),
+            max_bytes=config.export_cache_size,
+            max_file_size=max_size)
+
+
+    @staticmethod
+    def _max_file_size(config: Config) -> int | None:
+        """ Return --max-file-size in bytes, or None if there is no limit """
+        return config.max_file_size or None
+
+
+    @staticmethod
+    def _content_body(fp: Path, content: dict[str, Any],
+        strip_newlines: bool) -> str | MappedFile:
+        """
+        Return the contents to export for a content dict, replacing the contents of
+        binary and too-large files with a short marker. Large files are returned as
+        a MappedFile that is only read while being written out.
+
+        Args:
+            fp (Path): The file path
+            content (dict[str, Any]): The content dict from _iter_contents
+            strip_newlines (bool): Drop trailing newlines from the contents
+        """
+        if content["binary"]:
+            return "[binary file]"
+        if content["truncated"]:
+            return f"[file too large: {content['size'] / (1024 * 1024):.2f}mb]"
+        if content.get("mapped"):
+            return MappedFile(fp, content["encoding"], strip_newlines=strip_newlines)
+        return content["text"].rstrip("\n") if strip_newlines else content["text"]
 
 
     @staticmethod
     def _iter_files(tree_data: Any) -> list[Path]:
         """
-        Flatten the resolved tree dict into a list of file Paths.
+        List the file Paths of the resolved tree dict, in tree order.
 
         Args:
             tree_data (Any): A resolved tree dict with "self" and "children"
@@ -117,40 +943,203 @@ class ExportService:
 
         if not isinstance(tree_data, dict):
             return []
+        return [entry.path for entry in TreeManifest.of(tree_data).files()]
 
-        out: list[Path] = []
 
-        def rec(node: dict[str, Any]) -> None:
-            for child in node.get("children", []):
-                if isinstance(child, dict):
-                    rec(child)
+    @staticmethod
+    def _content_refs(files: list[Path]) -> dict[Path, Path]:
+        """
+        Find files whose contents are byte-identical to an earlier file in the list.
+
+        Files are grouped by size first, then by a crc32 of their first block,
+        and only the candidates left after that are hashed in full. Empty files
+        are never deduplicated.
+
+        Args:
+            files (list[Path]): File paths in export order
+
+        Returns:
+            dict[Path, Path]: Duplicate file -> first file with the same contents
+        """
+
+        by_size: dict[int, list[Path]] = defaultdict(list)
+        for fp in files:
+            try:
+                size = fp.stat().st_size
+            except OSError:
+                continue
+            if size > 0:
+                by_size[size].append(fp)
+
+        refs: dict[Path, Path] = {}
+        for size, group in by_size.items():
+            if len(group) < 2:
+                continue
+
+            for same_head in ExportService._group_by(group, ExportService._head_hash):
+                # The head block already covers the whole file for small files
+                if size <= ExportService._HASH_BLOCK:
+                    same_groups = [same_head]
                 else:
-                    p = child if isinstance(child, Path) else Path(str(child))
-                    out.append(p)
+                    same_groups = ExportService._group_by(same_head, ExportService._full_hash)
+
+                for same in same_groups:
+                    for dup in same[1:]:
+                        refs[dup] = same[0]
+
+        return refs
+
+
+    @staticmethod
+    def _group_by(files: list[Path], key: Callable[[Path], Any]) -> list[list[Path]]:
+        """
+        Group files by a key function, keeping only groups with more than one file.
+        Files for which the key is None (unreadable) are dropped.
+        """
+        groups: dict[Any, list[Path]] = defaultdict(list)
+        for fp in files:
+            k = key(fp)
+            if k is not None:
+                groups[k].append(fp)
+
+        return [g for g in groups.values() if len(g) > 1]
+
 
-        rec(tree_data)
-        return out
+    @staticmethod
+    def _head_hash(path: Path) -> int | None:
+        """ Return a crc32 of the first block of the file, or None if unreadable """
+        try:
+            with open(path, "rb") as f:
+                return zlib.crc32(f.read(ExportService._HASH_BLOCK))
+        except OSError:
+            return None
+
+
+    @staticmethod
+    def _full_hash(path: Path) -> bytes | None:
+        """ Return a blake2b digest of the whole file, or None if unreadable """
+        h = hashlib.blake2b(digest_size=16)
+        try:
+            with open(path, "rb") as f:
+                while block := f.read(ExportService._HASH_BLOCK):
+                    h.update(block)
+        except OSError:
+            return None
+
+        return h.digest()
+
+
+    @staticmethod
+    def _load_content(path: Path, max_size: int | None,
+        cache: ContentCache | None) -> dict[str, Any]:
+        """
+        Load and classify a file's content, going through the cache if given.
+
+        Args:
+            path (Path): The file path to read
+            max_size (int | None): Files larger than this are not read
+            cache (ContentCache | None): The persistent content cache, if enabled
+
+        Returns:
+            dict[str, Any]: The content dict (see _iter_contents)
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return {"text": "", "binary": False, "truncated": False, "size": 0}
+
+        if cache is not None:
+            cached = cache.get(path, st)
+            if cached is not None:
+                return cached
+
+        content = ExportService._read_content(path, st.st_size, max_size)
+
+        # Mapped contents are read at write time, so there is nothing to cache
+        if cache is not None and not content.get("mapped"):
+            cache.put(path, st, content)
+        return content
 
 
     @staticmethod
-    def _read_text(path: Path) -> str:
+    def _read_content(path: Path, size: int, max_size: int | None) -> dict[str, Any]:
         """
-        Read a file as text safely.
+        Read a file safely and classify it as text, binary or too large.
 
         Args:
             path (Path): The file path to read
+            size (int): The file size from stat
+            max_size (int | None): Files larger than this are not read
 
         Returns:
-            str: File content decoded as text
+            dict[str, Any]: The content dict (see _iter_contents)
         """
-        p = path if isinstance(path, Path) else Path(str(path))
+        content = {"text": "", "binary": False, "truncated": False, "size": size,
+            "encoding": None}
+
+        if max_size is not None and size > max_size:
+            content["truncated"] = True
+            return content
+
         try:
-            return p.read_text(encoding="utf-8", errors="ignore")
+            with open(path, "rb") as f:
+                if size < ExportService._MMAP_THRESHOLD:
+                    decoded = decode_bytes(f.read())
+                else:
+                    # One byte past the sniffing window, so a character cut off
+                    # at its end is not mistaken for invalid UTF-8
+                    encoding = sniff_encoding(f.read(SNIFF_SIZE + 1))
+                    mapped = encoding in MappedFile.ENCODINGS
+                    # Only the prefix was sniffed, so UTF-8 is checked in full:
+                    # invalid files are decoded like small ones instead
+                    if encoding in ("utf-8", "utf-8-sig"):
+                        f.seek(len(codecs.BOM_UTF8) if encoding == "utf-8-sig" else 0)
+                        mapped = ExportService._is_utf8(f)
+
+                    if mapped:
+                        content["mapped"] = True
+                        content["encoding"] = encoding
+                        return content
+
+                    f.seek(0)
+                    decoded = None if encoding is None else ExportService._decode_mapped(f)
         except Exception:
-            try:
-                return p.read_bytes().decode("utf-8", errors="ignore")
-            except Exception:
-                return ""
+            return content
+
+        if decoded is None:
+            content["binary"] = True
+        else:
+            content["text"], content["encoding"] = decoded
+
+        return content
+
+
+    @staticmethod
+    def _is_utf8(f: BinaryIO) -> bool:
+        """ Tell if the rest of a file is valid UTF-8, reading it in bounded chunks """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            while chunk := f.read(MappedFile.CHUNK_SIZE):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+        return True
+
+
+    @staticmethod
+    def _decode_mapped(f: BinaryIO) -> tuple[str, str] | None:
+        """
+        Decode a large file straight from a memory map, avoiding an intermediate
+        bytes copy. Falls back to a plain read for files that cannot be mapped.
+        """
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return decode_bytes(f.read())
+
+        with mm, memoryview(mm) as view:
+            return decode_bytes(view)
 
 
     @staticmethod
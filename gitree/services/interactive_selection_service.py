@@ -1,13 +1,15 @@
-# gitree/services/drawing_service.py
+# gitree/services/interactive_selection_service.py
 
 """
 Code file for housing InteractiveSelectionService Class
 """
 
 # Defualt libs
+import asyncio
 from pathlib import Path
-from typing import Any, Dict, List, Set, Tuple
-from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Dependencies
 from prompt_toolkit.application import Application
@@ -15,92 +17,304 @@ from prompt_toolkit.layout import Layout
 from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.layout.containers import Window, HSplit
 from prompt_toolkit.key_binding import KeyBindings
+from prompt_toolkit.filters import Condition
 from prompt_toolkit.formatted_text import StyleAndTextTuples
 from prompt_toolkit.styles import Style
 
 # Deps from this project
 from ..objects.app_context import AppContext
 from ..objects.config import Config
+from ..objects.search_index import SearchIndex
+from ..objects.selection_tree import SelectionTree
+from ..objects.tree_manifest import ManifestEntry, TreeManifest
+from ..services.resolve_items_service import ResolveItemsService
+from ..utilities.gitignore_utility import GitIgnoreMatcher
+from ..utilities.logging_utility import Logger
+from ..utilities.tree_control_utility import TreeListControl
 
 
 class InteractiveSelectionService:
+
+    # Dirs listed per step of the background listing that feeds the search
+    _INDEX_BATCH = 64
+
+
     @staticmethod
-    def run(ctx: AppContext, config: Config, resolved_root: Dict[str, Any]) -> Dict[str, Any]:
+    def run(ctx: AppContext, config: Config) -> Dict[str, Any]:
         """
-        Launch an interactive terminal UI for selecting files under the given resolved root dict.
+        Launch an interactive terminal UI for selecting files under the resolved root.
 
-        The UI presents a hierarchical tree of directories and files. Users can:
+        The UI presents a hierarchical tree of directories and files. Directories
+        start collapsed and are listed only when expanded, in a background thread,
+        with the same filtering as ResolveItemsService. Users can:
         - Navigate using ↑ / ↓
+        - Expand or collapse a directory using → / ←
         - Select or deselect items using Space
-        - Select a directory to recursively select all contents
+        - Search all the paths with /, which lists the dirs that were never
+          expanded in the background
+        - Select a directory to recursively select all contents, even if it
+          was never expanded (it is then resolved on confirm)
         - Refine the selection by deselecting individual files
         - Confirm with Enter or exit with Ctrl+C
 
         Args:
             ctx (AppContext): The application context
             config (Config): The application configuration
-            resolved_root (dict): A resolved root dict with "self" as a Path and "children" as nested items
 
         Returns:
-            dict: The updated resolved root dict in the same format as the input
+            dict: A resolved root dict of the selected items, in the format
+                returned by ResolveItemsService.resolve_items
         """
-        from prompt_toolkit.data_structures import Point
-
-        tree: List[dict] = []
-        folder_to_files: Dict[int, List[int]] = defaultdict(list)
-        folder_to_subdirs: Dict[int, List[int]] = defaultdict(list)
-
-        root_path = resolved_root.get("self")
-        if not isinstance(root_path, Path):
-            root_path = Path(str(root_path))
-
-        InteractiveSelectionService._build_tree(
-            resolved_root=resolved_root,
-            root=root_path,
-            depth=0,
-            tree=tree,
-            folder_to_files=folder_to_files,
-            folder_to_subdirs=folder_to_subdirs,
-        )
 
-        if not tree:
-            return resolved_root
+        scope = ResolveItemsService.resolve_scope(ctx, config)
+        if not scope:
+            return {}
+
+        root = InteractiveSelectionService._make_row(scope["root"], "(root)", "dir", 0, GitIgnoreMatcher())
+        root["expanded"] = True
+
+        # Checked state of every listed row, and the index of their paths for
+        # the "/" search
+        selection = SelectionTree(root)
+        search_index = SearchIndex()
+        InteractiveSelectionService._apply_children(selection, search_index, root,
+            *InteractiveSelectionService._list_rows(ctx, config, scope, root))
+
+        # The visible rows of the tree, in render order. While searching, the
+        # control shows the matches (with their dirs) instead
+        tree: List[dict] = [root] + InteractiveSelectionService._visible_rows(root)
 
         cursor = 0
 
-        def toggle_dir(index: int, state: bool):
+        # The search query (None when not searching), the matching rows, and
+        # the cursor to go back to
+        query: str | None = None
+        matches: List[dict] = []
+        tree_cursor = 0
+        searching = Condition(lambda: query is not None)
+
+        # Whether the search's background listing of all dirs runs, and is done
+        indexing = False
+        indexed = False
+
+        # Dirs are listed one at a time off the UI thread
+        executor = ThreadPoolExecutor(max_workers=1)
+
+        def show(row: dict, children: List[dict], matcher: GitIgnoreMatcher):
+            """
+            Attach the listed rows of a directory, and show them if it is
+            expanded and visible.
+
+            Args:
+                row (dict): The directory row
+                children (list[dict]): Its rows, from _list_rows
+                matcher (GitIgnoreMatcher): Its matcher, from _list_rows
             """
-            Recursively toggle a directory and all its contents.
+            InteractiveSelectionService._apply_children(selection, search_index, row, children, matcher)
+
+            if row["expanded"]:
+                index = InteractiveSelectionService._row_index(tree, row)
+                if index is not None:
+                    tree[index + 1:index + 1] = InteractiveSelectionService._visible_rows(row)
 
-            This updates:
-            - The directory itself
-            - All files under it
-            - All nested subdirectories and their files
+        async def load(row: dict):
+            """
+            List a directory in the background, then show its rows if it is
+            still expanded and visible.
 
             Args:
-                index (int): The index of the directory in the flat UI tree
-                state (bool): The new checked state to apply
+                row (dict): The directory row to list
             """
-            tree[index]["checked"] = state
-            for f in folder_to_files.get(index, []):
-                tree[f]["checked"] = state
-            for d in folder_to_subdirs.get(index, []):
-                toggle_dir(d, state)
+            loop = asyncio.get_running_loop()
+            children, matcher = await loop.run_in_executor(executor,
+                InteractiveSelectionService._list_rows, ctx, config, scope, row)
+
+            # The search's listing may have got to it first
+            if row["children"] is None:
+                show(row, children, matcher)
+
+            # The new rows may match the current search
+            if query is not None:
+                search(move_cursor=False)
+
+            tree_control.invalidate()
+            app.invalidate()
+
+        def list_batch(rows: List[dict]) -> List[Tuple[List[dict], GitIgnoreMatcher]]:
+            """ List several directories, in the background thread """
+            return [InteractiveSelectionService._list_rows(ctx, config, scope, row) for row in rows]
+
+        async def index():
+            """
+            List every directory that was never expanded in the background,
+            breadth first and a batch at a time, so the search covers the
+            whole tree. The rows stay collapsed.
+            """
+            nonlocal indexed
+            loop = asyncio.get_running_loop()
+            pending = deque([root])
+
+            while pending:
+                batch: List[dict] = []
+                while pending and len(batch) < InteractiveSelectionService._INDEX_BATCH:
+                    row = pending.popleft()
+                    if row["children"] is None:
+                        batch.append(row)
+                    else:
+                        pending.extend(child for child in row["children"] if child["type"] == "dir")
+                if not batch:
+                    break
+
+                listings = await loop.run_in_executor(executor, list_batch, batch)
+                for row, (children, matcher) in zip(batch, listings):
+                    if row["children"] is None:
+                        show(row, children, matcher)
+                    pending.extend(child for child in row["children"] if child["type"] == "dir")
+
+                if query is not None:
+                    search(move_cursor=False)
+                tree_control.invalidate()
+                app.invalidate()
+
+            indexed = True
+            app.invalidate()
+
+        def expand(index: int):
+            """
+            Expand a directory row, listing it first if needed.
+
+            Args:
+                index (int): The index of the directory in the visible rows
+            """
+            row = tree[index]
+            if row["type"] != "dir" or row["expanded"]:
+                return
+
+            row["expanded"] = True
+            if row["children"] is None:
+                if not row["loading"]:
+                    row["loading"] = True
+                    app.create_background_task(load(row))
+            else:
+                tree[index + 1:index + 1] = InteractiveSelectionService._visible_rows(row)
+
+            tree_control.invalidate()
+
+        def collapse(index: int) -> int:
+            """
+            Collapse a directory row, or go to the parent of any other row.
+
+            Args:
+                index (int): The index of the row in the visible rows
+
+            Returns:
+                int: The index of the row the cursor should move to
+            """
+            row = tree[index]
+            if row["type"] != "dir" or not row["expanded"]:
+                return InteractiveSelectionService._parent_index(tree, index)
+
+            row["expanded"] = False
+            end = index + 1
+            while end < len(tree) and tree[end]["depth"] > row["depth"]:
+                end += 1
+            del tree[index + 1:end]
+
+            tree_control.invalidate()
+            return index
+
+        def search(move_cursor: bool = True):
+            """
+            Show the rows matching the query, with the dirs above them. The
+            full tree is shown for an empty query.
+
+            Args:
+                move_cursor (bool): Whether to move the cursor to the first match
+            """
+            nonlocal cursor, matches
+            ids = search_index.search(query)
+
+            if ids is None:
+                matches = []
+                tree_control.rows = tree
+            else:
+                matches = [search_index.rows[i] for i in ids]
+                tree_control.rows = InteractiveSelectionService._with_ancestors(matches)
+
+            if move_cursor:
+                first_match = min(matches, key=lambda row: row["key"]) if matches else None
+                first = InteractiveSelectionService._row_index(tree_control.rows, first_match) if matches else None
+                cursor = first if first is not None else 0
+            cursor = max(0, min(cursor, len(tree_control.rows) - 1))
+            tree_control.invalidate()
+
+        def end_search(reveal: bool):
+            """
+            Leave the search and show the tree again.
+
+            Args:
+                reveal (bool): Whether to expand the dirs above the cursor row and
+                    move to it, instead of going back to where the search started
+            """
+            nonlocal query, matches, cursor
+            row = tree_control.rows[cursor] if reveal and tree_control.rows else None
+
+            query = None
+            matches = []
+            tree_control.rows = tree
+
+            if row is None:
+                cursor = tree_cursor
+            else:
+                parent = row["parent"]
+                while parent is not None:
+                    parent["expanded"] = True
+                    parent = parent["parent"]
+                tree[:] = [root] + InteractiveSelectionService._visible_rows(root)
+                cursor = InteractiveSelectionService._row_index(tree, row) or 0
+
+            tree_control.invalidate()
 
         def render_header() -> StyleAndTextTuples:
             """
-            Render the fixed instruction bar at the top of the UI.
+            Render the fixed instruction bar at the top of the UI, or the search
+            query and its hints while searching.
 
             Returns:
                 StyleAndTextTuples: The formatted text tuples for the header bar
             """
+            if query is not None:
+                return [
+                    ("", f"/{query}"),
+                    ("class:hint", f"   ({len(matches)} matches{'' if indexed else ', listing…'})"
+                        if query.strip() else ""),
+                    ("class:hint", "   |   "),
+                    ("class:hint", "Tab "),
+                    ("class:hint", "Toggle"),
+                    ("class:hint", "   |   "),
+                    ("class:hint", "Ctrl+A "),
+                    ("class:hint", "Toggle all matches"),
+                    ("class:hint", "   |   "),
+                    ("class:hint", "Enter "),
+                    ("class:hint", "Go to"),
+                    ("class:hint", "   |   "),
+                    ("class:hint", "Esc "),
+                    ("class:hint", "Back\n"),
+                ]
+
             return [
                 ("class:hint", "↑/↓ "),
                 ("class:hint", "Move"),
                 ("class:hint", "   |   "),
+                ("class:hint", "→/← "),
+                ("class:hint", "Expand/Collapse"),
+                ("class:hint", "   |   "),
                 ("class:hint", "Space "),
                 ("class:hint", "Toggle"),
                 ("class:hint", "   |   "),
+                ("class:hint", "/ "),
+                ("class:hint", "Search"),
+                ("class:hint", "   |   "),
                 ("class:hint", "Enter "),
                 ("class:hint", "Confirm"),
                 ("class:hint", "   |   "),
@@ -108,81 +322,101 @@ class InteractiveSelectionService:
                 ("class:hint", "Exit\n"),
             ]
 
-        def render_tree() -> StyleAndTextTuples:
-            """
-            Render the file/directory tree with indentation and selection markers.
-
-            Returns:
-                StyleAndTextTuples: The formatted text tuples representing the tree view
-            """
-            lines: StyleAndTextTuples = []
-
-            for i, item in enumerate(tree):
-                indent = "  " * item["depth"]
-
-                if item["checked"]:
-                    star = ("class:star", "[ ✓ ] ")
-                else:
-                    star = ("", "[ ] ")
-
-                label = item["path"].split("/")[-1]
-                if item["type"] == "dir":
-                    label += "/"
-
-                cursor_style = "class:cursor" if i == cursor else ""
-
-                lines.append((cursor_style, indent))
-                lines.append(star)
-                lines.append((cursor_style, label + "\n"))
-
-            return lines
-
-        tree_control = FormattedTextControl(render_tree, focusable=True, show_cursor=False)
+        # Only the rows inside the window's viewport are formatted on redraw
+        tree_control = TreeListControl(tree, get_cursor=lambda: cursor, get_state=selection.state)
 
         tree_window = Window(
             tree_control,
             always_hide_cursor=True,
         )
 
-        def _sync_control_cursor():
-            """
-            Sync the prompt_toolkit cursor position with our selected index.
-
-            This makes the Window auto-scroll to keep the selected row visible.
-            """
-            tree_control.cursor_position = Point(x=0, y=cursor)
-
-        _sync_control_cursor()
-
         kb = KeyBindings()
 
         @kb.add("up")
         def _(e):
             nonlocal cursor
             cursor = max(0, cursor - 1)
-            _sync_control_cursor()
             e.app.invalidate()
 
         @kb.add("down")
         def _(e):
             nonlocal cursor
-            cursor = min(len(tree) - 1, cursor + 1)
-            _sync_control_cursor()
+            cursor = min(len(tree_control.rows) - 1, cursor + 1)
             e.app.invalidate()
 
-        @kb.add(" ")
+        @kb.add("right", filter=~searching)
         def _(e):
-            item = tree[cursor]
-            new_state = not item["checked"]
+            expand(cursor)
+            e.app.invalidate()
 
-            if item["type"] == "dir":
-                toggle_dir(cursor, new_state)
-            else:
-                item["checked"] = new_state
+        @kb.add("left", filter=~searching)
+        def _(e):
+            nonlocal cursor
+            cursor = collapse(cursor)
+            e.app.invalidate()
+
+        @kb.add(" ", filter=~searching)
+        @kb.add("tab", filter=searching)
+        def _(e):
+            if not tree_control.rows:
+                return
+
+            # A dir's subtree is toggled at once; unlisted contents inherit
+            # the state when they are listed. Partly checked dirs get checked
+            item = tree_control.rows[cursor]
+            selection.set(item, selection.state(item) is not True)
+
+            # The ancestors' partial state may have changed too
+            tree_control.invalidate()
+            e.app.invalidate()
+
+        @kb.add("/", filter=~searching)
+        def _(e):
+            nonlocal query, tree_cursor, indexing
+            query = ""
+            tree_cursor = cursor
+
+            # The dirs that were never expanded are listed once, for every search
+            if not indexing:
+                indexing = True
+                e.app.create_background_task(index())
+            e.app.invalidate()
+
+        @kb.add("<any>", filter=searching)
+        def _(e):
+            nonlocal query
+            if len(e.data) == 1 and e.data.isprintable():
+                query += e.data
+                search()
+                e.app.invalidate()
+
+        @kb.add("backspace", filter=searching)
+        def _(e):
+            nonlocal query
+            if query:
+                query = query[:-1]
+                search()
+                e.app.invalidate()
+
+        @kb.add("c-a", filter=searching)
+        def _(e):
+            # Checks all the matches, or unchecks them if they all are
+            state = not all(selection.state(row) is True for row in matches)
+            selection.set_many(matches, state)
+            tree_control.invalidate()
+            e.app.invalidate()
+
+        @kb.add("escape", filter=searching)
+        def _(e):
+            end_search(reveal=False)
+            e.app.invalidate()
 
+        @kb.add("enter", filter=searching)
+        def _(e):
+            end_search(reveal=True)
             e.app.invalidate()
 
-        @kb.add("enter")
+        @kb.add("enter", filter=~searching)
         def _(e):
             e.app.exit()
 
@@ -225,115 +459,271 @@ class InteractiveSelectionService:
 
         app.layout.focus(tree_window)
 
-        app.run()
+        try:
+            app.run()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
-        selected_files = {
-            (root_path / item["path"])
-            for item in tree
-            if item["type"] == "file" and item["checked"]
-        }
+        # Resolve the selection, including the dirs selected without expanding them
+        manifest = TreeManifest(scope["root"])
+        state: Dict[str, bool] = {}
+        resolved_root = InteractiveSelectionService._collect(ctx, config, scope, selection, manifest, state)
 
-        return InteractiveSelectionService._filter_resolved_root(resolved_root, selected_files)
+        # Dirs selected without expanding them (or empty ones) may hold no files
+        if state["maybe_empty"]:
+            resolved_root = InteractiveSelectionService._drop_empty_dirs(resolved_root)
+            manifest = InteractiveSelectionService._drop_empty_manifest_dirs(manifest)
+
+        resolved_root["manifest"] = manifest
+        return resolved_root
 
 
     @staticmethod
-    def _build_tree(
-        resolved_root: Dict[str, Any],
-        root: Path,
-        depth: int,
-        tree: List[dict],
-        folder_to_files: Dict[int, List[int]],
-        folder_to_subdirs: Dict[int, List[int]],
-    ) -> None:
+    def _make_row(path: Path, rel: str, kind: str, depth: int, matcher: GitIgnoreMatcher) -> dict:
         """
-        Flatten the resolved root dict into a render-order tree suitable for the UI.
+        Create a row of the UI tree. Dir rows start collapsed and unlisted
+        ("children" is None).
 
-        This function:
-        - Adds directory nodes and file nodes
-        - Tracks folder -> files and folder -> subfolders relationships for recursive toggling
+        Args:
+            path (Path): The absolute path of the item
+            rel (str): The path relative to the root, "(root)" for the root
+            kind (str): "file" or "dir"
+            depth (int): Depth below the root
+            matcher (GitIgnoreMatcher): The gitignores that apply to the item
+
+        Returns:
+            dict: The row
+        """
+        row = {"type": kind, "path": rel, "abs": path, "depth": depth}
+        if kind == "dir":
+            row.update(children=None, expanded=False, loading=False, matcher=matcher)
+        return row
+
+
+    @staticmethod
+    def _list_rows(ctx: AppContext, config: Config, scope: Dict[str, Any],
+        row: dict) -> Tuple[List[dict], GitIgnoreMatcher]:
+        """
+        List the children of a dir row. Runs in the background thread, so it
+        does not touch the UI tree; _apply_children() does that.
+
+        --max-entries applies to each listing, like to the top level of a CLI
+        run, so what a dir shows does not depend on the order dirs are listed in.
 
         Args:
-            resolved_root (dict): The resolved root dict with "self" and "children"
-            root (Path): The root path used to compute relative display paths
-            depth (int): Current depth level for indentation
-            tree (list[dict]): The flat render-order list to populate
-            folder_to_files (dict[int, list[int]]): Directory index -> file indices mapping
-            folder_to_subdirs (dict[int, list[int]]): Directory index -> directory indices mapping
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            scope (dict): The scope from ResolveItemsService.resolve_scope
+            row (dict): The dir row to list
+
+        Returns:
+            list[dict]: The child rows
+            GitIgnoreMatcher: The matcher for the dir, with its own gitignore added
         """
+        matcher = row["matcher"].copy()
+        try:
+            children, _ = ResolveItemsService.list_dir(ctx, config, scope,
+                curr_dir=row["abs"], curr_depth=row["depth"], curr_entries=1,
+                gitignore_matcher=matcher)
+        except OSError as e:
+            ctx.logger.log(Logger.WARNING, "Could not list %s: %s", row["abs"], e)
+            children = []
+
+        rel_dir = row["path"] if row["depth"] else ""
+        return [
+            InteractiveSelectionService._make_row(
+                child,
+                f"{rel_dir}/{child.name}" if rel_dir else child.name,
+                "dir" if child.is_dir() else "file",
+                row["depth"] + 1,
+                matcher,
+            )
+            for child in children
+        ], matcher
 
-        dir_path = resolved_root.get("self")
-        if not isinstance(dir_path, Path):
-            dir_path = Path(str(dir_path))
 
-        folder_index = len(tree)
-        rel_dir = dir_path.relative_to(root).as_posix() or "(root)"
+    @staticmethod
+    def _apply_children(selection: SelectionTree, search_index: SearchIndex, row: dict,
+        children: List[dict], matcher: GitIgnoreMatcher) -> None:
+        """
+        Attach listed child rows to a dir row. They inherit its checked state
+        and become searchable.
+        """
+        selection.add_children(row, children)
+        search_index.add(children)
+        row["matcher"] = matcher
+        row["loading"] = False
 
-        tree.append({
-            "type": "dir",
-            "path": rel_dir,
-            "depth": depth,
-            "checked": False,
-        })
 
-        children = resolved_root.get("children", [])
-        for child in children:
-            if isinstance(child, dict):
-                child_index = len(tree)
-                folder_to_subdirs[folder_index].append(child_index)
-                InteractiveSelectionService._build_tree(
-                    resolved_root=child,
-                    root=root,
-                    depth=depth + 1,
-                    tree=tree,
-                    folder_to_files=folder_to_files,
-                    folder_to_subdirs=folder_to_subdirs,
-                )
-            else:
-                child_path = child if isinstance(child, Path) else Path(str(child))
-                rel_path = child_path.relative_to(root).as_posix()
+    @staticmethod
+    def _visible_rows(row: dict) -> List[dict]:
+        """
+        Return the rows shown under an expanded dir row, in render order.
+        """
+        rows: List[dict] = []
+        for child in row["children"] or ():
+            rows.append(child)
+            if child["type"] == "dir" and child["expanded"]:
+                rows.extend(InteractiveSelectionService._visible_rows(child))
+        return rows
+
 
-                file_index = len(tree)
-                tree.append({
-                    "type": "file",
-                    "path": rel_path,
-                    "depth": depth + 1,
-                    "checked": False,
-                })
-                folder_to_files[folder_index].append(file_index)
+    @staticmethod
+    def _with_ancestors(rows: List[dict]) -> List[dict]:
+        """
+        Return the given rows and the dirs above them, in render order.
+        """
+        marked: Dict[int, dict] = {}
+        for row in rows:
+            while row is not None and id(row) not in marked:
+                marked[id(row)] = row
+                row = row["parent"]
+        return sorted(marked.values(), key=lambda row: row["key"])
 
 
     @staticmethod
-    def _filter_resolved_root(resolved_root: Dict[str, Any], selected_files: Set[Path]) -> Dict[str, Any]:
+    def _row_index(tree: List[dict], row: dict) -> int | None:
         """
-        Filter the resolved root dict in-place style (by rebuilding) to keep only selected files
-        and directories that contain selected descendants.
+        Return the index of a row in the visible rows, or None if it is hidden.
+        """
+        for index, item in enumerate(tree):
+            if item is row:
+                return index
+        return None
+
+
+    @staticmethod
+    def _parent_index(tree: List[dict], index: int) -> int:
+        """
+        Return the index of the parent of a visible row (the row itself for the root).
+        """
+        depth = tree[index]["depth"]
+        while index > 0 and tree[index]["depth"] >= depth:
+            index -= 1
+        return index
+
+
+    @staticmethod
+    def _collect(ctx: AppContext, config: Config, scope: Dict[str, Any],
+        selection: SelectionTree, manifest: TreeManifest, state: Dict[str, bool]) -> Dict[str, Any]:
+        """
+        Turn the checked rows into a resolved root dict, adding them to the
+        manifest. Checked dirs that were never listed are listed on the way,
+        the same way as when they are expanded.
+
+        Only dirs with something checked are visited, and the rows under a
+        fully checked dir are taken without looking at their own state.
+        Sets state["maybe_empty"] if a dir without files may have been added.
 
         Args:
-            resolved_root (dict): The resolved root dict to filter
-            selected_files (set[Path]): The set of selected file paths
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            scope (dict): The scope from ResolveItemsService.resolve_scope
+            selection (SelectionTree): The checked state of the listed rows
+            manifest (TreeManifest): The manifest to append to
+            state (dict): Holds the "maybe_empty" flag
 
         Returns:
-            dict: A resolved root dict in the same format containing only selected paths
+            dict: A resolved root dict with "self" and "children"
+        """
+        state["maybe_empty"] = False
+        entries = manifest.entries
+
+        root = selection.root
+        resolved_root: Dict[str, Any] = {"self": root["abs"], "children": []}
+
+        # NOTE: the rows already carry their relative path, so entries are made
+        # directly instead of through manifest.add()
+        def add_dir(row: dict, resolved: List[Any], full: bool) -> None:
+            """
+            Add the checked rows under a dir row to its resolved children. Under
+            a partly checked dir, the rows' own states are their real ones.
+            """
+            children = row["children"]
+            if children is None:
+                children, _ = InteractiveSelectionService._list_rows(ctx, config, scope, row)
+            if not children:
+                state["maybe_empty"] = True
+
+            for child in children:
+                child_state = True if full else selection.own_state(child)
+                if child_state is False:
+                    continue
+
+                entries.append(ManifestEntry(child["path"], child["abs"], child["type"],
+                    child["depth"]))
+                if child["type"] == "file":
+                    resolved.append(child["abs"])
+                else:
+                    resolved_dir = {"self": child["abs"], "children": []}
+                    resolved.append(resolved_dir)
+                    add_dir(child, resolved_dir["children"], child_state is True)
+
+        root_state = selection.own_state(root)
+        if root_state is not False:
+            add_dir(root, resolved_root["children"], root_state is True)
+
+        return resolved_root
+
+
+    @staticmethod
+    def _drop_empty_dirs(resolved_root: Dict[str, Any]) -> Dict[str, Any]:
         """
+        Rebuild the resolved root dict without the directories that hold no files.
 
-        root_path = resolved_root.get("self")
-        if not isinstance(root_path, Path):
-            root_path = Path(str(root_path))
+        Args:
+            resolved_root (dict): The resolved root dict to filter
+
+        Returns:
+            dict: A resolved root dict in the same format, without empty directories
+        """
 
-        children = resolved_root.get("children", [])
         new_children: List[Any] = []
 
-        for child in children:
+        for child in resolved_root.get("children", []):
             if isinstance(child, dict):
-                filtered_child = InteractiveSelectionService._filter_resolved_root(child, selected_files)
+                filtered_child = InteractiveSelectionService._drop_empty_dirs(child)
                 if filtered_child.get("children"):
                     new_children.append(filtered_child)
             else:
-                child_path = child if isinstance(child, Path) else Path(str(child))
-                if child_path in selected_files:
-                    new_children.append(child)
+                new_children.append(child)
 
         return {
-            "self": root_path,
+            "self": resolved_root.get("self"),
             "children": new_children,
         }
+
+
+    @staticmethod
+    def _drop_empty_manifest_dirs(manifest: TreeManifest) -> TreeManifest:
+        """
+        Filter the manifest the same way as _drop_empty_dirs filters the tree:
+        keep the files, the root, and directories with files under them.
+
+        Args:
+            manifest (TreeManifest): The manifest to filter
+
+        Returns:
+            TreeManifest: The filtered manifest
+        """
+
+        # Walk backwards so each directory's descendants are seen before it;
+        # has_kept[d] tells whether the open directory at depth d keeps anything
+        kept: List[Any] = []
+        has_kept: Dict[int, bool] = defaultdict(bool)
+
+        for entry in reversed(manifest.entries):
+            if entry.is_dir:
+                keep = entry.depth == 0 or has_kept[entry.depth]
+                has_kept[entry.depth] = False
+            else:
+                keep = True
+
+            if keep:
+                kept.append(entry)
+                if entry.depth > 0:
+                    has_kept[entry.depth - 1] = True
+
+        filtered = TreeManifest(manifest.root)
+        filtered.entries = kept[::-1]
+        return filtered
@@ -12,7 +12,8 @@ import argparse
 from pathlib import Path
 
 # Imports from this project
-from ..utilities.functions_utility import max_items_int, max_entries_int
+from ..utilities.functions_utility import (max_items_int, max_entries_int,
+    size_bytes, positive_int, zip_level_int, compress_levels, zstd_available)
 from ..objects.config import Config
 from ..objects.app_context import AppContext
 
@@ -47,16 +48,18 @@ class ParsingService:
         ParsingService._add_listing_control_flags(ctx, ap)
 
         args = ap.parse_args()
-        ctx.logger.log(ctx.logger.DEBUG, f"Parsed arguments: {args}")
+        # A copy, since _correct_args changes args before the message is formatted
+        ctx.logger.log(ctx.logger.DEBUG, "Parsed arguments: %s", argparse.Namespace(**vars(args)))
 
 
         # Correct the arguments before returning to avoid complexity
         # in implementation in main function, then return a Config object
-        args = ParsingService._correct_args(ctx, args)
+        args = ParsingService._correct_args(ctx, ap, args)
 
 
         # Prepare the config object to return from this function
-        config = Config(ctx, args)
+        with ctx.profiler.phase("config_load"):
+            config = Config(ctx, args)
         config.no_printing = config.copy or config.export or config.zip 
         return ParsingService._fix_contradicting_args(ctx, config)
     
@@ -71,22 +74,44 @@ class ParsingService:
 
     
     @staticmethod
-    def _correct_args(ctx: AppContext, args: argparse.Namespace) -> argparse.Namespace:
+    def _correct_args(ctx: AppContext, ap: argparse.ArgumentParser,
+        args: argparse.Namespace) -> argparse.Namespace:
         """
-        Correct and validate CLI arguments in place.
+        Correct and validate CLI arguments in place. Invalid combinations
+        exit through ap.error, like invalid values do.
         """
         
-        if getattr(args, "export", None) is not None:
+        if getattr(args, "export", None) not in (None, "-"):
             args.export = ParsingService._fix_output_path(
                 ctx, args.export,
                 default_extensions={"txt": ".txt", "json": ".json", "md": ".md"},
                 format_str=args.format
             )
 
-        if getattr(args, "zip", None) is not None:
-            args.zip = ParsingService._fix_output_path(ctx, args.zip, default_extension=".zip")
+        sharded = (getattr(args, "export_shard_size", None)
+            or getattr(args, "export_shard_files", None))
+        if sharded and getattr(args, "export", None) == "-":
+            ap.error("sharded exports (--export-shard-size, --export-shard-files) "
+                "cannot be written to stdout with --export -")
 
-        ctx.logger.log(ctx.logger.DEBUG, f"Corrected arguments: {args}")
+        if (getattr(args, "export", None) not in (None, "-")
+                and Path(args.export).suffix.lower() == ".zst" and not zstd_available()):
+            ap.error("exporting to .zst requires Python 3.14+ or the 'zstandard' package")
+
+        level = getattr(args, "compress_level", None)
+        if level is not None and getattr(args, "export", None) not in (None, "-"):
+            suffix = Path(args.export).suffix.lower()
+            levels = compress_levels(suffix)
+            if levels and not levels[0] <= level <= levels[1]:
+                ap.error(f"--compress-level must be >= {levels[0]} and <= {levels[1]} "
+                    f"for {suffix} exports")
+
+        if getattr(args, "zip", None) is not None and args.zip != "-":
+            archive_format = getattr(args, "archive_format", "zip")
+            args.zip = ParsingService._fix_output_path(ctx, args.zip,
+                default_extension=f".{archive_format}")
+
+        ctx.logger.log(ctx.logger.DEBUG, "Corrected arguments: %s", args)
 
         return args
     
@@ -155,6 +180,13 @@ class ParsingService:
             default=argparse.SUPPRESS, help="Ignore config.json and use defaults")
         general.add_argument("--verbose", action="store_true", 
             default=argparse.SUPPRESS, help="Enable verbose output")
+        general.add_argument("--profile-json", metavar="PATH", 
+            default=argparse.SUPPRESS, 
+            help="Write the time per phase and work counters of the run to a JSON file")
+        general.add_argument("--profile", choices=["cpu", "memory"], 
+            default=argparse.SUPPRESS, 
+            help="Profile the run with cProfile (also written to gitree.prof) or\n"
+                "tracemalloc, the summary is shown with --verbose")
 
 
     @staticmethod
@@ -162,9 +194,48 @@ class ParsingService:
         io = ap.add_argument_group("output & export options")
 
         io.add_argument("-z", "--zip", 
-            default=argparse.SUPPRESS, help="Create a zip archive of the given path")
+            default=argparse.SUPPRESS, 
+            help="Create a zip archive of the given path, or write it to stdout with -")
+        io.add_argument("--zip-level", type=zip_level_int, metavar="N", 
+            default=argparse.SUPPRESS, 
+            help="Deflate level for zip members, 0 stores everything (default: 6)")
+        io.add_argument("--zip-incremental", action="store_true", 
+            default=argparse.SUPPRESS, 
+            help="Reuse unchanged members of an existing zip archive")
+        io.add_argument("--archive-format", choices=["zip", "tar", "tar.gz", "tar.xz"], 
+            default=argparse.SUPPRESS, 
+            help="Archive format used by --zip (default: zip)")
         io.add_argument("--export", 
-            default=argparse.SUPPRESS, help="Save tree structure to file")
+            default=argparse.SUPPRESS, 
+            help="Save tree structure to file, or write it to stdout with -")
+        io.add_argument("--export-max-size", type=size_bytes, metavar="SIZE", 
+            default=argparse.SUPPRESS, 
+            help="Cut the export file (or stdout with --export -) off at SIZE")
+        io.add_argument("--copy-max-size", type=size_bytes, metavar="SIZE", 
+            default=argparse.SUPPRESS, help="Cut the text copied with --copy off at SIZE")
+        io.add_argument("--compress-level", type=int, metavar="N", 
+            default=argparse.SUPPRESS, 
+            help="Compression level for .gz, .bz2, .xz or .zst exports")
+        io.add_argument("--export-dedup", action="store_true", 
+            default=argparse.SUPPRESS, 
+            help="Write identical files once and reference the first copy")
+        io.add_argument("--export-cache", action="store_true", 
+            default=argparse.SUPPRESS, 
+            help="Reuse file contents of unchanged files from .gitree/ across exports")
+        io.add_argument("--export-cache-size", type=size_bytes, metavar="SIZE", 
+            default=argparse.SUPPRESS, help="Size limit of the export cache (default: 64MB)")
+        io.add_argument("--max-file-size", type=size_bytes, metavar="SIZE", 
+            default=argparse.SUPPRESS, help="Skip contents of files larger than SIZE (e.g. 1MB)")
+        io.add_argument("--export-shard-size", type=size_bytes, metavar="SIZE", 
+            default=argparse.SUPPRESS, 
+            help="Split the export into shards of at most SIZE (e.g. 64MB)")
+        io.add_argument("--export-shard-files", type=positive_int, metavar="N", 
+            default=argparse.SUPPRESS, help="Split the export into shards of at most N files")
+        io.add_argument("-j", "--jobs", type=positive_int, 
+            default=argparse.SUPPRESS, help="Number of parallel workers")
+        io.add_argument("--changed-since", metavar="MANIFEST", 
+            default=argparse.SUPPRESS, 
+            help="Only export files changed since the manifest, then update it")
 
 
     @staticmethod
@@ -6,14 +6,16 @@ Code file for the ResolveItemsService class.
 
 # default libs
 from typing import Any
-import os, sys, glob
+import os, sys, glob, time
 from pathlib import Path
 
 # Deps from this project
 from ..objects.app_context import AppContext
 from ..objects.config import Config
 from ..objects.gitignore import GitIgnore
+from ..objects.tree_manifest import TreeManifest
 from ..utilities.logging_utility import Logger
+from ..utilities.profiling_utility import Profiler
 from ..utilities.gitignore_utility import GitIgnoreMatcher
 
 
@@ -27,7 +29,43 @@ class ResolveItemsService:
         Resolves the items to include in the output using the config object.
 
         Returns:
-            dict[str, Any]: A dict of the resolved items
+            dict[str, Any]: A dict of the resolved items, with a flat TreeManifest
+                of them under "manifest"
+        """
+
+        with ctx.profiler.phase("resolve_paths"):
+            scope = ResolveItemsService.resolve_scope(ctx, config)
+
+        # Safety check to avoid crashes on no paths found
+        if not scope:
+            return {}
+
+
+        # Start from the parent dir and keep adding items recursively
+        # includes resolving hidden_files, gitignore, include and exclude
+        manifest = TreeManifest(scope["root"])
+        with ctx.profiler.phase("traversal"):
+            resolved_items, _ = ResolveItemsService.resolve_dir(ctx, config, scope,
+                curr_dir=scope["root"], curr_depth=0, curr_entries=1,
+                gitignore_matcher=GitIgnoreMatcher(), manifest=manifest, rel_dir="")
+
+        # The flat manifest is shared by the consumers, so they need not re-walk the tree
+        resolved_items["manifest"] = manifest
+        return resolved_items
+
+
+    @staticmethod
+    def resolve_scope(ctx: AppContext, config: Config) -> dict[str, Any]:
+        """
+        Resolve the root, include and exclude paths given in the CLI args.
+
+        The scope is all that the resolver needs besides the current dir, so
+        directories can also be resolved one at a time (see list_dir).
+
+        Returns:
+            dict[str, Any]: The scope, with the common "root" dir and the lists of
+                "resolved_paths", "include_paths" and "exclude_paths"; empty if no
+                paths were found
         """
 
         # Resolve all the root paths first
@@ -38,23 +76,73 @@ class ResolveItemsService:
             ctx, config, config.include)
         resolved_exclude_paths = ResolveItemsService._resolve_given_paths(
             ctx, config, config.exclude)
-        
 
-        # Safety check to avoid crashes on no paths found
         if not resolved_root_paths:
             ctx.logger.log(Logger.ERROR, "No included paths were found matching given args")
             return {}
 
+        return {
+            "root": resolved_root_paths[-1],
+            "resolved_paths": resolved_root_paths[:-1],
+            "include_paths": resolved_include_paths[:-1],
+            "exclude_paths": resolved_exclude_paths[:-1],
+        }
 
-        # Start from the parent dir and keep adding items recursively
-        # includes resolving hidden_files, gitignore, include and exclude
-        resolved_items, _ = ResolveItemsService._resolve_items_rec(ctx, config, 
-            resolved_paths=resolved_root_paths[:-1], curr_depth=0, curr_entries=1,
-            gitignore_matcher=GitIgnoreMatcher(),
-            curr_dir=resolved_root_paths[-1], include_paths=resolved_include_paths[:-1], 
-            exclude_paths=resolved_exclude_paths[:-1])
 
-        return resolved_items
+    @staticmethod
+    def resolve_dir(ctx: AppContext, config: Config, scope: dict[str, Any], *,
+        curr_dir: Path, curr_depth: int, curr_entries: int,
+        gitignore_matcher: GitIgnoreMatcher, manifest: TreeManifest,
+        rel_dir: str) -> tuple[dict[str, Any], int]:
+        """
+        Resolve a dir and everything under it, appending the resolved items
+        to the manifest in tree order.
+
+        Args:
+            scope (dict[str, Any]): The scope from resolve_scope()
+            curr_dir (Path): The dir to resolve
+            curr_depth (int): Depth of the dir below the root
+            curr_entries (int): Number of entries resolved so far (for --max-entries)
+            gitignore_matcher (GitIgnoreMatcher): Matcher with the gitignores of the
+                dir's ancestors; the gitignores found are added to it
+            manifest (TreeManifest): The manifest to append to
+            rel_dir (str): Relative path of the dir in the manifest
+
+        Returns:
+            dict[str, Any]: A dict of the resolved dir and a list of children paths
+            int: The updated number of entries
+        """
+        return ResolveItemsService._resolve_items_rec(ctx, config,
+            resolved_paths=scope["resolved_paths"], curr_dir=curr_dir,
+            curr_depth=curr_depth, curr_entries=curr_entries,
+            include_paths=scope["include_paths"], exclude_paths=scope["exclude_paths"],
+            gitignore_matcher=gitignore_matcher, manifest=manifest, rel_dir=rel_dir)
+
+
+    @staticmethod
+    def list_dir(ctx: AppContext, config: Config, scope: dict[str, Any], *,
+        curr_dir: Path, curr_depth: int, curr_entries: int,
+        gitignore_matcher: GitIgnoreMatcher) -> tuple[list[Path], int]:
+        """
+        Resolve only the direct children of a dir, with the same filtering as
+        resolve_dir(). Used to expand dirs on demand.
+
+        Args:
+            scope (dict[str, Any]): The scope from resolve_scope()
+            curr_dir (Path): The dir to list
+            curr_depth (int): Depth of the dir below the root
+            curr_entries (int): Number of entries resolved so far (for --max-entries)
+            gitignore_matcher (GitIgnoreMatcher): Matcher with the gitignores of the
+                dir's ancestors; the dir's own gitignore is added to it
+
+        Returns:
+            list[Path]: The children to show, files first
+            int: The updated number of entries
+        """
+        return ResolveItemsService._list_children(ctx, config,
+            curr_dir=curr_dir, curr_depth=curr_depth, curr_entries=curr_entries,
+            search_paths=scope["resolved_paths"] + scope["include_paths"],
+            exclude_paths=scope["exclude_paths"], gitignore_matcher=gitignore_matcher)
 
 
     def _resolve_given_paths(ctx: AppContext, config: Config, attr: list[str]) -> list[Path]:
@@ -88,7 +176,7 @@ class ResolveItemsService:
                 # If the glob could not be resolved
                 if not matched_paths:
                     ctx.logger.log(Logger.WARNING, 
-                        f"No matches found for glob pattern '{path_str}'")
+                        "No matches found for glob pattern '%s'", path_str)
                     
                 # Append the matches to the calculated paths
                 for path_str in matched_paths:
@@ -111,9 +199,11 @@ class ResolveItemsService:
     def _resolve_items_rec(ctx: AppContext, config: Config, *,
         resolved_paths: list[Path], curr_dir: Path, curr_depth: int, curr_entries: int,
         include_paths: list[Path], exclude_paths: list[Path], 
-        gitignore_matcher: GitIgnoreMatcher) -> tuple[dict[str, Any], int]:
+        gitignore_matcher: GitIgnoreMatcher, manifest: TreeManifest,
+        rel_dir: str) -> tuple[dict[str, Any], int]:
         """
-        Resolve the paths recursively.
+        Resolve the paths recursively, appending the resolved items to the
+        manifest in tree order.
 
         Returns:
             dict[str, Any]: A dict of the resolved root and a list of children paths
@@ -125,61 +215,117 @@ class ResolveItemsService:
             "children": []
         }
 
+        resolved_root["children"], curr_entries = ResolveItemsService._list_children(
+            ctx, config, curr_dir=curr_dir, curr_depth=curr_depth,
+            curr_entries=curr_entries, search_paths=resolved_paths + include_paths,
+            exclude_paths=exclude_paths, gitignore_matcher=gitignore_matcher)
+
+
+        # One is_dir() per child below
+        ctx.profiler.count("stat_calls", len(resolved_root["children"]))
+
+        # Now use the same function to resolve for each dir in children
+        for idx, item_path in enumerate(resolved_root["children"]):
+            # Resolve for the item only if it is a directory
+            if item_path.is_dir():
+                rel = manifest.add(rel_dir, item_path, "dir", curr_depth + 1)
+                resolved_root["children"][idx], curr_entries = ResolveItemsService._resolve_items_rec(ctx, config, resolved_paths=resolved_paths, curr_entries=curr_entries,
+                    curr_dir=item_path, include_paths=include_paths, 
+                    gitignore_matcher=gitignore_matcher,
+                    exclude_paths=exclude_paths, curr_depth=curr_depth+1,
+                    manifest=manifest, rel_dir=rel)  
+            else:
+                manifest.add(rel_dir, item_path, "file", curr_depth + 1)
+
+        return resolved_root, curr_entries
+
+
+    @staticmethod
+    def _list_children(ctx: AppContext, config: Config, *, curr_dir: Path,
+        curr_depth: int, curr_entries: int, search_paths: list[Path],
+        exclude_paths: list[Path], gitignore_matcher: GitIgnoreMatcher) -> tuple[list[Path], int]:
+        """
+        Filter the children of a single dir (hidden items, gitignore, include,
+        exclude and the max limits).
+
+        Returns:
+            list[Path]: The children to add, files first
+            int: current entries to keep track of the number of entries during recursion
+        """
+
+        # Options are read from the merged snapshot, not the layered config
+        settings = config.snapshot()
+
         # Implementation for --max-depth
-        if curr_depth > config.max_depth - 1:
-            return resolved_root, curr_entries
+        if curr_depth > settings.max_depth - 1:
+            return [], curr_entries
         
 
         # Get the dir's children, sorted order, and files first
         children_to_add = sorted(curr_dir.iterdir(), key=lambda p: (p.is_dir(), p.name.lower()))
 
+        # The sort key and the .gitignore check below stat every child and the dir
+        profiler = ctx.profiler
+        profiler.count("dirs_listed")
+        profiler.count("entries_seen", len(children_to_add))
+        profiler.count("stat_calls", len(children_to_add) + 1)
+
 
         # Setup gitignore object for this dir (if there is a .gitignore)
-        if curr_depth <= config.gitignore_depth and (curr_dir / ".gitignore").is_file():
+        if curr_depth <= settings.gitignore_depth and (curr_dir / ".gitignore").is_file():
             gitignore_matcher.add_gitignore(
                 GitIgnore(ctx, config, gitignore_path=(curr_dir / ".gitignore")))
 
 
+        children: list[Path] = []
         items_added = 0
         # Now traverse the dir and add items
         for item_path in children_to_add:
 
             # If --no-files is used, then skip files
-            if config.no_files and item_path.is_file(): continue
+            if settings.no_files:
+                profiler.count("stat_calls")
+                if item_path.is_file(): continue
 
             # If reached --max-items or --max-entries, then exit
             # NOTE: This is ok for now, but needs to be corrected later
-            if not config.no_max_items and items_added >= config.max_items: break
-            if not config.no_max_entries and curr_entries >= config.max_entries: break
+            if not settings.no_max_items and items_added >= settings.max_items: break
+            if not settings.no_max_entries and curr_entries >= settings.max_entries: break
 
 
             # Check if it is not a hidden file/dir or hidden-items flag is used
-            if (config.hidden_items or not ResolveItemsService._ishidden(item_path)):
+            if (settings.hidden_items or not ResolveItemsService._ishidden(item_path)):
 
                 # Check if the item is in resolved paths, or in include paths
-                if ResolveItemsService._isunder(item_path, resolved_paths + include_paths):
+                if ResolveItemsService._isunder(item_path, search_paths):
 
                     # Check if the item is defined by an include pattern
                     # Or if there is a gitignore that says it is excluded
                     if (not ResolveItemsService._isunder(item_path, exclude_paths) 
-                        and (not curr_depth > config.gitignore_depth and 
-                            not gitignore_matcher.excluded(item_path))):    
+                        and (not curr_depth > settings.gitignore_depth and 
+                            not ResolveItemsService._excluded(profiler, gitignore_matcher, item_path))):    
                         
-                        resolved_root["children"].append(item_path)
+                        children.append(item_path)
                         items_added += 1
                         curr_entries += 1
 
+        return children, curr_entries
 
-        # Now use the same function to resolve for each dir in children
-        for idx, item_path in enumerate(resolved_root["children"]):
-            # Resolve for the item only if it is a directory
-            if item_path.is_dir():
-                resolved_root["children"][idx], curr_entries = ResolveItemsService._resolve_items_rec(ctx, config, resolved_paths=resolved_paths, curr_entries=curr_entries,
-                    curr_dir=item_path, include_paths=include_paths, 
-                    gitignore_matcher=gitignore_matcher,
-                    exclude_paths=exclude_paths, curr_depth=curr_depth+1)  
 
-        return resolved_root, curr_entries
+    @staticmethod
+    def _excluded(profiler: Profiler, gitignore_matcher: GitIgnoreMatcher, item_path: Path) -> bool:
+        """
+        Match a path against the gitignores, timed as the gitignore_match phase
+        when profiling.
+        """
+        if not profiler.enabled:
+            return gitignore_matcher.excluded(item_path)
+
+        start = time.perf_counter()
+        try:
+            return gitignore_matcher.excluded(item_path)
+        finally:
+            profiler.add("gitignore_match", time.perf_counter() - start)
 
 
     @staticmethod
@@ -7,13 +7,18 @@ Static methods; zips the resolved tree into the configured output path
 """
 
 # Default libs
-from typing import Any
+from typing import IO, Any, Callable, Iterator
 from pathlib import Path
-import zipfile
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import math, os, struct, sys, tarfile, tempfile, zipfile, zlib
 
 # Deps from this project
 from ..objects.app_context import AppContext
 from ..objects.config import Config
+from ..objects.tree_manifest import TreeManifest
+from ..utilities.logging_utility import Logger
+from ..utilities.zip_utility import ZipWriter
 
 
 class ZippingService:
@@ -21,10 +26,51 @@ class ZippingService:
     Static class for zipping the resolved tree (dict format) into a zip file.
     """
 
+    # tarfile stream modes of the tar based archive formats
+    _TAR_MODES = {"tar": "w|", "tar.gz": "w|gz", "tar.xz": "w|xz"}
+
+    # Size of the reads fed to the compressor
+    _READ_BLOCK = 256 * 1024
+
+    # Compressed members are kept in memory up to this size, then spooled to disk
+    _SPOOL_SIZE = 8 * 1024 * 1024
+
+    # Formats that are already compressed and gain nothing from deflate
+    _STORED_SUFFIXES = frozenset({
+        ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".heic", ".ico",
+        ".mp3", ".mp4", ".m4a", ".mkv", ".mov", ".webm", ".ogg", ".flac",
+        ".zip", ".jar", ".whl", ".egg", ".apk", ".docx", ".xlsx", ".pptx",
+        ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".lz4", ".br",
+        ".woff", ".woff2", ".pdf",
+    })
+
+    # Leading bytes of compressed formats, for files without a telling suffix
+    _STORED_MAGIC = (
+        b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"PK\x03\x04", b"\x1f\x8b",
+        b"BZh", b"\xfd7zXZ\x00", b"(\xb5/\xfd", b"7z\xbc\xaf", b"Rar!", b"wOF2",
+    )
+
+    # Files of at least _ENTROPY_MIN_SIZE bytes (smaller ones are cheap to
+    # deflate anyway) whose first _ENTROPY_SAMPLE bytes exceed _ENTROPY_LIMIT
+    # bits per byte are considered incompressible
+    _ENTROPY_MIN_SIZE = 64 * 1024
+    _ENTROPY_SAMPLE = 8 * 1024
+    _ENTROPY_LIMIT = 7.5
+
+
     @staticmethod
     def run(ctx: AppContext, config: Config, tree_data: dict[str, Any]) -> None:
         """
-        Zip all files contained in the given resolved tree dict into config.output.
+        Zip all files contained in the given resolved tree dict into config.zip,
+        or write them to stdout when it is "-". config.archive_format picks a
+        tar based format instead of zip.
+
+        Members are compressed with zlib, by config.jobs worker threads when
+        it is above 1 (zlib releases the GIL), and written by a single writer
+        in tree order, so the archive is the same for any number of jobs.
+        Files that are already compressed are stored as they are. With
+        config.zip_incremental, unchanged members of the existing archive are
+        copied over without recompressing them.
 
         Args:
             ctx (AppContext): The application context
@@ -35,64 +81,569 @@ class ZippingService:
         if not getattr(config, "zip", False):
             return
 
+        if config.zip == "-":
+            sys.stdout.flush()
+            try:
+                ZippingService.write(ctx, config, tree_data, sys.stdout.buffer)
+                sys.stdout.buffer.flush()
+            except (OSError, ValueError, tarfile.TarError) as e:
+                ctx.logger.log(Logger.ERROR, "Could not write archive to stdout: %s", e)
+            return
+
         zip_path = Path(config.zip)
+        archive_format = config.archive_format or "zip"
+
+        # The archive itself may be part of the tree when it is written inside it
+        zip_real = os.path.realpath(zip_path)
+        members = [(entry.path, entry.rel) for entry in TreeManifest.of(tree_data).files()
+            if str(entry.path) != zip_real]
+        jobs = max(1, config.jobs or 1)
+
+        previous = None
+        if config.zip_incremental:
+            if archive_format != "zip":
+                ctx.logger.log(Logger.WARNING,
+                    "--zip-incremental only applies to zip archives written to a file")
+            else:
+                previous = ZippingService._open_previous(ctx, zip_path)
+
         zip_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = zip_path.with_name(zip_path.name + ".tmp")
+        try:
+            try:
+                with open(tmp_path, "wb") as out:
+                    reused = ZippingService._write(ctx, config, out, members, previous,
+                        stream=False)
+            finally:
+                # Closed before the replace, an open file cannot be replaced on Windows
+                if previous:
+                    previous[0].close()
+            os.replace(tmp_path, zip_path)
+            ctx.profiler.count_file("bytes_written", zip_path)
+        except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+            ctx.logger.log(Logger.ERROR, "Could not write %s: %s", zip_path, e)
+            return
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        ctx.logger.log(Logger.DEBUG, "Archived %d files into %s as %s with %d job(s), "
+            "%d reused from the previous archive", len(members), zip_path, archive_format,
+            jobs, reused)
+
+
+    @staticmethod
+    def write(ctx: AppContext, config: Config, tree_data: dict[str, Any],
+        out: IO[bytes]) -> None:
+        """
+        Write the archive of the given resolved tree dict to a binary stream,
+        which need not be seekable. config.zip and config.zip_incremental are
+        not used.
+
+        Args:
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            tree_data (dict[str, Any]): A resolved tree dict with "self" and "children"
+            out (IO[bytes]): The stream to write the archive to
+
+        Raises:
+            OSError, ValueError, tarfile.TarError: If the archive cannot be written
+        """
+
+        if config.zip_incremental:
+            ctx.logger.log(Logger.WARNING,
+                "--zip-incremental only applies to zip archives written to a file")
+
+        members = [(entry.path, entry.rel) for entry in TreeManifest.of(tree_data).files()]
+        ZippingService._write(ctx, config, out, members, None, stream=True)
+        ctx.logger.log(Logger.DEBUG, "Wrote %d files to a stream as %s with %d job(s)",
+            len(members), config.archive_format or "zip", max(1, config.jobs or 1))
+
+
+    @staticmethod
+    def _write(ctx: AppContext, config: Config, out: IO[bytes],
+        members: list[tuple[Path, str]],
+        previous: tuple[IO[bytes], dict[str, zipfile.ZipInfo]] | None, stream: bool) -> int:
+        """
+        Write the archive of the members in config.archive_format.
+
+        Args:
+            ctx (AppContext): The application context
+            config (Config): The application configuration
+            out (IO[bytes]): The stream to write the archive to
+            members (list[tuple[Path, str]]): The files with their archive names
+            previous (tuple | None): The open previous archive and its entries,
+                to reuse unchanged members from
+            stream (bool): Stream the members directly when there is nothing to
+                parallelize, instead of spooling them
+
+        Returns:
+            int: The number of members reused from the previous archive
+        """
+
+        archive_format = config.archive_format or "zip"
+        jobs = max(1, config.jobs or 1)
+        level = zlib.Z_DEFAULT_COMPRESSION if config.zip_level is None else config.zip_level
+        entries = previous[1] if previous else {}
+
+        def build(fp: Path, arcname: str) -> dict[str, Any] | None:
+            info = entries.get(arcname)
+            if info is not None and (member := ZippingService._reuse_member(fp, info)):
+                return member
+            member = ZippingService._compress_member(fp, level)
+            if member is not None:
+                ctx.profiler.count("bytes_read", member["file_size"])
+            return member
+
+        with ctx.profiler.phase("compression"):
+            if archive_format != "zip":
+                ZippingService._write_tar(ctx, out, archive_format, members)
+                return 0
+            if stream and jobs == 1:
+                # Nothing to parallelize, so skip the spooling and stream directly
+                ZippingService._stream_zip(ctx, out, members, level)
+                return 0
+            return ZippingService._write_archive(out, members, jobs, build, previous)
 
-        root = tree_data.get("self")
-        root = root if isinstance(root, Path) else Path(str(root))
 
-        files = ZippingService._collect_files(tree_data)
+    @staticmethod
+    def _write_archive(out: IO[bytes], members: list[tuple[Path, str]], jobs: int,
+        build: Callable[[Path, str], dict[str, Any] | None],
+        previous: tuple[IO[bytes], dict[str, zipfile.ZipInfo]] | None) -> int:
+        """
+        Build the members and write them to the output stream, in order.
+
+        Args:
+            out (IO[bytes]): The stream to write the archive to
+            members (list[tuple[Path, str]]): The files with their archive names
+            jobs (int): Number of worker threads
+            build (Callable): Builds the member for a file and its archive name
+            previous (tuple | None): The open previous archive and its entries
+
+        Returns:
+            int: The number of members copied from the previous archive
+        """
+
+        writer = ZipWriter(out)
+        reused = 0
+
+        for arcname, member in ZippingService._compress_all(members, jobs, build):
+            if member is None:
+                continue
+
+            if "info" in member:
+                chunks = ZippingService._raw_chunks(previous[0], member["info"])
+                reused += 1
+            else:
+                data = member["data"]
+                data.seek(0)
+                chunks = iter(lambda: data.read(ZippingService._READ_BLOCK), b"")
+
+            try:
+                writer.write_member(arcname, method=member["method"],
+                    crc=member["crc"], file_size=member["file_size"],
+                    compress_size=member["compress_size"], chunks=chunks,
+                    mtime=member["mtime"], mode=member["mode"])
+            finally:
+                if "data" in member:
+                    member["data"].close()
+
+        writer.close()
+        return reused
+
+
+    @staticmethod
+    def _stream_zip(ctx: AppContext, out: IO[bytes], members: list[tuple[Path, str]],
+        level: int) -> None:
+        """
+        Write a zip archive to a non-seekable stream, compressing each member
+        straight into the output and describing it with a data descriptor.
+
+        Stored members are spooled first instead, so their sizes go into the
+        local header: unlike deflated data, stored data does not mark its own
+        end, so streaming readers could not find the data descriptor.
+
+        Args:
+            ctx (AppContext): The application context
+            out (IO[bytes]): The stream to write the archive to
+            members (list[tuple[Path, str]]): The files with their archive names
+            level (int): The zlib compression level
+        """
+
+        writer = ZipWriter(out)
 
-        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for fp in files:
+        for fp, arcname in members:
+            try:
+                f = open(fp, "rb")
+            except OSError:
+                continue
+
+            with f:
                 try:
-                    arcname = ZippingService._arcname(root, fp)
-                    zf.write(fp, arcname=arcname)
-                except Exception:
+                    st = os.fstat(f.fileno())
+                    block = f.read(ZippingService._READ_BLOCK)
+                except OSError:
+                    continue
+
+                method = ZippingService._choose_method(fp, block, level)
+                if method == ZipWriter.STORED:
+                    try:
+                        data, crc, file_size = ZippingService._spool(f, block, None)
+                    except OSError as e:
+                        ctx.logger.log(Logger.WARNING, "Could not read %s: %s", fp, e)
+                        continue
+
+                    with data:
+                        data.seek(0)
+                        writer.write_member(arcname, method=method, crc=crc,
+                            file_size=file_size, compress_size=file_size,
+                            chunks=iter(lambda: data.read(ZippingService._READ_BLOCK), b""),
+                            mtime=st.st_mtime, mode=st.st_mode)
+                    ctx.profiler.count("bytes_read", file_size)
                     continue
 
+                compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+                writer.begin_member(arcname, method=method, mtime=st.st_mtime,
+                    mode=st.st_mode, size_hint=st.st_size)
+                crc = 0
+                file_size = 0
+                try:
+                    while block:
+                        crc = zlib.crc32(block, crc)
+                        file_size += len(block)
+                        writer.write_data(compressor.compress(block))
+                        block = f.read(ZippingService._READ_BLOCK)
+                except OSError as e:
+                    # The member was already started, so end it with what was read
+                    ctx.logger.log(Logger.WARNING, "Could not read all of %s: %s", fp, e)
+
+                writer.write_data(compressor.flush())
+                writer.end_member(crc, file_size)
+                ctx.profiler.count("bytes_read", file_size)
+
+        writer.close()
+
 
     @staticmethod
-    def _collect_files(tree_data: dict[str, Any]) -> list[Path]:
+    def _write_tar(ctx: AppContext, out: IO[bytes], archive_format: str,
+        members: list[tuple[Path, str]]) -> None:
         """
-        Collect all file paths from the resolved tree dict.
+        Write a (compressed) tar archive to a stream in tarfile's stream mode,
+        which never seeks and buffers a single block at a time.
 
         Args:
-            tree_data (dict[str, Any]): A resolved tree dict with "self" and "children"
+            ctx (AppContext): The application context
+            out (IO[bytes]): The stream to write the archive to
+            archive_format (str): "tar", "tar.gz" or "tar.xz"
+            members (list[tuple[Path, str]]): The files with their archive names
+        """
+
+        mode = ZippingService._TAR_MODES[archive_format]
+        with tarfile.open(fileobj=out, mode=mode) as tar:
+            for fp, arcname in members:
+                try:
+                    f = open(fp, "rb")
+                except OSError:
+                    continue
+                with f:
+                    info = tar.gettarinfo(arcname=arcname, fileobj=f)
+                    tar.addfile(info, f)
+                    ctx.profiler.count("bytes_read", info.size)
+
+
+    @staticmethod
+    def _compress_all(members: list[tuple[Path, str]], jobs: int,
+        build: Callable[[Path, str], dict[str, Any] | None]
+        ) -> Iterator[tuple[str, dict[str, Any] | None]]:
+        """
+        Build the members in order, with a bounded number of them in flight
+        when running in parallel so memory and spool usage stay bounded.
+
+        Args:
+            members (list[tuple[Path, str]]): The files with their archive names
+            jobs (int): Number of worker threads
+            build (Callable): Builds the member for a file and its archive name
 
         Returns:
-            list[Path]: A list of file Paths found in the tree
+            Iterator[tuple[str, dict[str, Any] | None]]: Each archive name with
+                its member, or None if the file could not be read
         """
-        out: list[Path] = []
 
-        def rec(node: dict[str, Any]) -> None:
-            children = node.get("children", [])
-            for child in children:
-                if isinstance(child, dict):
-                    rec(child)
-                else:
-                    p = child if isinstance(child, Path) else Path(str(child))
-                    out.append(p)
+        if jobs == 1:
+            for fp, arcname in members:
+                yield arcname, build(fp, arcname)
+            return
 
-        rec(tree_data)
-        return out
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            pending: deque = deque()
+            todo = iter(members)
+            for fp, arcname in todo:
+                pending.append((arcname, pool.submit(build, fp, arcname)))
+                if len(pending) >= jobs * 2:
+                    break
+
+            while pending:
+                arcname, future = pending.popleft()
+                nxt = next(todo, None)
+                if nxt is not None:
+                    pending.append((nxt[1], pool.submit(build, *nxt)))
+                yield arcname, future.result()
 
 
     @staticmethod
-    def _arcname(root: Path, file_path: Path) -> str:
+    def _open_previous(ctx: AppContext,
+        zip_path: Path) -> tuple[IO[bytes], dict[str, zipfile.ZipInfo]] | None:
         """
-        Compute the archive name for a file so it is stored relative to the root.
+        Open the existing archive for reuse by an incremental update.
 
         Args:
-            root (Path): Root directory of the tree
-            file_path (Path): File path to add to the archive
+            ctx (AppContext): The application context
+            zip_path (Path): Path of the archive
 
         Returns:
-            str: Relative path inside the zip archive (POSIX separators)
+            tuple[IO[bytes], dict[str, zipfile.ZipInfo]] | None: The open
+                archive and its entries by name, or None if there is no
+                usable archive
         """
+
         try:
-            rel = file_path.resolve(strict=False).relative_to(root.resolve(strict=False))
-        except Exception:
-            rel = Path(file_path.name)
+            f = open(zip_path, "rb")
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            ctx.logger.log(Logger.WARNING, "Cannot reuse %s: %s", zip_path, e)
+            return None
+
+        try:
+            with zipfile.ZipFile(f) as zf:
+                entries = {info.filename: info for info in zf.infolist()}
+            size = os.fstat(f.fileno()).st_size
+            # Damaged entries are dropped here, so their files get recompressed
+            # instead of failing halfway through the copy of their data
+            damaged = [name for name, info in entries.items()
+                if not ZippingService._entry_intact(f, info, size)]
+        except (zipfile.BadZipFile, OSError) as e:
+            f.close()
+            ctx.logger.log(Logger.WARNING, "Cannot reuse %s: %s", zip_path, e)
+            return None
+
+        for name in damaged:
+            del entries[name]
+        if damaged:
+            ctx.logger.log(Logger.WARNING, "Not reusing %d damaged entries of %s",
+                len(damaged), zip_path)
+
+        ctx.logger.log(Logger.DEBUG, "Loaded %d entries from %s", len(entries), zip_path)
+        return f, entries
+
+
+    @staticmethod
+    def _entry_intact(f: IO[bytes], info: zipfile.ZipInfo, size: int) -> bool:
+        """
+        Check that an entry of an open archive has a local header and that
+        its data lies within the archive, which is what _raw_chunks reads.
+
+        Args:
+            f (IO[bytes]): The open archive
+            info (zipfile.ZipInfo): The entry
+            size (int): The size of the archive
+
+        Returns:
+            bool: Whether the entry's raw data can be copied
+        """
+
+        f.seek(info.header_offset)
+        header = f.read(30)
+        if len(header) != 30 or header[:4] != b"PK\x03\x04":
+            return False
+
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        return info.header_offset + 30 + name_len + extra_len + info.compress_size <= size
+
+
+    @staticmethod
+    def _reuse_member(fp: Path, info: zipfile.ZipInfo) -> dict[str, Any] | None:
+        """
+        Check whether the previous archive's entry for the file is still up to
+        date: same size and modification time, and a matching CRC-32.
+
+        Args:
+            fp (Path): The file
+            info (zipfile.ZipInfo): The previous archive's entry for it
+
+        Returns:
+            dict[str, Any] | None: A member referring to the entry, or None if
+                it cannot be reused
+        """
+
+        if info.flag_bits & 0x1:        # Encrypted
+            return None
+
+        try:
+            with open(fp, "rb") as f:
+                st = os.fstat(f.fileno())
+                if (st.st_size != info.file_size
+                    or ZipWriter.date_time(st.st_mtime) != info.date_time):
+                    return None
+
+                crc = 0
+                while block := f.read(ZippingService._READ_BLOCK):
+                    crc = zlib.crc32(block, crc)
+        except OSError:
+            return None
+
+        if crc != info.CRC:
+            return None
+
+        return {
+            "info": info,
+            "method": info.compress_type,
+            "crc": crc,
+            "file_size": info.file_size,
+            "compress_size": info.compress_size,
+            "mtime": st.st_mtime,
+            "mode": st.st_mode,
+        }
+
+
+    @staticmethod
+    def _raw_chunks(f: IO[bytes], info: zipfile.ZipInfo) -> Iterator[bytes]:
+        """
+        Yield the raw (still compressed) data of an entry of an open archive.
+
+        Args:
+            f (IO[bytes]): The open archive
+            info (zipfile.ZipInfo): The entry
+
+        Returns:
+            Iterator[bytes]: The entry's compressed data
+
+        Raises:
+            zipfile.BadZipFile: If the entry's local header or data is damaged
+        """
+
+        f.seek(info.header_offset)
+        header = f.read(30)
+        if len(header) != 30 or header[:4] != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+
+        remaining = info.compress_size
+        while remaining:
+            chunk = f.read(min(remaining, ZippingService._READ_BLOCK))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+            remaining -= len(chunk)
+            yield chunk
+
+
+    @staticmethod
+    def _compress_member(fp: Path, level: int) -> dict[str, Any] | None:
+        """
+        Deflate (or store) one file into a spooled temporary file.
+
+        Args:
+            fp (Path): The file to compress
+            level (int): The zlib compression level, 0 stores the file
+
+        Returns:
+            dict[str, Any] | None: The member's method, crc, sizes, mtime, mode
+                and compressed data, or None if the file could not be read
+        """
+
+        try:
+            with open(fp, "rb") as f:
+                st = os.fstat(f.fileno())
+                block = f.read(ZippingService._READ_BLOCK)
+
+                method = ZippingService._choose_method(fp, block, level)
+                compressor = None
+                if method == ZipWriter.DEFLATED:
+                    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+
+                data, crc, file_size = ZippingService._spool(f, block, compressor)
+        except OSError:
+            return None
+
+        return {
+            "data": data,
+            "method": method,
+            "crc": crc,
+            "file_size": file_size,
+            "compress_size": data.tell(),
+            "mtime": st.st_mtime,
+            "mode": st.st_mode,
+        }
+
+
+    @staticmethod
+    def _spool(f: IO[bytes], block: bytes,
+        compressor: Any | None) -> tuple[IO[bytes], int, int]:
+        """
+        Copy an open file, from its first block on, into a spooled temporary
+        file, deflating it if a compressor is given.
+
+        Args:
+            f (IO[bytes]): The open file, positioned after its first block
+            block (bytes): The first block, already read
+            compressor (Any | None): A raw deflate compressobj, or None to store
+
+        Returns:
+            tuple[IO[bytes], int, int]: The spooled data (positioned at its
+                end), the CRC-32 and the uncompressed size
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+
+        data = tempfile.SpooledTemporaryFile(max_size=ZippingService._SPOOL_SIZE)
+        crc = 0
+        file_size = 0
+
+        try:
+            while block:
+                crc = zlib.crc32(block, crc)
+                file_size += len(block)
+                data.write(compressor.compress(block) if compressor else block)
+                block = f.read(ZippingService._READ_BLOCK)
+            if compressor:
+                data.write(compressor.flush())
+        except OSError:
+            data.close()
+            raise
+
+        return data, crc, file_size
+
+
+    @staticmethod
+    def _choose_method(fp: Path, head: bytes, level: int) -> int:
+        """
+        Pick the compression method for a member: formats that are already
+        compressed (by suffix, magic bytes, or a high-entropy first block)
+        are stored, everything else is deflated.
+
+        Args:
+            fp (Path): The file path
+            head (bytes): The first block of the file
+            level (int): The zlib compression level, 0 stores every file
+
+        Returns:
+            int: ZipWriter.STORED or ZipWriter.DEFLATED
+        """
+
+        if level == 0 or not head:
+            return ZipWriter.STORED
+        if fp.suffix.lower() in ZippingService._STORED_SUFFIXES:
+            return ZipWriter.STORED
+        if head.startswith(ZippingService._STORED_MAGIC):
+            return ZipWriter.STORED
+
+        if len(head) >= ZippingService._ENTROPY_MIN_SIZE:
+            sample = head[:ZippingService._ENTROPY_SAMPLE]
+            n = len(sample)
+            entropy = -sum(c / n * math.log2(c / n) for c in Counter(sample).values())
+            if entropy > ZippingService._ENTROPY_LIMIT:
+                return ZipWriter.STORED
 
-        return rel.as_posix()
+        return ZipWriter.DEFLATED
@@ -7,7 +7,7 @@ These functions might be moved to Config class completely during refactoring.
 """
 
 # Default libs
-import json, sys, os, subprocess, platform
+import json, sys, os
 from pathlib import Path
 from typing import Any
 
@@ -39,10 +39,26 @@ def get_default_config() -> dict[str, Any]:
         "config_user": False,
         "no_config": False,
         "verbose": False,
+        "profile_json": None,
+        "profile": None,
 
         # Output & export options
         "zip": None,
+        "zip_level": None,
+        "zip_incremental": False,
+        "archive_format": "zip",
         "export": None,
+        "export_max_size": None,
+        "copy_max_size": None,
+        "export_dedup": False,
+        "compress_level": None,
+        "export_cache": False,
+        "export_cache_size": 64 * 1024 * 1024,
+        "max_file_size": None,
+        "export_shard_size": None,
+        "export_shard_files": None,
+        "jobs": 1,
+        "changed_since": None,
 
         # Listing options
         "format": "txt",
@@ -93,11 +109,11 @@ def load_user_config(ctx: AppContext) -> dict[str, Any] | None:
 
     except json.JSONDecodeError as e:
         ctx.logger.log(Logger.ERROR, 
-            f"invalid JSON in config.json at line {e.lineno}, column {e.colno}")
-        ctx.logger.log(Logger.ERROR, f"{e.msg}")
+            "invalid JSON in config.json at line %d, column %d", e.lineno, e.colno)
+        ctx.logger.log(Logger.ERROR, "%s", e.msg)
 
     except Exception as e:
-        ctx.logger.log(Logger.ERROR, f"Error: Could not read config.json: {e}")
+        ctx.logger.log(Logger.ERROR, "Error: Could not read config.json: %s", e)
 
     # TODO: Implement actual validation of the config
     # but please TRY to not make it a bloated function this time
@@ -114,7 +130,7 @@ def create_default_config(ctx: AppContext) -> None:
     config_path = get_config_path()
 
     if config_path.exists():
-        ctx.logger.log(Logger.WARNING, f"config.json already exists at {config_path.absolute()}")
+        ctx.logger.log(Logger.WARNING, "config.json already exists at %s", config_path.absolute())
         return
 
     # Create config with comments (as a formatted string)
@@ -126,21 +142,24 @@ def create_default_config(ctx: AppContext) -> None:
             json.dump(config, f, indent=2, ensure_ascii=False)
             f.write('\n')
 
-        ctx.logger.log(Logger.DEBUG, f"Created config.json at {config_path.absolute()}")
+        ctx.logger.log(Logger.DEBUG, "Created config.json at %s", config_path.absolute())
         ctx.logger.log(Logger.DEBUG, "Edit this file to customize default settings for this project.")
     except Exception as e:
-        ctx.logger.log(Logger.ERROR, f"Could not create config.json: {e}")
+        ctx.logger.log(Logger.ERROR, "Could not create config.json: %s", e)
 
 
 def open_config_in_editor(ctx: AppContext) -> None:
     """
     Opens config.json in the default text editor.
     """
+    # Only needed here, so kept out of the startup path
+    import subprocess, platform
+
     config_path = get_config_path()
 
     # Create config if it doesn't exist
     if not config_path.exists():
-        ctx.logger.log(Logger.INFO, f"config.json not found. Creating default config...")
+        ctx.logger.log(Logger.INFO, "config.json not found. Creating default config...")
         create_default_config(ctx)
 
     # Try to get editor from environment variable first
@@ -174,7 +193,7 @@ def open_config_in_editor(ctx: AppContext) -> None:
                 raise Exception(f"Unsupported platform: {system}")
 
     except Exception as e:
-        ctx.logger.log(Logger.ERROR, f"Could not open editor: {e}")
-        ctx.logger.log(Logger.ERROR, f"Please manually open: {config_path.absolute()}")
+        ctx.logger.log(Logger.ERROR, "Could not open editor: %s", e)
+        ctx.logger.log(Logger.ERROR, "Please manually open: %s", config_path.absolute())
         ctx.logger.log(Logger.ERROR, 
-            f"Or set your EDITOR environment variable to your preferred editor.")
+            "Or set your EDITOR environment variable to your preferred editor.")
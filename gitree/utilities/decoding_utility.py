@@ -0,0 +1,118 @@
+# gitree/utilities/decoding_utility.py
+
+"""
+Code file for housing charset sniffing and decoding functions.
+
+Files are decoded in a single pass with an encoding picked from a small
+prefix of their bytes, instead of trying UTF-8 and re-reading on failure.
+"""
+
+# Default libs
+import codecs
+
+
+# How many leading bytes are inspected to pick the encoding
+SNIFF_SIZE = 8 * 1024
+
+# Byte order marks, longest first so UTF-32 is not mistaken for UTF-16
+_BOMS: list[tuple[bytes, str]] = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+
+def sniff_encoding(prefix: bytes | memoryview) -> str | None:
+    """
+    Guess the encoding of a file from its first bytes.
+
+    Checks for a BOM first, then for BOM-less UTF-16 (NUL bytes in every other
+    position), then whether the prefix is valid UTF-8. Anything else that
+    contains NUL bytes is considered binary.
+
+    Args:
+        prefix (bytes | memoryview): The leading bytes of the file
+
+    Returns:
+        str | None: A codec name ("utf-8", "latin-1", "utf-16-le", ...),
+            or None if the data looks binary
+    """
+
+    head = bytes(prefix[:SNIFF_SIZE])
+
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    if b"\0" in head:
+        return _sniff_utf16(head)
+
+    try:
+        # Unless it is the whole file, the prefix may end in the middle of a
+        # multi-byte character, so the decode is not final
+        final = len(prefix) <= SNIFF_SIZE
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=final)
+    except UnicodeDecodeError:
+        return "latin-1"
+
+    return "utf-8"
+
+
+def decode_bytes(data: bytes | memoryview) -> tuple[str, str] | None:
+    """
+    Decode file data in one pass using the sniffed encoding.
+
+    A file that looked like UTF-8 but turns out to be invalid further on is
+    decoded as Latin-1 if its prefix was pure ASCII, otherwise as UTF-8 with
+    the invalid bytes replaced.
+
+    Args:
+        data (bytes | memoryview): The whole file contents
+
+    Returns:
+        tuple[str, str] | None: The text and the encoding used, or None for binary data
+    """
+
+    encoding = sniff_encoding(data)
+    if encoding is None:
+        return None
+
+    if encoding != "utf-8":
+        # BOMs are stripped by the -sig codec and explicitly here for UTF-16/32
+        text = str(data, encoding, errors="replace")
+        return text.removeprefix("\ufeff"), encoding
+
+    try:
+        return str(data, "utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        if bytes(data[:SNIFF_SIZE]).isascii():
+            return str(data, "latin-1"), "latin-1"
+        return str(data, "utf-8", errors="replace"), "utf-8"
+
+
+def _sniff_utf16(head: bytes) -> str | None:
+    """
+    Detect BOM-less UTF-16 from the distribution of NUL bytes: mostly-ASCII
+    text has a NUL in every odd (LE) or even (BE) position.
+
+    Args:
+        head (bytes): The leading bytes of the file
+
+    Returns:
+        str | None: "utf-16-le", "utf-16-be", or None if the data looks binary
+    """
+
+    pairs = len(head) // 2
+    if pairs == 0:
+        return None
+
+    even_nuls = head[0:pairs * 2:2].count(0)
+    odd_nuls = head[1:pairs * 2:2].count(0)
+
+    if odd_nuls >= pairs * 0.3 and even_nuls == 0:
+        return "utf-16-le"
+    if even_nuls >= pairs * 0.3 and odd_nuls == 0:
+        return "utf-16-be"
+    return None
@@ -6,6 +6,7 @@ Utility functions for the tool.
 
 # Default libs
 import argparse
+import importlib
 
 
 def max_items_int(v: str) -> int:
@@ -46,3 +47,117 @@ def max_entries_int(v: str) -> int:
         raise argparse.ArgumentTypeError(
             "--max-entries must be >= 1 and <=10000")
     return n
+
+
+def size_bytes(v: str) -> int:
+    """
+    Convert a size argument such as 500000, 512KB, 64MB or 1GB to bytes.
+
+    Args:
+        v (str): String value from command line argument
+
+    Returns:
+        int: The size in bytes, at least 1
+
+    Raises:
+        argparse.ArgumentTypeError: If the value cannot be parsed
+    """
+    units = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+    s = v.strip().upper()
+    num = s.rstrip("KMGB")
+    unit = s[len(num):]
+
+    try:
+        n = int(float(num) * units[unit])
+    except (ValueError, KeyError):
+        raise argparse.ArgumentTypeError(f"invalid size '{v}' (e.g. 512KB, 64MB, 1GB)")
+
+    if n < 1:
+        raise argparse.ArgumentTypeError("size must be positive")
+    return n
+
+
+def positive_int(v: str) -> int:
+    """
+    Validate and convert an argument that must be a positive integer.
+
+    Args:
+        v (str): String value from command line argument
+
+    Returns:
+        int: Validated integer >= 1
+
+    Raises:
+        argparse.ArgumentTypeError: If value is below 1
+    """
+    n = int(v)
+    if n < 1:
+        raise argparse.ArgumentTypeError("value must be >= 1")
+    return n
+
+
+def zip_level_int(v: str) -> int:
+    """
+    Validate and convert zip-level argument to integer.
+
+    Args:
+        v (str): String value from command line argument
+
+    Returns:
+        int: Validated integer between 0 and 9
+
+    Raises:
+        argparse.ArgumentTypeError: If value is outside valid range
+    """
+    n = int(v)
+    if n < 0 or n > 9:
+        raise argparse.ArgumentTypeError(
+            "--zip-level must be >= 0 and <= 9 (0 stores all files uncompressed)")
+    return n
+
+
+def zstd_available() -> bool:
+    """
+    Return whether .zst exports can be written, which needs Python 3.14+
+    (compression.zstd) or the 'zstandard' package.
+    """
+    for name in ("compression.zstd", "zstandard"):
+        try:
+            importlib.import_module(name)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+def compress_levels(suffix: str) -> tuple[int, int] | None:
+    """
+    Return the valid --compress-level range for an export file suffix.
+
+    Args:
+        suffix (str): The export file suffix, e.g. ".gz"
+
+    Returns:
+        tuple[int, int] | None: The lowest and highest level, or None if the
+            suffix is not compressed or its zstd module is unavailable
+    """
+    suffix = suffix.lower()
+    if suffix in (".gz", ".xz"):
+        return 0, 9
+    if suffix == ".bz2":
+        return 1, 9
+    if suffix != ".zst":
+        return None
+
+    try:
+        from compression import zstd        # Python 3.14+
+        return zstd.CompressionParameter.compression_level.bounds()
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    # zstd's fastest negative level is -(1 << 17)
+    return -(1 << 17), zstandard.MAX_COMPRESSION_LEVEL
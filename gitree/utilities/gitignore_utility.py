@@ -22,6 +22,13 @@ class GitIgnoreMatcher:
     def add_gitignore(self, gitignore: GitIgnore):
         self.gitignores.append(gitignore)
 
+
+    def copy(self) -> "GitIgnoreMatcher":
+        """ Return a matcher with the same gitignores, to branch into a subdir """
+        matcher = GitIgnoreMatcher()
+        matcher.gitignores = list(self.gitignores)
+        return matcher
+
     
     def excluded(self, item_path: Path) -> bool:
         for gitignore in self.gitignores:
@@ -0,0 +1,128 @@
+# gitree/utilities/ingest_utility.py
+
+"""
+Code file for housing MappedFile class.
+
+Used to copy the contents of large files into an output stream in bounded
+slices, instead of building a full Python str per file.
+"""
+
+# Default libs
+import codecs, json, mmap
+from pathlib import Path
+from typing import IO, Iterator
+
+
+class MappedFile:
+    """
+    Lazily ingested file contents for large files.
+
+    The file is memory-mapped when it is iterated and handed out in bounded
+    slices; files that cannot be mapped (pipes, procfs and the like) fall
+    back to plain chunked reads. Only ASCII-compatible encodings (utf-8,
+    utf-8-sig, latin-1) are supported, so newlines can be found bytewise.
+    """
+
+    # Size of the slices handed to the output stream
+    CHUNK_SIZE = 1024 * 1024
+
+    # Encodings whose contents can be sliced and searched for newlines bytewise
+    ENCODINGS = ("utf-8", "utf-8-sig", "latin-1")
+
+
+    def __init__(self, path: Path, encoding: str, strip_newlines: bool = False) -> None:
+        """
+        Args:
+            path (Path): The file to ingest
+            encoding (str): The encoding of the file, valid over all of it
+            strip_newlines (bool): Drop trailing newlines, like str.rstrip("\\n")
+        """
+        self.path = path
+        self.strip_newlines = strip_newlines
+
+        # The BOM is skipped while slicing, the rest is plain UTF-8
+        self.offset = len(codecs.BOM_UTF8) if encoding == "utf-8-sig" else 0
+        self.encoding = "utf-8" if encoding == "utf-8-sig" else encoding
+
+
+    def write_to(self, out: IO[str]) -> None:
+        """
+        Write the contents to a text stream. UTF-8 contents, which the caller
+        has checked to be valid, are copied as raw slices into the underlying
+        binary buffer when the stream has one.
+
+        Args:
+            out (IO[str]): The text stream to write to
+        """
+        buffer = getattr(out, "buffer", None)
+        if buffer is None or self.encoding != "utf-8":
+            for text in self.iter_text():
+                out.write(text)
+            return
+
+        out.flush()         # Keep already written text ahead of the raw bytes
+        for chunk in self.iter_bytes():
+            buffer.write(chunk)
+
+
+    def iter_text(self) -> Iterator[str]:
+        """ Yield the contents as decoded text pieces of bounded size """
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        for chunk in self.iter_bytes():
+            if text := decoder.decode(chunk):
+                yield text
+        if text := decoder.decode(b"", final=True):
+            yield text
+
+
+    def iter_json(self) -> Iterator[str]:
+        """ Yield the contents as pieces of an escaped JSON string body (no quotes) """
+        for text in self.iter_text():
+            yield json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+    def iter_bytes(self) -> Iterator[bytes | memoryview]:
+        """ Yield the raw contents in slices of at most CHUNK_SIZE bytes """
+        with open(self.path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                yield from self._iter_read(f)
+                return
+
+            with mm:
+                view = memoryview(mm)
+                try:
+                    end = self._content_end(mm)
+                    for start in range(self.offset, end, self.CHUNK_SIZE):
+                        chunk = view[start:min(start + self.CHUNK_SIZE, end)]
+                        try:
+                            yield chunk
+                        finally:
+                            chunk.release()
+                finally:
+                    view.release()
+
+
+    def _iter_read(self, f: IO[bytes]) -> Iterator[bytes]:
+        """ Fallback for files that cannot be mapped """
+        f.read(self.offset)
+        pending = b""
+        while chunk := f.read(self.CHUNK_SIZE):
+            if self.strip_newlines:
+                # Hold back trailing newlines until more data shows up
+                chunk = pending + chunk
+                body = chunk.rstrip(b"\n")
+                pending = chunk[len(body):]
+                chunk = body
+            if chunk:
+                yield chunk
+
+
+    def _content_end(self, mm: mmap.mmap) -> int:
+        """ Return the end offset of the contents, excluding stripped newlines """
+        end = len(mm)
+        if self.strip_newlines:
+            while end > self.offset and mm[end - 1] == 0x0A:
+                end -= 1
+        return end
@@ -1,9 +1,13 @@
-# gitree/utilities/logger.py
+# gitree/utilities/logging_utility.py
 
 """
 Code file for housing Logger and OutputBuffer classes.
 """
 
+# Default libs
+from collections import deque
+from typing import Any, Callable, TextIO
+
 
 class Logger:
     """
@@ -11,6 +15,12 @@ class Logger:
 
     Collect debug messages in memory via log() and print them
     all at once using flush() method.
+
+    - Messages below the level threshold are discarded on the spot.
+    - Formatting is deferred until the messages are printed: the message may
+      be a %-style format with its args, or a callable returning the message.
+    - With a capacity, only the latest messages are kept (a ring buffer) and
+      the number of dropped ones is reported when flushing.
     """
 
     # Constant log levels
@@ -19,10 +29,19 @@ class Logger:
     WARNING = 30
     ERROR = 40
 
+    # Threshold that discards every leveled message
+    OFF = 100
 
-    def __init__(self):
+    # Capacity of the app's logger, so runs with many warnings stay bounded
+    DEFAULT_CAPACITY = 10_000
+
+
+    def __init__(self, capacity: int | None = None):
         """
         Initialize the logger with an empty buffer.
+
+        Args:
+            capacity: The maximum number of messages kept, None for no limit
         """
 
         self._LEVEL_NAMES: dict[int, str] = {
@@ -31,34 +50,67 @@ class Logger:
             30: "WARNING",
             40: "ERROR",
         }
-        self._messages: list[str] = []
+        self.level = self.DEBUG
+        self.dropped = 0
 
+        # (level, message, args) records, formatted when read
+        self._capacity = capacity
+        self._messages: deque[tuple[int | None, Any, tuple[Any, ...]]] = \
+            deque(maxlen=capacity)
 
-    def log(self, level: str | None, message: str) -> None:
+
+    def log(self, level: int | None, message: str | Callable[[], str], *args: Any) -> None:
         """
-        Store a debug message.
+        Store a debug message, if its level is not below the threshold.
 
         Args:
-            message: The debug message to store
+            level: The log level, None for a raw message that is always kept
+            message: The message, a %-style format for args, or a callable
+                returning the message
+            args: The args of a %-style format
         """
 
-        if level is None:
-            self._messages.append(message)
-        else:
-            self._messages.append(self._append_level(level, message))
+        if level is not None and level < self.level:
+            return
 
+        if len(self._messages) == self._capacity:
+            self.dropped += 1
+        self._messages.append((level, message, args))
 
-    def flush(self) -> None:
+
+    def set_level(self, level: int) -> None:
+        """
+        Set the level threshold, discarding the stored messages below it.
+
+        Args:
+            level: The lowest level kept, OFF to discard every leveled message
+        """
+
+        self.level = level
+        kept = [record for record in self._messages
+            if record[0] is None or record[0] >= level]
+        self._messages.clear()
+        self._messages.extend(kept)
+
+
+    def flush(self, file: TextIO | None = None) -> None:
         """
         Print all stored debug messages to the terminal and clear the buffer.
+
+        Args:
+            file: The stream to print to (default: stdout)
         """
 
-        if not self._messages:
-            print("No log messages to display.")
+        if self.dropped:
+            print(self._append_level(self.WARNING, f"{self.dropped} earlier log "
+                "messages were dropped"), file=file)
+
+        elif not self._messages:
+            print("No log messages to display.", file=file)
             return
         
-        for message in self._messages:
-            print(message)
+        for message in self.get_logs():
+            print(message, file=file)
         self.clear()
 
 
@@ -68,6 +120,7 @@ class Logger:
         """
 
         self._messages.clear()
+        self.dropped = 0
 
     
     def empty(self) -> bool:
@@ -80,13 +133,13 @@ class Logger:
 
     def get_logs(self) -> list[str]:
         """
-        Get a copy of the stored messages in the buffer.
+        Get the stored messages in the buffer, formatted.
 
         Returns:
             List[str]: a list of the stored messages
         """
 
-        return self._messages.copy()
+        return [self._format(record) for record in self._messages]
 
 
     def __len__(self) -> int:
@@ -100,7 +153,26 @@ class Logger:
         return len(self._messages)
     
 
-    def _append_level(self, level: str, message: str) -> str:
+    def _format(self, record: tuple[int | None, Any, tuple[Any, ...]]) -> str:
+        """
+        Format a stored record into its message.
+
+        Args:
+            record: The (level, message, args) record
+
+        Returns:
+            The message, prefixed with its level if it has one
+        """
+
+        level, message, args = record
+        if callable(message):
+            message = message()
+        if args:
+            message = message % args
+        return message if level is None else self._append_level(level, message)
+
+
+    def _append_level(self, level: int, message: str) -> str:
         """
         Append the log level to the message.
 
@@ -118,6 +190,9 @@ class Logger:
 class OutputBuffer(Logger):
     """
     A custom output buffer to capture stdout writes. A wrapper around Logger.
+
+    It stores the lines as they are, without the level threshold, capacity
+    or deferred formatting of the logger.
     """
 
     def __init__(self):
@@ -125,6 +200,7 @@ class OutputBuffer(Logger):
         Initialize the output buffer with a reference to a Logger.
         """
         super().__init__()
+        self._messages: list[str] = []
 
 
     def write(self, message: str) -> None:
@@ -134,7 +210,7 @@ class OutputBuffer(Logger):
         Args:
             message: The message to write
         """
-        super().log(level=None, message=message)
+        self._messages.append(message)
 
 
     def get_value(self) -> list[str]:
@@ -144,7 +220,12 @@ class OutputBuffer(Logger):
         Returns:
             str: The contents of the output buffer
         """
-        return super().get_logs()
+        return list(self._messages)
+
+
+    def get_logs(self) -> list[str]:
+        """ Same as get_value(), the lines are stored unformatted """
+        return self.get_value()
     
 
     def flush(self) -> None:
@@ -158,4 +239,3 @@ class OutputBuffer(Logger):
 
         for message in self.get_value():
             print(message)
-    
\ No newline at end of file
@@ -0,0 +1,312 @@
+# gitree/utilities/profiling_utility.py
+
+"""
+Code file for housing Profiler class.
+"""
+
+# Default libs
+import io, json, os, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator, TypeVar
+
+# Deps from this project
+from .logging_utility import Logger
+
+T = TypeVar("T")
+
+
+class Profiler:
+    """
+    Collects the time spent in each phase of a run and counters of the work
+    done, reported as JSON with --profile-json.
+
+    - Phases are timed with phase() or add(). They may nest (e.g.
+      gitignore_load is also part of traversal), so their times do not add up
+      to the total.
+    - Counters (and timings taken per item, like gitignore_match) are only
+      recorded while enabled, so on normal runs they cost an attribute check.
+    - Safe to use from worker threads.
+    - With --profile, start_capture() runs cProfile or tracemalloc until
+      stop_capture() logs the results. tracemalloc also records the peak
+      memory of each phase entered on the main thread, and the top allocation
+      sites of the outermost ones. The modules are only imported then.
+    """
+
+    # Counters that are always present in the report
+    COUNTERS = ("dirs_listed", "entries_seen", "stat_calls", "gitignore_rules",
+        "bytes_read", "bytes_written")
+
+    # File that --profile cpu writes its stats to, readable with pstats/snakeviz
+    CPU_FILE = "gitree.prof"
+
+    # Functions in the --profile cpu summary
+    CPU_TOP = 25
+
+    # Allocation sites per phase in the --profile memory summary
+    MEMORY_TOP = 5
+
+
+    def __init__(self) -> None:
+        self.enabled = False
+
+        self._start = time.perf_counter()
+        self._phases: dict[str, list[float]] = {}     # name -> [seconds, calls]
+        self._counters: dict[str, int] = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+        self._cpu: Any = None               # cProfile.Profile while capturing
+        self._memory: dict[str, dict[str, Any]] = {}
+        self._memory_stack: list[list[Any]] | None = None   # Open phases while tracing
+
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time the enclosed block as (part of) a phase.
+
+        Args:
+            name (str): The phase name
+        """
+        memory = (self._memory_stack is not None
+            and threading.current_thread() is threading.main_thread())
+        if memory:
+            self._enter_memory_phase(name)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+            if memory:
+                self._exit_memory_phase()
+
+
+    def timed(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """
+        Yield from an iterable, timing only the work done to produce each item
+        as a phase (not the work the consumer does in between).
+
+        Args:
+            name (str): The phase name
+            items (Iterable): The items to time
+        """
+        it = iter(items)
+        done = object()
+        while True:
+            start = time.perf_counter()
+            item = next(it, done)
+            self.add(name, time.perf_counter() - start, calls=0 if item is done else 1)
+            if item is done:
+                return
+            yield item
+
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        """
+        Add time to a phase.
+
+        Args:
+            name (str): The phase name
+            seconds (float): The time spent
+            calls (int): How many times the phase ran
+        """
+        with self._lock:
+            entry = self._phases.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Increase a counter, if enabled.
+
+        Args:
+            name (str): The counter name
+            n (int): The amount to add
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+
+    def count_file(self, name: str, path: str | Path) -> None:
+        """
+        Increase a counter by the size of a file, if enabled (e.g. an output
+        that was written through a compressor or by several writers).
+
+        Args:
+            name (str): The counter name
+            path (str | Path): The file, missing files are ignored
+        """
+        if not self.enabled:
+            return
+        try:
+            self.count(name, os.path.getsize(path))
+        except OSError:
+            pass
+
+
+    def start_capture(self, mode: str) -> None:
+        """
+        Start profiling the rest of the run.
+
+        Args:
+            mode (str): "cpu" for cProfile, "memory" for tracemalloc
+        """
+        if mode == "cpu":
+            import cProfile
+            self._cpu = cProfile.Profile()
+            self._cpu.enable()
+
+        elif mode == "memory":
+            import tracemalloc
+            tracemalloc.start()
+            self._memory_stack = []
+
+
+    def stop_capture(self, logger: Logger) -> None:
+        """
+        Stop profiling and log the results, to be shown with --verbose. The cpu
+        stats are also written to CPU_FILE.
+
+        Args:
+            logger (Logger): The logger to write the summary to
+        """
+        if self._cpu is not None:
+            self._cpu.disable()
+            self._log_cpu(logger)
+            self._cpu = None
+
+        if self._memory_stack is not None:
+            import tracemalloc
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._memory_stack = None
+            self._log_memory(logger, peak)
+
+
+    def report(self) -> dict[str, Any]:
+        """
+        Return the profile as a JSON serializable dict.
+
+        Returns:
+            dict[str, Any]: The total time, the time and calls per phase (in
+                milliseconds), the counters, and the memory per phase if it
+                was traced
+        """
+        with self._lock:
+            report = {
+                "version": 1,
+                "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+                "phases": {
+                    name: {"ms": round(seconds * 1000, 3), "calls": int(calls)}
+                    for name, (seconds, calls) in self._phases.items()
+                },
+                "counters": dict(self._counters),
+            }
+        if self._memory:
+            report["memory"] = {
+                name: {"peak_bytes": record["peak"], "growth_bytes": record["growth"]}
+                for name, record in self._memory.items()
+            }
+        return report
+
+
+    def write_json(self, path: str) -> None:
+        """
+        Write the report to a JSON file.
+
+        Args:
+            path (str): The file path
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+            f.write("\n")
+
+
+    def _enter_memory_phase(self, name: str) -> None:
+        """
+        Start tracking the peak memory of a phase. The peak so far is folded
+        into the enclosing phase first, since the peak counter is shared.
+        """
+        import tracemalloc
+        stack = self._memory_stack
+
+        # Sites are only compared for outermost phases, snapshots are slow
+        snapshot = tracemalloc.take_snapshot() if not stack else None
+
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        stack.append([name, current, current, snapshot])     # name, peak, start, snapshot
+
+
+    def _exit_memory_phase(self) -> None:
+        """ Record the peak memory of the innermost phase (and its top sites) """
+        import tracemalloc
+        stack = self._memory_stack
+        name, peak, start, snapshot = stack.pop()
+
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+
+        record = self._memory.setdefault(name, {"peak": 0, "growth": 0, "top": []})
+        record["peak"] = max(record["peak"], peak)
+        record["growth"] = max(record["growth"], peak - start)
+
+        if snapshot is not None:
+            ignore = [tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__)]
+            stats = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(
+                snapshot.filter_traces(ignore), "lineno")
+            record["top"] = [(str(stat.traceback[0]), stat.size_diff)
+                for stat in stats[:self.MEMORY_TOP] if stat.size_diff > 0]
+
+        tracemalloc.reset_peak()
+
+
+    def _log_cpu(self, logger: Logger) -> None:
+        """ Write the cProfile stats to CPU_FILE and log the top functions """
+        import pstats
+
+        try:
+            self._cpu.dump_stats(self.CPU_FILE)
+            where = f"written to {self.CPU_FILE}"
+        except OSError as e:
+            logger.log(Logger.ERROR, "Could not write CPU profile %s: %s", self.CPU_FILE, e)
+            where = "not written"
+
+        def summary() -> str:
+            out = io.StringIO()
+            stats = pstats.Stats(cpu, stream=out)
+            stats.strip_dirs().sort_stats("cumulative").print_stats(self.CPU_TOP)
+            return (f"CPU profile {where}, top {self.CPU_TOP} functions by "
+                f"cumulative time:\n{out.getvalue().strip()}")
+
+        # Only formatted if the log is shown
+        cpu = self._cpu
+        logger.log(Logger.INFO, summary)
+
+
+    def _log_memory(self, logger: Logger, peak: int) -> None:
+        """ Log the overall peak memory and the peak and top sites of each phase """
+        for name, record in self._memory.items():
+            peak = max(peak, record["peak"])
+
+        logger.log(Logger.INFO, "Peak traced memory: %.1f KB (traced after argument "
+            "parsing)", peak / 1024)
+
+        for name, record in self._memory.items():
+            lines = [f"Memory in phase {name}: peak {record['peak'] / 1024:.1f} KB, "
+                f"+{record['growth'] / 1024:.1f} KB over its start"]
+            lines.extend(f"    {site}: +{size / 1024:.1f} KB" for site, size in record["top"])
+            logger.log(Logger.INFO, "\n".join(lines))
@@ -0,0 +1,91 @@
+# gitree/utilities/tee_utility.py
+
+"""
+Code file for housing OutputSink and TeeWriter classes.
+
+Used to render an export once and fan it out to several destinations
+(file, stdout, clipboard, ...), each with its own size limit.
+"""
+
+# Default libs
+from typing import IO, Callable
+
+
+class OutputSink:
+    """
+    One destination of a tee'd export: a text stream with an optional size
+    limit, past which further output is dropped and the sink marked truncated.
+    """
+
+    def __init__(self, name: str, stream: IO[str], limit: int | None = None,
+        on_close: Callable[[IO[str]], None] | None = None, owned: bool = True) -> None:
+        """
+        Args:
+            name (str): Name used in log messages (e.g. the file path)
+            stream (IO[str]): The text stream to write to
+            limit (int | None): Maximum number of UTF-8 bytes to write, or None
+            on_close (Callable | None): Called with the stream before it is closed
+            owned (bool): Whether closing the sink closes the stream (not for stdout)
+        """
+        self.name = name
+        self.stream = stream
+        self.limit = limit
+        self.on_close = on_close
+        self.owned = owned
+
+        self.written = 0
+        self.truncated = False
+
+
+    def write(self, text: str) -> None:
+        """ Write text, cutting it off at the size limit """
+
+        if self.truncated:
+            return
+        if self.limit is None:
+            self.stream.write(text)
+            return
+
+        data = text.encode("utf-8")
+        if self.written + len(data) > self.limit:
+            # Cut at the limit, dropping a partial multi-byte character
+            data = data[:self.limit - self.written]
+            text = data.decode("utf-8", errors="ignore")
+            self.truncated = True
+
+        self.stream.write(text)
+        self.written += len(data)
+
+
+    def close(self) -> None:
+        """ Run the on_close callback, then close (or just flush) the stream """
+        if self.on_close is not None:
+            self.on_close(self.stream)
+        if self.owned:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+
+class TeeWriter:
+    """
+    Text stream lookalike that writes everything to all of its sinks.
+    """
+
+    def __init__(self, sinks: list[OutputSink]) -> None:
+        """
+        Args:
+            sinks (list[OutputSink]): The sinks to fan out to
+        """
+        self.sinks = sinks
+
+
+    def write(self, text: str) -> int:
+        for sink in self.sinks:
+            sink.write(text)
+        return len(text)
+
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            sink.stream.flush()
@@ -0,0 +1,106 @@
+# gitree/utilities/tree_control_utility.py
+
+"""
+Code file for housing TreeListControl class.
+
+A prompt_toolkit control for the interactive selector that only formats the
+rows the window actually shows, so redraws do not scale with the tree size.
+"""
+
+# Default libs
+from typing import Any, Callable
+
+# Dependencies
+from prompt_toolkit.data_structures import Point
+from prompt_toolkit.formatted_text import StyleAndTextTuples
+from prompt_toolkit.layout.controls import UIContent, UIControl
+
+
+class TreeListControl(UIControl):
+    """
+    Virtualized list of tree rows.
+
+    - create_content() hands the window a lazy get_line, which the window
+      only calls for the rows inside its viewport.
+    - Formatted rows are cached; callers invalidate a row (or everything)
+      when a checked state changes. The cursor highlight is applied on top
+      of the cached fragments, so moving the cursor invalidates nothing.
+    """
+
+    def __init__(self, rows: list[dict[str, Any]], get_cursor: Callable[[], int],
+        get_state: Callable[[dict[str, Any]], bool | None]) -> None:
+        """
+        Args:
+            rows (list[dict[str, Any]]): The visible tree rows ("type", "path",
+                "depth", and "expanded" and "loading" for dirs), in render order
+            get_cursor (Callable[[], int]): Returns the index of the cursor row
+            get_state (Callable): Returns the checked state of a row: True,
+                False, or None if partly checked
+        """
+        self.rows = rows
+        self.get_cursor = get_cursor
+        self.get_state = get_state
+        self._cache: dict[int, tuple[str, tuple[str, str], str]] = {}
+
+
+    def invalidate(self, index: int | None = None) -> None:
+        """
+        Drop cached fragments after a checked state changed.
+
+        Args:
+            index (int | None): The row that changed, or None for all rows
+        """
+        if index is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(index, None)
+
+
+    def create_content(self, width: int, height: int) -> UIContent:
+        return UIContent(
+            get_line=self._get_line,
+            line_count=len(self.rows),
+            cursor_position=Point(x=0, y=self.get_cursor()),
+            show_cursor=False,
+        )
+
+
+    def is_focusable(self) -> bool:
+        return True
+
+
+    def _get_line(self, index: int) -> StyleAndTextTuples:
+        """ Return the fragments of one row, formatting it on first use """
+
+        parts = self._cache.get(index)
+        if parts is None:
+            row = self.rows[index]
+            parts = self._cache[index] = self._format_row(row, self.get_state(row))
+
+        indent, star, label = parts
+        cursor_style = "class:cursor" if index == self.get_cursor() else ""
+        return [(cursor_style, indent), star, (cursor_style, label)]
+
+
+    @staticmethod
+    def _format_row(item: dict[str, Any], state: bool | None) -> tuple[str, tuple[str, str], str]:
+        """ Format a row into its indent, checkbox fragment and label """
+
+        indent = "  " * item["depth"]
+
+        if state:
+            star = ("class:star", "[ ✓ ] ")
+        elif state is None:
+            star = ("class:star", "[ ~ ] ")
+        else:
+            star = ("", "[ ] ")
+
+        label = item["path"].split("/")[-1]
+        if item["type"] == "dir":
+            label = ("▾ " if item["expanded"] else "▸ ") + label + "/"
+            if item["loading"]:
+                label += " …"
+        else:
+            label = "  " + label
+
+        return indent, star, label
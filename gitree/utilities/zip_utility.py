@@ -0,0 +1,246 @@
+# gitree/utilities/zip_utility.py
+
+"""
+Code file for housing ZipWriter class.
+
+A small ZIP writer for members that were compressed elsewhere (for example
+in a worker pool), which zipfile.ZipFile cannot write directly, and for
+members streamed to pipes without knowing their sizes up front.
+"""
+
+# Default libs
+import struct, time
+from typing import IO, Iterable
+
+
+class ZipWriter:
+    """
+    Writes already-compressed members and the central directory to a binary
+    stream, strictly sequentially. The stream is never seeked, so it may be
+    a pipe: members whose sizes are only known after writing their data get
+    a trailing data descriptor. Archives that outgrow the classic limits are
+    written as ZIP64.
+    """
+
+    STORED = 0
+    DEFLATED = 8
+
+    # Field values reaching these need ZIP64 records
+    _ZIP64_LIMIT = 0xFFFFFFFF
+    _ZIP64_COUNT_LIMIT = 0xFFFF
+
+    # General purpose flags for UTF-8 file names and trailing data descriptors
+    _FLAG_UTF8 = 0x800
+    _FLAG_DESCRIPTOR = 0x08
+
+    # Version made by: unix (3), spec 2.0 / 4.5
+    _CREATE_SYSTEM = 3
+
+
+    def __init__(self, out: IO[bytes]) -> None:
+        """
+        Args:
+            out (IO[bytes]): A writable binary stream, seekable or not
+        """
+        self._out = out
+        self._offset = 0
+        self._central: list[bytes] = []
+        self._open_member: dict | None = None
+
+
+    def write_member(self, arcname: str, *, method: int, crc: int, file_size: int,
+        compress_size: int, chunks: Iterable[bytes], mtime: float,
+        mode: int = 0o100644) -> None:
+        """
+        Write one member whose compressed data and sizes are known up front.
+
+        Args:
+            arcname (str): Name inside the archive (POSIX separators)
+            method (int): ZipWriter.STORED or ZipWriter.DEFLATED
+            crc (int): CRC-32 of the uncompressed data
+            file_size (int): Uncompressed size
+            compress_size (int): Size of the data in chunks
+            chunks (Iterable[bytes]): The (raw deflate or stored) member data
+            mtime (float): Modification time as a timestamp
+            mode (int): Unix file mode stored in the external attributes
+        """
+        zip64 = file_size >= self._ZIP64_LIMIT or compress_size >= self._ZIP64_LIMIT
+        name = arcname.encode("utf-8")
+        dos_time, dos_date = self._dos_datetime(mtime)
+        flags = self._FLAG_UTF8
+        version = 45 if zip64 else 20
+
+        extra = b""
+        if zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, file_size, compress_size)
+
+        offset = self._offset
+        self._write(struct.pack("<IHHHHHIIIHH", 0x04034B50, version, flags, method,
+            dos_time, dos_date, crc,
+            self._ZIP64_LIMIT if zip64 else compress_size,
+            self._ZIP64_LIMIT if zip64 else file_size,
+            len(name), len(extra)))
+        self._write(name)
+        self._write(extra)
+
+        for chunk in chunks:
+            self._write(chunk)
+
+        self._add_central(name, version, flags, method, dos_time, dos_date, crc,
+            file_size, compress_size, offset, mode)
+
+
+    def begin_member(self, arcname: str, *, method: int, mtime: float,
+        mode: int = 0o100644, size_hint: int = 0) -> None:
+        """
+        Start a member whose sizes and CRC are not known yet. Its data is
+        passed to write_data() and the member finished with end_member(),
+        which writes a data descriptor after the data.
+
+        Args:
+            arcname (str): Name inside the archive (POSIX separators)
+            method (int): ZipWriter.STORED or ZipWriter.DEFLATED
+            mtime (float): Modification time as a timestamp
+            mode (int): Unix file mode stored in the external attributes
+            size_hint (int): Expected uncompressed size, used to decide
+                up front whether the member needs ZIP64 records
+        """
+        # Leave some room for deflate overhead and files that grow meanwhile
+        zip64 = size_hint * 1.05 >= self._ZIP64_LIMIT
+        name = arcname.encode("utf-8")
+        dos_time, dos_date = self._dos_datetime(mtime)
+        flags = self._FLAG_UTF8 | self._FLAG_DESCRIPTOR
+        version = 45 if zip64 else 20
+
+        extra = b""
+        if zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+
+        offset = self._offset
+        self._write(struct.pack("<IHHHHHIIIHH", 0x04034B50, version, flags, method,
+            dos_time, dos_date, 0,
+            self._ZIP64_LIMIT if zip64 else 0,
+            self._ZIP64_LIMIT if zip64 else 0,
+            len(name), len(extra)))
+        self._write(name)
+        self._write(extra)
+
+        self._open_member = {
+            "name": name, "version": version, "flags": flags, "method": method,
+            "dos_time": dos_time, "dos_date": dos_date, "offset": offset,
+            "data_start": self._offset, "zip64": zip64, "mode": mode,
+        }
+
+
+    def write_data(self, data: bytes) -> None:
+        """ Append (compressed) data to the member started with begin_member() """
+        self._write(data)
+
+
+    def end_member(self, crc: int, file_size: int) -> None:
+        """
+        Finish the member started with begin_member() by writing its data
+        descriptor.
+
+        Args:
+            crc (int): CRC-32 of the uncompressed data
+            file_size (int): Uncompressed size
+
+        Raises:
+            ValueError: If the member outgrew the size decided in begin_member()
+        """
+        m = self._open_member
+        self._open_member = None
+        compress_size = self._offset - m["data_start"]
+
+        if m["zip64"]:
+            self._write(struct.pack("<IIQQ", 0x08074B50, crc, compress_size, file_size))
+        elif file_size >= self._ZIP64_LIMIT or compress_size >= self._ZIP64_LIMIT:
+            raise ValueError(f"{m['name'].decode()} grew beyond the size it was started with")
+        else:
+            self._write(struct.pack("<IIII", 0x08074B50, crc, compress_size, file_size))
+
+        self._add_central(m["name"], m["version"], m["flags"], m["method"],
+            m["dos_time"], m["dos_date"], crc, file_size, compress_size,
+            m["offset"], m["mode"])
+
+
+    def close(self) -> None:
+        """ Write the central directory and end records. Does not close the stream """
+
+        cd_offset = self._offset
+        for record in self._central:
+            self._write(record)
+        cd_size = self._offset - cd_offset
+        count = len(self._central)
+
+        if (count >= self._ZIP64_COUNT_LIMIT or cd_size >= self._ZIP64_LIMIT
+            or cd_offset >= self._ZIP64_LIMIT):
+            eocd64_offset = self._offset
+            self._write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44,
+                (self._CREATE_SYSTEM << 8) | 45, 45, 0, 0, count, count, cd_size, cd_offset))
+            self._write(struct.pack("<IIQI", 0x07064B50, 0, eocd64_offset, 1))
+
+        self._write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0,
+            min(count, self._ZIP64_COUNT_LIMIT), min(count, self._ZIP64_COUNT_LIMIT),
+            min(cd_size, self._ZIP64_LIMIT), min(cd_offset, self._ZIP64_LIMIT), 0))
+
+
+    def _add_central(self, name: bytes, version: int, flags: int, method: int,
+        dos_time: int, dos_date: int, crc: int, file_size: int, compress_size: int,
+        offset: int, mode: int) -> None:
+        """ Record the central directory header of a written member """
+
+        # Only the fields that overflow go into the ZIP64 extra, in this order
+        fields = []
+        if file_size >= self._ZIP64_LIMIT:
+            fields.append(file_size)
+        if compress_size >= self._ZIP64_LIMIT:
+            fields.append(compress_size)
+        if offset >= self._ZIP64_LIMIT:
+            fields.append(offset)
+
+        extra = b""
+        if fields:
+            extra = struct.pack(f"<HH{len(fields)}Q", 0x0001, 8 * len(fields), *fields)
+            version = 45
+
+        self._central.append(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50,
+            (self._CREATE_SYSTEM << 8) | version, version, flags, method,
+            dos_time, dos_date, crc,
+            min(compress_size, self._ZIP64_LIMIT), min(file_size, self._ZIP64_LIMIT),
+            len(name), len(extra), 0, 0, 0, (mode & 0xFFFF) << 16,
+            min(offset, self._ZIP64_LIMIT)) + name + extra)
+
+
+    def _write(self, data: bytes) -> None:
+        """ Write to the stream, keeping track of the offset without seeking """
+        self._out.write(data)
+        self._offset += len(data)
+
+
+    @staticmethod
+    def date_time(mtime: float) -> tuple[int, int, int, int, int, int]:
+        """
+        Return the modification time as stored in an archive: a local time
+        tuple like zipfile.ZipInfo.date_time, clamped to the 1980-2107 range,
+        with seconds rounded down to an even number.
+
+        Args:
+            mtime (float): Modification time as a timestamp
+
+        Returns:
+            tuple[int, int, int, int, int, int]: (year, month, day, hour, minute, second)
+        """
+        t = time.localtime(mtime)[:6]
+        year, month, day, hour, minute, second = min(max(t, (1980, 1, 1, 0, 0, 0)),
+            (2107, 12, 31, 23, 59, 59))
+        return year, month, day, hour, minute, second - second % 2
+
+
+    @staticmethod
+    def _dos_datetime(mtime: float) -> tuple[int, int]:
+        """ Convert a timestamp to DOS (time, date) """
+        year, month, day, hour, minute, second = ZipWriter.date_time(mtime)
+        return (hour << 11 | minute << 5 | second // 2,
+            (year - 1980) << 9 | month << 5 | day)
@@ -40,21 +40,22 @@ class BaseCLISetup(unittest.TestCase):
         self._tmpdir.cleanup()
 
 
-    def run_gitree(self, *args):
+    def run_gitree(self, *args, binary: bool = False):
         """
         Helper to run gitree with the CLI consistently. The path given to the tool is
         the temporary dir path.
 
         Args:
             args (tuple): extra CLI arguments, e.g. "--max-depth 1", "--help", "--zip output.zip"
+            binary (bool): capture stdout and stderr as bytes instead of text
         """
 
         return subprocess.run(
             [sys.executable, "-m", "gitree.main", *args],
             cwd=self.root,
             capture_output=True,
-            text=True,
-            encoding="utf-8",
+            text=not binary,
+            encoding=None if binary else "utf-8",
         )
 
 
@@ -0,0 +1,8 @@
+# tests/benchmarks/__init__.py
+
+"""
+Benchmark suite for the pipeline stages of the tool.
+
+Run it with python -m tests.benchmarks (see --help). Only the smoke test in
+this package runs with the unit tests.
+"""
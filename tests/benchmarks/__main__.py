@@ -0,0 +1,63 @@
+# tests/benchmarks/__main__.py
+
+"""
+This file runs the benchmarks, e.g.:
+
+    python -m tests.benchmarks --output results.json
+    python -m tests.benchmarks --baseline results.json --threshold 0.2
+
+Exits with status 1 if a benchmark regressed against the baseline.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from tests.benchmarks.generator import SHAPES
+from tests.benchmarks.runner import BENCHMARKS, compare, format_results, run_in_tempdir
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(prog="python -m tests.benchmarks",
+        description="Benchmark the pipeline stages of gitree on synthetic repositories.")
+    ap.add_argument("--shapes", nargs="+", choices=list(SHAPES), 
+        help="Repository shapes to generate (default: all)")
+    ap.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), 
+        help="Benchmarks to run (default: all)")
+    ap.add_argument("--scale", type=float, default=1.0, 
+        help="Multiplier of the number and size of generated files (default: 1.0)")
+    ap.add_argument("--repeat", type=int, default=3, 
+        help="Runs per benchmark, the fastest is reported (default: 3)")
+    ap.add_argument("--seed", type=int, default=0, help="Seed of the generator (default: 0)")
+    ap.add_argument("--output", metavar="PATH", help="Write the results to a JSON file")
+    ap.add_argument("--baseline", metavar="PATH", 
+        help="Compare against the results of an earlier run")
+    ap.add_argument("--threshold", type=float, default=0.25, 
+        help="Allowed relative growth over the baseline (default: 0.25)")
+    args = ap.parse_args()
+
+    results = run_in_tempdir(shapes=args.shapes, benchmarks=args.benchmarks,
+        scale=args.scale, repeat=args.repeat, seed=args.seed)
+    print(format_results(results))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if (baseline.get("scale"), baseline.get("seed")) != (args.scale, args.seed):
+            print("warning: the baseline was made with another --scale or --seed", 
+                file=sys.stderr)
+
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# tests/benchmarks/generator.py
+
+"""
+Code file for the synthetic repository generator of the benchmarks.
+
+Every shape is generated from a seeded random.Random, so the same shape,
+scale and seed always give the same files, names and contents.
+"""
+
+import os
+import random
+from pathlib import Path
+from typing import Callable
+
+
+# Words used for names and text contents
+_WORDS = ("alpha", "beta", "gamma", "delta", "core", "utils", "models", "views",
+    "service", "config", "parser", "cache", "index", "worker", "client", "server")
+
+# Suffixes of the text files
+_SUFFIXES = (".py", ".md", ".txt", ".json", ".js", ".toml")
+
+
+def _text(rng: random.Random, size: int) -> str:
+    """ Return about size bytes of line-based text """
+    lines: list[str] = []
+    written = 0
+    while written < size:
+        line = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12)))
+        lines.append(line)
+        written += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def _name(rng: random.Random, i: int) -> str:
+    """ Return a file name, unique by its index """
+    return f"{rng.choice(_WORDS)}_{i}{rng.choice(_SUFFIXES)}"
+
+
+def _write(path: Path, content: str | bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(content, bytes):
+        path.write_bytes(content)
+    else:
+        path.write_text(content, encoding="utf-8", newline="\n")
+
+
+def _wide(root: Path, rng: random.Random, scale: float) -> None:
+    """ Few dirs with many small files each """
+    for d in range(max(2, int(10 * scale))):
+        for i in range(max(5, int(300 * scale))):
+            _write(root / f"pkg_{d}" / _name(rng, i), _text(rng, rng.randint(50, 2000)))
+
+
+def _deep(root: Path, rng: random.Random, scale: float) -> None:
+    """ Long chains of nested dirs with a few files per level """
+    for chain in range(max(2, int(8 * scale))):
+        curr = root / f"chain_{chain}"
+        for level in range(40):
+            curr = curr / f"level_{level}"
+            for i in range(3):
+                _write(curr / _name(rng, i), _text(rng, rng.randint(50, 500)))
+
+
+def _gitignores(root: Path, rng: random.Random, scale: float) -> None:
+    """ Nested dirs that each have a .gitignore, with ignored and kept files """
+    _write(root / ".gitignore", "*.log\nbuild/\n__pycache__/\n")
+    for d in range(max(3, int(60 * scale))):
+        sub = root / f"module_{d}" / f"sub_{d % 7}"
+        _write(sub / ".gitignore", "".join(f"*.{w}\n" for w in rng.sample(_WORDS, 4))
+            + f"tmp_{d}/\n!keep_{d}.log\n")
+        for i in range(20):
+            _write(sub / _name(rng, i), _text(rng, 100))
+            _write(sub / f"{rng.choice(_WORDS)}_{i}.{rng.choice(_WORDS)}", "ignored?\n")
+        _write(sub / f"run_{d}.log", "log\n")
+        _write(sub / f"keep_{d}.log", "kept\n")
+        _write(sub / "build" / "out.o", "ignored\n")
+        _write(sub / f"tmp_{d}" / "scratch.txt", "ignored\n")
+
+
+def _big_files(root: Path, rng: random.Random, scale: float) -> None:
+    """ A few large text files """
+    for i in range(max(2, int(6 * scale))):
+        _write(root / "data" / f"dump_{i}.sql", _text(rng, int(2 * 1024 * 1024 * max(scale, 0.05))))
+
+
+def _binaries(root: Path, rng: random.Random, scale: float) -> None:
+    """ Incompressible binaries, some with the header of a known format """
+    headers = (b"", b"\x89PNG\r\n\x1a\n", b"\x7fELF", b"PK\x03\x04")
+    for i in range(max(4, int(40 * scale))):
+        size = rng.randint(1024, int(256 * 1024 * max(scale, 0.05)) + 1024)
+        data = headers[i % len(headers)] + rng.randbytes(size)
+        _write(root / "bin" / f"blob_{i}{('.bin', '.png', '', '.zip')[i % 4]}", data)
+
+
+def _symlinks(root: Path, rng: random.Random, scale: float) -> None:
+    """ A few real files and dirs, and a farm of links to them """
+    targets = []
+    for i in range(max(3, int(20 * scale))):
+        target = root / "real" / f"dir_{i}" / _name(rng, i)
+        _write(target, _text(rng, 200))
+        targets.append(target)
+
+    farm = root / "farm"
+    farm.mkdir()
+    for i in range(max(10, int(400 * scale))):
+        target = targets[i % len(targets)]
+        link = farm / f"link_{i}"
+        try:
+            if i % 5 == 0:
+                os.symlink(target.parent, link, target_is_directory=True)
+            else:
+                os.symlink(target, link)
+        except (OSError, NotImplementedError):
+            return      # No symlink support (e.g. Windows without privileges)
+
+
+# Shape name -> generator function(root, rng, scale)
+SHAPES: dict[str, Callable[[Path, random.Random, float], None]] = {
+    "wide": _wide,
+    "deep": _deep,
+    "gitignores": _gitignores,
+    "big_files": _big_files,
+    "binaries": _binaries,
+    "symlinks": _symlinks,
+}
+
+
+def generate(root: Path, shape: str, scale: float = 1.0, seed: int = 0) -> Path:
+    """
+    Generate a synthetic repository of the given shape.
+
+    Args:
+        root (Path): The dir to create it in, it must be empty or not exist
+        shape (str): One of SHAPES
+        scale (float): Multiplier of the number and size of files
+        seed (int): Seed of the generator
+
+    Returns:
+        Path: The root of the generated repository
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    SHAPES[shape](root, random.Random(f"{shape}:{seed}"), scale)
+    return root
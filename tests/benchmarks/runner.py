@@ -0,0 +1,240 @@
+# tests/benchmarks/runner.py
+
+"""
+Code file for running the benchmarks in-process and comparing their results
+against a baseline.
+
+Each benchmark is a setup function that prepares its inputs (untimed) and
+returns the function to time. Every run gets a fresh AppContext with the
+profiler enabled, so the work counters (dirs listed, stat calls, bytes read
+and written, ...) are recorded along with the wall time.
+"""
+
+import argparse
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import chdir
+from pathlib import Path
+from typing import Any, Callable
+
+from gitree.objects.app_context import AppContext
+from gitree.objects.config import Config
+from gitree.objects.gitignore import GitIgnore
+from gitree.services.drawing_service import DrawingService
+from gitree.services.export_service import ExportService
+from gitree.services.resolve_items_service import ResolveItemsService
+from gitree.services.zipping_service import ZippingService
+from gitree.utilities.gitignore_utility import GitIgnoreMatcher
+from gitree.utilities.logging_utility import Logger
+from gitree.utilities.profiling_utility import Profiler
+
+from tests.benchmarks.generator import SHAPES, generate
+
+try:
+    import resource
+except ImportError:         # Windows
+    resource = None
+
+
+# Version of the results format
+RESULTS_VERSION = 1
+
+# Wall time differences below this are noise, never regressions
+MIN_REGRESSION_MS = 1.0
+
+# Options of every run: no limits, so the whole synthetic repo is processed
+_BASE_OPTIONS = {"no_max_items": True, "no_max_entries": True, "max_depth": 1000,
+    "gitignore_depth": 1000, "exclude_depth": 1000, "no_color": True}
+
+
+def _config(ctx: AppContext, root: Path, **options: Any) -> Config:
+    """ Return a config as the CLI would build it for the root and options """
+    config = Config(ctx, argparse.Namespace(paths=[str(root)], **_BASE_OPTIONS, **options))
+    config.no_printing = bool(options.get("export") or options.get("zip"))
+    return config
+
+
+def _resolve(ctx: AppContext, root: Path, out: Path) -> Callable[[], Any]:
+    config = _config(ctx, root)
+    return lambda: ResolveItemsService.resolve_items(ctx, config)
+
+
+def _gitignore(ctx: AppContext, root: Path, out: Path) -> Callable[[], Any]:
+    config = _config(ctx, root)
+
+    # Every .gitignore of the repo in one matcher, checked against every path
+    matcher = GitIgnoreMatcher()
+    paths: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if ".gitignore" in filenames:
+            matcher.add_gitignore(GitIgnore(ctx, config, Path(dirpath) / ".gitignore"))
+        paths.extend(Path(dirpath) / name for name in sorted(dirnames + filenames))
+
+    def run() -> int:
+        return sum(matcher.excluded(p) for p in paths)
+    return run
+
+
+def _draw(fmt: str) -> Callable[[AppContext, Path, Path], Callable[[], Any]]:
+    def setup(ctx: AppContext, root: Path, out: Path) -> Callable[[], Any]:
+        config = _config(ctx, root, format=fmt)
+        tree = ResolveItemsService.resolve_items(ctx, config)
+
+        def run() -> None:
+            DrawingService.draw(ctx, config, tree)
+            ctx.output_buffer.clear()
+        return run
+    return setup
+
+
+def _export(ctx: AppContext, root: Path, out: Path) -> Callable[[], Any]:
+    config = _config(ctx, root, format="md", export=str(out / "export.md"))
+    tree = ResolveItemsService.resolve_items(ctx, config)
+    DrawingService.draw(ctx, config, tree)
+    return lambda: ExportService.run(ctx, config, tree)
+
+
+def _zip(ctx: AppContext, root: Path, out: Path) -> Callable[[], Any]:
+    config = _config(ctx, root, zip=str(out / "archive.zip"))
+    tree = ResolveItemsService.resolve_items(ctx, config)
+    return lambda: ZippingService.run(ctx, config, tree)
+
+
+# Benchmark name -> setup function(ctx, repo root, output dir) returning the timed function
+BENCHMARKS: dict[str, Callable[[AppContext, Path, Path], Callable[[], Any]]] = {
+    "resolve_items": _resolve,
+    "gitignore_excluded": _gitignore,
+    "draw_txt": _draw("txt"),
+    "draw_md": _draw("md"),
+    "draw_json": _draw("json"),
+    "export": _export,
+    "zip": _zip,
+}
+
+
+def _peak_rss_kb() -> int | None:
+    """ Return the peak RSS of the process so far in KB, None if unknown """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak     # bytes on macOS
+
+
+def run_benchmarks(workdir: Path, shapes: list[str] | None = None,
+    benchmarks: list[str] | None = None, scale: float = 1.0, repeat: int = 3,
+    seed: int = 0) -> dict[str, Any]:
+    """
+    Generate the synthetic repos and run the benchmarks on each of them.
+
+    Args:
+        workdir (Path): An empty dir for the repos and the outputs
+        shapes (list[str] | None): The shapes to generate, all by default
+        benchmarks (list[str] | None): The benchmarks to run, all by default
+        scale (float): Multiplier of the number and size of generated files
+        repeat (int): Runs per benchmark, the fastest one is reported
+        seed (int): Seed of the generator
+
+    Returns:
+        dict[str, Any]: The results, keyed "<benchmark>/<shape>" under "results".
+            peak_rss_kb is the peak of the whole process up to that benchmark,
+            since the benchmarks share it.
+    """
+    results: dict[str, Any] = {}
+
+    for shape in shapes or list(SHAPES):
+        root = generate(workdir / shape / "repo", shape, scale=scale, seed=seed)
+
+        for name in benchmarks or list(BENCHMARKS):
+            runs_ms: list[float] = []
+            counters: dict[str, int] = {}
+
+            for i in range(repeat):
+                out = workdir / shape / f"out_{name}_{i}"
+                out.mkdir()
+
+                # Relative config paths (.gitree/config.json) resolve in the output dir
+                with chdir(out):
+                    ctx = AppContext()
+                    ctx.logger.set_level(Logger.OFF)
+                    run = BENCHMARKS[name](ctx, root, out)
+
+                    # Count only the timed work, not the setup
+                    ctx.profiler = Profiler()
+                    ctx.profiler.enabled = True
+
+                    start = time.perf_counter()
+                    run()
+                    runs_ms.append((time.perf_counter() - start) * 1000)
+                    counters = ctx.profiler.report()["counters"]
+
+            results[f"{name}/{shape}"] = {
+                "wall_ms": round(min(runs_ms), 3),
+                "median_ms": round(statistics.median(runs_ms), 3),
+                "runs": repeat,
+                "peak_rss_kb": _peak_rss_kb(),
+                "counters": counters,
+            }
+
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any],
+    threshold: float) -> list[str]:
+    """
+    Compare results against a baseline. A benchmark regresses if its wall
+    time or one of its counters grew by more than the threshold.
+
+    Args:
+        results (dict[str, Any]): The results of run_benchmarks()
+        baseline (dict[str, Any]): Earlier results, made with the same scale and seed
+        threshold (float): The allowed relative growth, e.g. 0.25 for 25%
+
+    Returns:
+        list[str]: A description of each regression, empty if there is none
+    """
+    regressions: list[str] = []
+
+    for name, result in results["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+
+        wall, base_wall = result["wall_ms"], base["wall_ms"]
+        if wall > base_wall * (1 + threshold) and wall - base_wall >= MIN_REGRESSION_MS:
+            regressions.append(f"{name}: wall time {base_wall:.1f} ms -> {wall:.1f} ms")
+
+        for counter, value in result["counters"].items():
+            base_value = base.get("counters", {}).get(counter)
+            if base_value is not None and value > base_value * (1 + threshold):
+                regressions.append(f"{name}: {counter} {base_value} -> {value}")
+
+    return regressions
+
+
+def format_results(results: dict[str, Any]) -> str:
+    """ Return the results as a text table """
+    lines = [f"{'benchmark':<32} {'wall ms':>10} {'median ms':>10} {'peak RSS KB':>12}  counters"]
+    for name, result in results["results"].items():
+        counters = ", ".join(f"{k}={v}" for k, v in result["counters"].items() if v)
+        rss = result["peak_rss_kb"] if result["peak_rss_kb"] is not None else "-"
+        lines.append(f"{name:<32} {result['wall_ms']:>10.1f} {result['median_ms']:>10.1f} "
+            f"{rss:>12}  {counters}")
+    return "\n".join(lines)
+
+
+def run_in_tempdir(**kwargs: Any) -> dict[str, Any]:
+    """ Run the benchmarks in a temporary dir that is removed afterwards """
+    with tempfile.TemporaryDirectory(prefix="gitree-bench-") as tmp:
+        return run_benchmarks(Path(tmp), **kwargs)
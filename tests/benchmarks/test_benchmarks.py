@@ -0,0 +1,62 @@
+# tests/benchmarks/test_benchmarks.py
+
+"""
+Code file for TestBenchmarks class.
+
+Smoke test of the benchmark suite on tiny repos, so the generator and the
+runner keep working as the services change. It does not check timings.
+"""
+
+import os
+from pathlib import Path
+
+from tests.base_setup import BaseCLISetup
+from tests.benchmarks.generator import SHAPES, generate
+from tests.benchmarks.runner import BENCHMARKS, compare, run_benchmarks
+
+
+class TestBenchmarks(BaseCLISetup):
+
+    def _snapshot(self, root) -> dict[str, bytes]:
+        """ Return the relative path and contents (or link target) of every file """
+        files = {}
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, root)
+                files[rel] = (os.readlink(path).encode() if os.path.islink(path)
+                    else Path(path).read_bytes())
+        return files
+
+
+    def test_generator_is_deterministic(self):
+        for shape in SHAPES:
+            first = generate(self.root / "a" / shape, shape, scale=0.02)
+            second = generate(self.root / "b" / shape, shape, scale=0.02)
+
+            files = self._snapshot(first)
+            self.assertTrue(files, msg=f"shape {shape} generated no files")
+            self.assertEqual(set(files), set(self._snapshot(second)), msg=shape)
+            for rel, content in files.items():
+                if not os.path.islink(first / rel):
+                    self.assertEqual(content, (second / rel).read_bytes(), msg=rel)
+
+
+    def test_run_and_compare(self):
+        results = run_benchmarks(self.root, shapes=["gitignores"], scale=0.02, repeat=1)
+
+        self.assertEqual(set(results["results"]),
+            {f"{name}/gitignores" for name in BENCHMARKS})
+        resolve = results["results"]["resolve_items/gitignores"]
+        self.assertGreater(resolve["counters"]["dirs_listed"], 0)
+        self.assertGreater(resolve["counters"]["gitignore_rules"], 0)
+        self.assertGreater(results["results"]["zip/gitignores"]["counters"]["bytes_written"], 0)
+
+        # Results never regress against themselves, but do against a better baseline
+        self.assertEqual(compare(results, results, threshold=0.1), [])
+
+        baseline = {"results": {"resolve_items/gitignores": {
+            "wall_ms": 0.0, "counters": {"stat_calls": resolve["counters"]["stat_calls"] // 2},
+        }}}
+        regressions = compare(results, baseline, threshold=0.1)
+        self.assertTrue(any("stat_calls" in r for r in regressions), msg=regressions)
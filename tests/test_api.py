@@ -0,0 +1,89 @@
+# tests/test_api.py
+
+"""
+Code file for TestAPI class.
+
+Tests the in-process API (gitree.scan) against the CLI's behaviour.
+"""
+
+import io
+import subprocess
+import sys
+import zipfile
+
+import gitree
+from tests.base_setup import BaseCLISetup
+
+
+class TestAPI(BaseCLISetup):
+
+    def setUp(self):
+        super().setUp()
+        (self.root / "src").mkdir()
+        (self.root / "src" / "main.py").write_text("print('hi')\n", encoding="utf-8")
+        (self.root / "README.md").write_text("# readme\n", encoding="utf-8")
+        (self.root / "debug.log").write_text("ignored\n", encoding="utf-8")
+        (self.root / ".gitignore").write_text("*.log\n", encoding="utf-8")
+
+
+    def test_scan_is_lazy(self):
+        tree = gitree.scan(self.root)
+
+        # Nothing is resolved until the tree is used
+        (self.root / "src" / "late.py").write_text("", encoding="utf-8")
+
+        self.assertEqual([e.rel for e in tree.files()], ["README.md", "src/late.py", "src/main.py"])
+        self.assertEqual(tree.root, self.root)
+        self.assertEqual(len(tree), 5)      # The root, src and three files
+
+
+    def test_render_matches_cli(self):
+        result = self.run_gitree("--no-color")
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        tree = gitree.scan(self.root)
+        self.assertEqual(tree.render(), result.stdout)
+
+        out = io.BytesIO()
+        tree.render(out, format="md")
+        self.assertEqual(out.getvalue().decode("utf-8").splitlines()[0], "```text")
+
+
+    def test_export_and_archive_to_streams(self):
+        tree = gitree.scan(self.root, format="md")
+
+        out = io.StringIO()
+        tree.export(out)
+        self.assertIn("print('hi')", out.getvalue())
+        self.assertNotIn("ignored", out.getvalue())
+
+        archive = io.BytesIO()
+        tree.archive(archive)
+        with zipfile.ZipFile(archive) as zf:
+            self.assertEqual(sorted(zf.namelist()), ["README.md", "src/main.py"])
+
+
+    def test_sizes_in_bytes(self):
+        (self.root / "big.txt").write_text("x" * 4096, encoding="utf-8")
+
+        export = gitree.scan(self.root, format="md", max_file_size=1024).export()
+
+        # Contents over 1 KB are skipped, smaller ones kept
+        self.assertNotIn("x" * 4096, export)
+        self.assertIn("print('hi')", export)
+        self.assertIn("x" * 4096, gitree.scan(self.root, format="md",
+            max_file_size=8192).export())
+
+
+    def test_unknown_option(self):
+        with self.assertRaises(TypeError):
+            gitree.scan(self.root, max_dpeth=2)
+        with self.assertRaises(TypeError):
+            gitree.scan(self.root, zip="out.zip")
+
+
+    def test_import_is_lazy(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, gitree; print('gitree.api' in sys.modules)"],
+            capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), "False", msg=result.stderr)
@@ -84,6 +84,72 @@ class TestGeneralOptions(BaseCLISetup):
                 f"Expected str 'LOG' not found in output: \n\n{result.stdout}")
 
 
+    def test_verbose_deferred_messages(self):
+        """
+        Test if messages logged with %-style args are formatted in the log.
+        """
+
+        # Vars
+        args_str = "--verbose"
+
+        # Run
+        result = self.run_gitree(args_str)
+
+        # Validate
+        self.assertEqual(result.returncode, 0,
+            msg=self.failed_run_msg(args_str) + 
+            self.non_zero_exitcode_msg(result.returncode))
+        
+        for expected in ("[DEBUG] Parsed arguments: Namespace(", "[INFO] Total time for run: "):
+            self.assertIn(expected, result.stdout,
+                msg=self.failed_run_msg(args_str) + 
+                    f"Expected str '{expected}' not found in output: \n\n{result.stdout}")
+
+
+    def test_verbose_parsed_arguments(self):
+        """
+        Test if the parsed arguments are logged as given, before their correction.
+        """
+
+        # Vars
+        args_str = "--verbose --export out"
+
+        # Run
+        result = self.run_gitree(*args_str.split())
+
+        # Validate
+        self.assertEqual(result.returncode, 0,
+            msg=self.failed_run_msg(args_str) + 
+            self.non_zero_exitcode_msg(result.returncode))
+
+        parsed = next(line for line in result.stdout.splitlines() if "Parsed arguments" in line)
+        corrected = next(line for line in result.stdout.splitlines() if "Corrected arguments" in line)
+        self.assertIn("export='out'", parsed)
+        self.assertIn("export='out.txt'", corrected)
+
+
+    def test_profile(self):
+        """
+        Test if --profile cpu writes its stats file and both modes log a
+        summary with --verbose.
+        """
+
+        for args_str, expected in (("--profile cpu --verbose", "CPU profile written"),
+                ("--profile memory --verbose", "Peak traced memory")):
+            result = self.run_gitree(*args_str.split())
+
+            self.assertEqual(result.returncode, 0,
+                msg=self.failed_run_msg(args_str) + 
+                self.non_zero_exitcode_msg(result.returncode))
+            
+            self.assertIn(expected, result.stdout,
+                msg=self.failed_run_msg(args_str) + 
+                    f"Expected str '{expected}' not found in output: \n\n{result.stdout}")
+
+        self.assertTrue((self.root / "gitree.prof").is_file(),
+            msg="gitree.prof was not written by --profile cpu")
+
+
     def test_init_config(self):
         """
         Test if the user config is being created properly.
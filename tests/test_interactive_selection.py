@@ -0,0 +1,154 @@
+# tests/test_interactive_selection.py
+
+"""
+Code file for TestInteractiveSelection class.
+
+Tests the listing and collecting of the interactive selector without a
+terminal, through InteractiveSelectionService's helpers.
+"""
+
+import argparse
+
+from gitree.objects.app_context import AppContext
+from gitree.objects.config import Config
+from gitree.objects.search_index import SearchIndex
+from gitree.objects.selection_tree import SelectionTree
+from gitree.objects.tree_manifest import TreeManifest
+from gitree.services.interactive_selection_service import InteractiveSelectionService
+from gitree.services.resolve_items_service import ResolveItemsService
+from gitree.utilities.gitignore_utility import GitIgnoreMatcher
+from tests.base_setup import BaseCLISetup
+
+
+class TestInteractiveSelection(BaseCLISetup):
+
+    def setUp(self):
+        super().setUp()
+        for name in ("a", "b"):
+            (self.root / name).mkdir()
+            for i in range(3):
+                (self.root / name / f"{name}{i}.txt").write_text(name, encoding="utf-8")
+
+
+    def make_selection(self, **options):
+        """ Build the selector's state for self.root and list its top level """
+        self.ctx = AppContext()
+        self.config = Config(self.ctx, argparse.Namespace(paths=[str(self.root)], **options))
+        self.scope = ResolveItemsService.resolve_scope(self.ctx, self.config)
+
+        root = InteractiveSelectionService._make_row(self.scope["root"], "(root)", "dir", 0,
+            GitIgnoreMatcher())
+        self.selection = SelectionTree(root)
+        self.search_index = SearchIndex()
+        self.root_row = root
+        return self.list(root)
+
+
+    def list(self, row):
+        """ List a dir row the way expanding it does, return its rows by path """
+        InteractiveSelectionService._apply_children(self.selection, self.search_index, row,
+            *InteractiveSelectionService._list_rows(self.ctx, self.config, self.scope, row))
+        return {child["path"]: child for child in row["children"]}
+
+
+    def collect(self):
+        """ Return the relative paths the selection resolves to """
+        manifest = TreeManifest(self.scope["root"])
+        InteractiveSelectionService._collect(self.ctx, self.config, self.scope,
+            self.selection, manifest, {})
+        return [entry.rel for entry in manifest.entries[1:]]      # Without the root
+
+
+    def test_tri_state(self):
+        rows = self.make_selection()
+        a = self.list(rows["a"])
+        selection = self.selection
+
+        selection.set(a["a/a0.txt"], True)
+        self.assertIsNone(selection.state(rows["a"]))
+        self.assertIsNone(selection.state(self.root_row))
+        self.assertFalse(selection.state(rows["b"]))
+
+        # Checking the rest of a dir checks the dir itself
+        selection.set_many([a["a/a1.txt"], a["a/a2.txt"]], True)
+        self.assertTrue(selection.state(rows["a"]))
+        self.assertIsNone(selection.state(self.root_row))
+
+        selection.set(rows["b"], True)
+        self.assertTrue(selection.state(self.root_row))
+
+        # Unchecking a dir unchecks its rows, and its parent is partly checked
+        selection.set(rows["a"], False)
+        self.assertFalse(selection.state(a["a/a1.txt"]))
+        self.assertIsNone(selection.state(self.root_row))
+
+        selection.set(self.root_row, False)
+        self.assertFalse(selection.state(self.root_row))
+        self.assertFalse(selection.state(rows["b"]))
+
+
+    def test_toggle_inside_checked_dir(self):
+        rows = self.make_selection()
+        a = self.list(rows["a"])
+
+        # A file toggled on its own under a dir checked as a whole
+        self.selection.set(self.root_row, True)
+        self.selection.set(a["a/a1.txt"], False)
+
+        self.assertTrue(self.selection.state(a["a/a0.txt"]))
+        self.assertFalse(self.selection.state(a["a/a1.txt"]))
+        self.assertIsNone(self.selection.state(rows["a"]))
+        self.assertTrue(self.selection.state(rows["b"]))
+        self.assertEqual(self.collect(),
+            ["a", "a/a0.txt", "a/a2.txt", "b", "b/b0.txt", "b/b1.txt", "b/b2.txt"])
+
+
+    def test_select_after_expanding(self):
+        rows = self.make_selection()
+        self.selection.set(rows["a"], True)
+
+        # Rows listed after their dir was checked inherit its state
+        a = self.list(rows["a"])
+        self.assertTrue(all(self.selection.state(row) for row in a.values()))
+
+        self.selection.set(a["a/a2.txt"], False)
+        self.assertIsNone(self.selection.state(rows["a"]))
+        self.assertEqual(self.collect(), ["a", "a/a0.txt", "a/a1.txt"])
+
+
+    def test_select_collapsed_dir(self):
+        rows = self.make_selection()
+        (self.root / "b" / "sub").mkdir()
+        (self.root / "b" / "sub" / "deep.txt").write_text("deep", encoding="utf-8")
+
+        # b was never listed, its contents are listed when collected
+        self.selection.set(rows["b"], True)
+        self.assertIsNone(rows["b"]["children"])
+        self.assertIsNone(self.selection.state(self.root_row))
+        self.assertEqual(self.collect(),
+            ["b", "b/b0.txt", "b/b1.txt", "b/b2.txt", "b/sub", "b/sub/deep.txt"])
+
+
+    def test_max_entries_per_listing(self):
+        paths = {}
+        for order in (("a", "b"), ("b", "a")):
+            rows = self.make_selection(max_entries=3)
+            paths[order] = {name: list(self.list(rows[name])) for name in order}
+
+        # What a dir shows does not depend on the order dirs are expanded in
+        self.assertEqual(paths[("a", "b")], paths[("b", "a")])
+        self.assertEqual(paths[("a", "b")]["b"], ["b/b0.txt", "b/b1.txt"])
+
+
+    def test_search_index_grows(self):
+        rows = self.make_selection()
+        self.assertEqual(self.search_index.search("a1"), [])
+
+        # Rows listed after a search are found by the next one
+        self.list(rows["a"])
+        ids = self.search_index.search("a1")
+        self.assertEqual([self.search_index.rows[i]["path"] for i in ids], ["a/a1.txt"])
+
+        self.list(rows["b"])
+        ids = self.search_index.search(".txt")
+        self.assertEqual(len(ids), 6)
@@ -0,0 +1,113 @@
+# tests/test_interactive_ui.py
+
+"""
+Code file for TestInteractiveUI class.
+
+Drives the interactive selector headless, with prompt_toolkit's pipe input
+and dummy output, and checks the paths it returns.
+"""
+
+import argparse
+import threading
+import time
+
+from prompt_toolkit.application import create_app_session
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+from gitree.objects.app_context import AppContext
+from gitree.objects.config import Config
+from gitree.services.interactive_selection_service import InteractiveSelectionService
+from gitree.utilities.tree_control_utility import TreeListControl
+from tests.base_setup import BaseCLISetup
+
+
+UP, DOWN, RIGHT, LEFT = "\x1b[A", "\x1b[B", "\x1b[C", "\x1b[D"
+SPACE, ENTER, CTRL_A = " ", "\r", "\x01"
+
+
+class TestInteractiveUI(BaseCLISetup):
+
+    def setUp(self):
+        super().setUp()
+        # Rows, files first: f1, a/ (fa, x/ (fx)), b/ (fb), c/ (fc)
+        for path in ("f1", "a/fa", "a/x/fx", "b/fb", "b/skip.log", "c/fc"):
+            (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / path).write_text(path, encoding="utf-8")
+        (self.root / "b" / ".gitignore").write_text("*.log\n", encoding="utf-8")
+
+
+    def select(self, *keys: str) -> list[str]:
+        """
+        Run the selector on self.root, typing the keys one at a time so dirs
+        are listed in between, and return the selected relative paths.
+        """
+        ctx = AppContext()
+        config = Config(ctx, argparse.Namespace(paths=[str(self.root)]))
+
+        with create_pipe_input() as pipe:
+            def type_keys():
+                for key in keys:
+                    time.sleep(0.05)
+                    pipe.send_text(key)
+
+            threading.Thread(target=type_keys, daemon=True).start()
+            with create_app_session(input=pipe, output=DummyOutput()):
+                resolved = InteractiveSelectionService.run(ctx, config)
+
+        return [entry.rel for entry in resolved["manifest"].entries[1:]]     # Without the root
+
+
+    def test_expand_and_toggle(self):
+        selected = self.select(DOWN, DOWN, RIGHT, DOWN, SPACE,      # a/fa
+            DOWN, RIGHT, DOWN, SPACE, ENTER)                        # a/x/fx
+
+        self.assertEqual(selected, ["a", "a/fa", "a/x", "a/x/fx"])
+
+
+    def test_toggle_collapsed_dir(self):
+        selected = self.select(DOWN, DOWN, DOWN, SPACE, ENTER)      # b, never expanded
+
+        self.assertEqual(selected, ["b", "b/fb"])
+
+
+    def test_collapse(self):
+        # Collapsing a hides its rows again, so the cursor then moves onto b
+        selected = self.select(DOWN, DOWN, RIGHT, LEFT, DOWN, SPACE, ENTER)
+
+        self.assertEqual(selected, ["b", "b/fb"])
+
+
+    def test_uncheck_in_checked_dir(self):
+        # Check the root, then uncheck a/fa and c
+        selected = self.select(SPACE, DOWN, DOWN, RIGHT, DOWN, SPACE,
+            DOWN, DOWN, DOWN, DOWN, SPACE, ENTER)
+
+        self.assertEqual(selected, ["f1", "a", "a/x", "a/x/fx", "b", "b/fb"])
+
+
+    def test_search_unexpanded_dir(self):
+        # a/x was never expanded; going to the match expands the dirs above it,
+        # so f1 is four rows up
+        selected = self.select("/", "f", "x", ENTER, SPACE, UP, UP, UP, UP, SPACE, ENTER)
+
+        self.assertEqual(selected, ["f1", "a", "a/x", "a/x/fx"])
+
+
+    def test_search_toggle_all(self):
+        selected = self.select("/", "f", "b", CTRL_A, ENTER, ENTER)
+
+        self.assertEqual(selected, ["b", "b/fb"])
+
+
+    def test_rows_formatted_on_demand(self):
+        rows = [{"type": "file", "path": f"f{i}", "depth": 1} for i in range(1000)]
+        control = TreeListControl(rows, get_cursor=lambda: 0, get_state=lambda row: False)
+
+        content = control.create_content(width=80, height=10)
+        self.assertEqual(content.line_count, 1000)
+        self.assertEqual(control._cache, {})
+
+        # Only the rows the window asks for are formatted
+        content.get_line(500)
+        self.assertEqual(list(control._cache), [500])
@@ -1,6 +1,8 @@
 # tests/test_io_flags.py
-import zipfile
+import gzip, io, json, os, struct, tarfile, unittest, zipfile
+from pathlib import Path
 
+from gitree.utilities.functions_utility import zstd_available
 from tests.base_setup import BaseCLISetup
 
 
@@ -24,6 +26,146 @@ class TestIOFlags(BaseCLISetup):
             self.assertIn("file.txt", names)
 
 
+    def test_zip_parallel(self):
+        (self.root / "sub").mkdir()
+        contents = {f"sub/file{i}.txt": f"contents {i}\n" * (i * 1000) for i in range(6)}
+        for name, text in contents.items():
+            (self.root / name).write_text(text, encoding="utf-8")
+        zip_path = self.root / "parallel.zip"
+
+        result = self.run_gitree("--zip", zip_path.name, "--jobs", "3")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        with zipfile.ZipFile(zip_path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), sorted(contents))
+            for name, text in contents.items():
+                self.assertEqual(zf.read(name).decode("utf-8"), text)
+
+
+    def test_zip_store_compressed(self):
+        (self.root / "notes.txt").write_text("text " * 1000, encoding="utf-8")
+        (self.root / "image.png").write_bytes(b"\x89PNG" + b"\0" * 1000)
+        (self.root / "blob.bin").write_bytes(os.urandom(100 * 1024))
+        (self.root / "archive").write_bytes(b"PK\x03\x04" + b"\0" * 1000)
+
+        result = self.run_gitree("--zip", "out.zip")
+        stored = self.run_gitree("--zip", "stored.zip", "--zip-level", "0")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertEqual(stored.returncode, 0, msg=stored.stderr)
+        with zipfile.ZipFile(self.root / "out.zip") as zf:
+            self.assertIsNone(zf.testzip())
+            methods = {info.filename: info.compress_type for info in zf.infolist()}
+        self.assertEqual(methods, {
+            "notes.txt": zipfile.ZIP_DEFLATED,
+            "image.png": zipfile.ZIP_STORED,
+            "blob.bin": zipfile.ZIP_STORED,
+            "archive": zipfile.ZIP_STORED,
+        })
+        with zipfile.ZipFile(self.root / "stored.zip") as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.getinfo("notes.txt").compress_type, zipfile.ZIP_STORED)
+
+
+    def test_zip_incremental(self):
+        for name in ("same.txt", "edited.txt"):
+            (self.root / name).write_text(f"{name} before", encoding="utf-8")
+            os.utime(self.root / name, (1_000_000_000, 1_000_000_000))
+
+        first = self.run_gitree("--zip", "out.zip", "--zip-incremental")
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+
+        (self.root / "edited.txt").write_text("edited.txt after", encoding="utf-8")
+        (self.root / "added.txt").write_text("added.txt new", encoding="utf-8")
+
+        second = self.run_gitree("--zip", "out.zip", "--zip-incremental", "--verbose")
+
+        self.assertEqual(second.returncode, 0, msg=second.stderr)
+        self.assertIn("1 reused from the previous archive", second.stdout)
+        self.assertFalse((self.root / "out.zip.tmp").exists())
+        with zipfile.ZipFile(self.root / "out.zip") as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(sorted(zf.namelist()), ["added.txt", "edited.txt", "same.txt"])
+            self.assertEqual(zf.read("same.txt"), b"same.txt before")
+            self.assertEqual(zf.read("edited.txt"), b"edited.txt after")
+
+
+    def test_zip_incremental_damaged(self):
+        (self.root / "same.txt").write_text("same.txt before", encoding="utf-8")
+        (self.root / "other.txt").write_text("other.txt before", encoding="utf-8")
+
+        first = self.run_gitree("--zip", "out.zip", "--zip-incremental")
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+
+        # Damage the local header of one entry, its central directory record stays
+        zip_path = self.root / "out.zip"
+        with zipfile.ZipFile(zip_path) as zf:
+            offset = zf.getinfo("same.txt").header_offset
+        data = bytearray(zip_path.read_bytes())
+        data[offset:offset + 4] = b"\0" * 4
+        zip_path.write_bytes(bytes(data))
+
+        second = self.run_gitree("--zip", "out.zip", "--zip-incremental", "--verbose")
+
+        self.assertEqual(second.returncode, 0, msg=second.stderr)
+        self.assertIn("1 reused from the previous archive", second.stdout)
+        with zipfile.ZipFile(zip_path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.read("same.txt"), b"same.txt before")
+            self.assertEqual(zf.read("other.txt"), b"other.txt before")
+
+
+    def test_zip_stdout(self):
+        (self.root / "file.txt").write_text("streamed " * 100, encoding="utf-8")
+        (self.root / "image.png").write_bytes(b"\x89PNG" + b"\0" * 100)
+
+        for jobs in ("1", "2"):
+            result = self.run_gitree("--zip", "-", "--jobs", jobs, "--verbose", binary=True)
+
+            self.assertEqual(result.returncode, 0, msg=result.stderr)
+            self.assertIn(b"LOG:", result.stderr)
+            self.assertFalse((self.root / "-.zip").exists())
+            with zipfile.ZipFile(io.BytesIO(result.stdout)) as zf:
+                self.assertIsNone(zf.testzip())
+                self.assertEqual(zf.read("file.txt"), b"streamed " * 100)
+                self.assertEqual(sorted(zf.namelist()), ["file.txt", "image.png"])
+
+
+    def test_zip_stdout_stored(self):
+        (self.root / "blob.bin").write_bytes(os.urandom(100 * 1024))
+        (self.root / "notes.txt").write_text("text " * 1000, encoding="utf-8")
+
+        result = self.run_gitree("--zip", "-", binary=True)
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        with zipfile.ZipFile(io.BytesIO(result.stdout)) as zf:
+            self.assertIsNone(zf.testzip())
+            info = zf.getinfo("blob.bin")
+            self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.read("blob.bin"), (self.root / "blob.bin").read_bytes())
+
+        # Streaming readers only see the local header, which must give the size
+        flags, compress_size = struct.unpack_from("<H10xI", result.stdout, info.header_offset + 6)
+        self.assertFalse(flags & 0x08)
+        self.assertEqual(compress_size, 100 * 1024)
+
+
+    def test_tar_formats(self):
+        (self.root / "file.txt").write_text("tarred", encoding="utf-8")
+
+        streamed = self.run_gitree("--zip", "-", "--archive-format", "tar.gz", binary=True)
+        written = self.run_gitree("--zip", "out", "--archive-format", "tar.xz")
+
+        self.assertEqual(streamed.returncode, 0, msg=streamed.stderr)
+        self.assertEqual(written.returncode, 0, msg=written.stderr)
+        with tarfile.open(fileobj=io.BytesIO(streamed.stdout), mode="r:gz") as tar:
+            self.assertEqual(tar.getnames(), ["file.txt"])
+            self.assertEqual(tar.extractfile("file.txt").read(), b"tarred")
+        with tarfile.open(self.root / "out.tar.xz", mode="r:xz") as tar:
+            self.assertEqual(tar.getnames(), ["file.txt"])
+
+
     def test_export(self):
         out_path = self.root / "tree_export.txt"
 
@@ -34,4 +176,338 @@ class TestIOFlags(BaseCLISetup):
 
         content = out_path.read_text()
         self.assertIn("CONTENTS", content)
-        
\ No newline at end of file
+        
+
+    def test_export_stdout_limit(self):
+        (self.root / "file.txt").write_text("x" * 1000, encoding="utf-8")
+
+        full = self.run_gitree("--export", "-")
+        cut = self.run_gitree("--export", "-", "--export-max-size", "200", "--verbose")
+
+        self.assertEqual(full.returncode, 0, msg=full.stderr)
+        self.assertEqual(cut.returncode, 0, msg=cut.stderr)
+        self.assertIn("x" * 1000, full.stdout)
+        self.assertTrue(full.stdout.startswith(cut.stdout))
+        self.assertLessEqual(len(cut.stdout.encode("utf-8")), 200)
+        self.assertGreater(len(cut.stdout.encode("utf-8")), 190)
+        self.assertIn("cut off at 200 bytes", cut.stderr)
+
+
+    def test_export_max_file_size(self):
+        (self.root / "big.txt").write_text("x" * 4096, encoding="utf-8")
+        (self.root / "small.txt").write_text("y" * 512, encoding="utf-8")
+
+        result = self.run_gitree("--export", "-", "--max-file-size", "1KB")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertNotIn("x" * 4096, result.stdout)
+        self.assertIn("[file too large:", result.stdout)
+        self.assertIn("y" * 512, result.stdout)
+
+
+    def test_export_and_copy(self):
+        (self.root / "file.txt").write_text("both sinks", encoding="utf-8")
+        out_path = self.root / "both.txt"
+
+        # The clipboard may be unavailable here, the file must be written either way
+        result = self.run_gitree("--export", out_path.name, "--copy")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertIn("both sinks", out_path.read_text(encoding="utf-8"))
+
+
+    def test_export_dedup(self):
+        (self.root / "a.txt").write_text("same contents", encoding="utf-8")
+        (self.root / "b.txt").write_text("same contents", encoding="utf-8")
+        out_path = self.root / "dedup.json"
+
+        result = self.run_gitree("--export", out_path.name, "--format", "json", "--export-dedup")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        files = json.loads(out_path.read_text(encoding="utf-8"))["files"]
+        by_name = {Path(f["path"]).name: f for f in files}
+        self.assertEqual(by_name["a.txt"]["content"], "same contents")
+        self.assertNotIn("content", by_name["b.txt"])
+        self.assertEqual(Path(by_name["b.txt"]["content_ref"]).name, "a.txt")
+
+
+    def test_export_cache(self):
+        file_path = self.root / "file.txt"
+        file_path.write_text("cached contents", encoding="utf-8")
+        old_ns = 10 ** 18      # long before now, outside the cache's racy window
+        os.utime(file_path, ns=(old_ns, old_ns))
+        inode = file_path.stat().st_ino
+        out_path = self.root / "cached.txt"
+
+        first = self.run_gitree("--export", out_path.name, "--export-cache")
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+        self.assertIn("cached contents", out_path.read_text(encoding="utf-8"))
+        self.assertTrue((self.root / ".gitree" / "content_cache.json").exists())
+
+        # Same size, mtime and inode: the cached contents are served
+        file_path.write_text("changed content", encoding="utf-8")
+        os.utime(file_path, ns=(old_ns, old_ns))
+        self.assertEqual(file_path.stat().st_ino, inode)
+
+        hit = self.run_gitree("--export", out_path.name, "--export-cache")
+        self.assertEqual(hit.returncode, 0, msg=hit.stderr)
+        content = out_path.read_text(encoding="utf-8")
+        self.assertIn("cached contents", content)
+        self.assertNotIn("changed content", content)
+
+        # Another mtime, still outside the racy window: the file is read again
+        os.utime(file_path, ns=(old_ns + 10 ** 10, old_ns + 10 ** 10))
+
+        miss = self.run_gitree("--export", out_path.name, "--export-cache")
+        self.assertEqual(miss.returncode, 0, msg=miss.stderr)
+        content = out_path.read_text(encoding="utf-8")
+        self.assertIn("changed content", content)
+        self.assertNotIn("cached contents", content)
+
+
+    def test_export_changed_since(self):
+        (self.root / "same.txt").write_text("unchanged", encoding="utf-8")
+        (self.root / "edited.txt").write_text("before", encoding="utf-8")
+        (self.root / "removed.txt").write_text("gone soon", encoding="utf-8")
+        manifest = ".gitree/manifest.json"
+
+        first = self.run_gitree("--export", "first.json", "--format", "json",
+            "--changed-since", manifest)
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+        self.assertTrue((self.root / manifest).exists())
+
+        (self.root / "first.json").unlink()
+        (self.root / "edited.txt").write_text("after!", encoding="utf-8")
+        (self.root / "removed.txt").unlink()
+
+        second = self.run_gitree("--export", "second.json", "--format", "json",
+            "--changed-since", manifest)
+        self.assertEqual(second.returncode, 0, msg=second.stderr)
+
+        payload = json.loads((self.root / "second.json").read_text(encoding="utf-8"))
+        files = {Path(f["path"]).name: f for f in payload["files"]}
+        self.assertEqual(list(files), ["edited.txt"])
+        self.assertEqual(files["edited.txt"]["status"], "modified")
+        self.assertEqual(files["edited.txt"]["content"], "after!")
+        self.assertEqual(payload["deleted"], ["removed.txt"])
+
+
+    def test_export_changed_since_cut_off(self):
+        (self.root / "file.txt").write_text("x" * 4096, encoding="utf-8")
+        manifest = ".gitree/manifest.json"
+
+        # The export is cut off, so the file was not exported and stays changed
+        result = self.run_gitree("--export", "cut.txt", "--export-max-size", "1KB",
+            "--changed-since", manifest)
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertFalse((self.root / manifest).exists())
+
+        result = self.run_gitree("--export", "full.txt", "--changed-since", manifest)
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertIn("x" * 4096, (self.root / "full.txt").read_text(encoding="utf-8"))
+        self.assertTrue((self.root / manifest).exists())
+
+
+    def test_export_changed_since_no_hash(self):
+        (self.root / "file.txt").write_text("contents", encoding="utf-8")
+        manifest = self.root / ".gitree" / "manifest.json"
+        manifest.parent.mkdir()
+        manifest.write_text(json.dumps({"files": {"file.txt": {"size": 1, "mtime_ns": 0}}}),
+            encoding="utf-8")
+
+        result = self.run_gitree("--export", "out.json", "--format", "json",
+            "--changed-since", str(manifest))
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        payload = json.loads((self.root / "out.json").read_text(encoding="utf-8"))
+        self.assertEqual([f["status"] for f in payload["files"]], ["modified"])
+
+
+    def test_export_compressed(self):
+        (self.root / "file.txt").write_text("compress me", encoding="utf-8")
+        out_path = self.root / "tree_export.txt.gz"
+
+        result = self.run_gitree("--export", out_path.name, "--compress-level", "1")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        with gzip.open(out_path, "rt", encoding="utf-8") as f:
+            content = f.read()
+        self.assertIn("CONTENTS", content)
+        self.assertIn("compress me", content)
+
+
+    def test_export_compress_level_range(self):
+        (self.root / "file.txt").write_text("compress me", encoding="utf-8")
+
+        for name, level in (("out.txt.gz", "20"), ("out.txt.bz2", "0"), ("out.txt.xz", "12")):
+            result = self.run_gitree("--export", name, "--compress-level", level)
+
+            self.assertEqual(result.returncode, 2, msg=name)
+            self.assertIn("--compress-level must be", result.stderr)
+            self.assertFalse((self.root / name).exists())
+
+
+    @unittest.skipIf(zstd_available(), "a zstd module is installed")
+    def test_export_zst_unavailable(self):
+        (self.root / "file.txt").write_text("compress me", encoding="utf-8")
+
+        result = self.run_gitree("--export", "out.txt.zst")
+
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("requires Python 3.14+ or the 'zstandard' package", result.stderr)
+        self.assertFalse((self.root / "out.txt.zst").exists())
+
+
+    def test_export_shards(self):
+        for i in range(5):
+            (self.root / f"file{i}.txt").write_text(f"contents {i}", encoding="utf-8")
+
+        result = self.run_gitree("--export", "out.md", "--format", "md",
+            "--export-shard-files", "2", "--jobs", "2")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        for i in range(3):
+            self.assertTrue((self.root / f"out.{i:03d}.md").exists(), f"Shard {i} was not created")
+        self.assertFalse((self.root / "out.003.md").exists())
+
+        index = json.loads((self.root / "out.index.json").read_text(encoding="utf-8"))
+        shard_of = {Path(p).name: shard for p, shard in index["files"].items()}
+        self.assertEqual(shard_of["file4.txt"], "out.002.md")
+        self.assertIn("contents 4", (self.root / "out.002.md").read_text(encoding="utf-8"))
+
+
+    def test_export_shards_max_size(self):
+        for i in range(4):
+            (self.root / f"file{i}.txt").write_text("x" * 1000, encoding="utf-8")
+
+        result = self.run_gitree("--export", "out.md", "--format", "md",
+            "--export-shard-files", "2", "--export-max-size", "300")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        for i in range(2):
+            shard = (self.root / f"out.{i:03d}.md").read_bytes()
+            self.assertLessEqual(len(shard), 300)
+            self.assertGreater(len(shard), 290)
+
+
+    def test_export_shards_stdout(self):
+        (self.root / "file.txt").write_text("contents", encoding="utf-8")
+
+        result = self.run_gitree("--export", "-", "--export-shard-files", "2")
+
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("cannot be written to stdout", result.stderr)
+        self.assertEqual(list(self.root.glob("-*")), [])
+
+
+    def test_export_ndjson(self):
+        (self.root / "file.txt").write_text("line one\nline two", encoding="utf-8")
+        out_path = self.root / "tree_export.ndjson"
+
+        result = self.run_gitree("--export", out_path.name, "--format", "json")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        records = [json.loads(line) for line in
+            out_path.read_text(encoding="utf-8").splitlines()]
+        self.assertIn("structure", records[0])
+        self.assertEqual(Path(records[1]["path"]).name, "file.txt")
+        self.assertEqual(records[1]["content"], "line one\nline two")
+
+
+    def test_export_ndjson_shards(self):
+        for i in range(3):
+            (self.root / f"file{i}.txt").write_text(f"line one\nline {i}", encoding="utf-8")
+
+        result = self.run_gitree("--export", "out.ndjson", "--format", "json",
+            "--export-shard-files", "2")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        # One record per line in every shard: its header, then its files
+        for i, names in enumerate((["file0.txt", "file1.txt"], ["file2.txt"])):
+            lines = (self.root / f"out.{i:03d}.ndjson").read_text(encoding="utf-8").splitlines()
+            records = [json.loads(line) for line in lines]
+            self.assertEqual(records[0]["shard"], i)
+            self.assertEqual("structure" in records[0], i == 0)
+            self.assertEqual([Path(r["path"]).name for r in records[1:]], names)
+
+
+    def test_export_encodings(self):
+        (self.root / "utf16.txt").write_bytes("héllo".encode("utf-16"))
+        (self.root / "latin1.txt").write_bytes("café".encode("latin-1"))
+        out_path = self.root / "encodings.json"
+
+        result = self.run_gitree("--export", out_path.name, "--format", "json")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        files = json.loads(out_path.read_text(encoding="utf-8"))["files"]
+        by_name = {Path(f["path"]).name: f for f in files}
+        self.assertEqual(by_name["utf16.txt"]["content"], "héllo")
+        self.assertTrue(by_name["utf16.txt"]["encoding"].startswith("utf-16"))
+        self.assertEqual(by_name["latin1.txt"]["content"], "café")
+        self.assertEqual(by_name["latin1.txt"]["encoding"], "latin-1")
+
+
+    def test_export_large_file(self):
+        line = "INSERT INTO t VALUES ('é');\n"
+        (self.root / "dump.sql").write_text(line * 60000, encoding="utf-8")     # > 1 MB
+        out_path = self.root / "large.md"
+
+        result = self.run_gitree("--export", out_path.name, "--format", "md")
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        content = out_path.read_text(encoding="utf-8")
+        self.assertIn((line * 60000).rstrip("\n") + "\n```", content)
+
+
+    def test_export_large_file_invalid_utf8(self):
+        # Looks like UTF-8 in its prefix, but is not past it
+        (self.root / "data.txt").write_bytes(b"a" * (2 * 1024 * 1024) + b"\xff\xfe")
+        out_path = self.root / "out.txt"
+
+        result = self.run_gitree("--export", out_path.name)
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        # Decoded like a small file would be, so the export stays valid UTF-8
+        content = out_path.read_bytes().decode("utf-8")
+        self.assertIn("a" * 1024 + "\u00ff\u00fe", content)
+
+
+    def test_export_large_file_invalid_utf8_bom(self):
+        data = b"\xef\xbb\xbf" + b"a" * (2 * 1024 * 1024) + b"\xff\xfe"
+        (self.root / "data.txt").write_bytes(data)
+        out_path = self.root / "out.txt"
+
+        result = self.run_gitree("--export", out_path.name)
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        # The invalid bytes past the sniffing window are replaced, not copied
+        content = out_path.read_bytes().decode("utf-8")
+        self.assertIn("a" * 1024 + "\ufffd\ufffd", content)
+
+
+    def test_profile_json(self):
+        (self.root / "sub").mkdir()
+        (self.root / "sub" / "file.txt").write_text("hello", encoding="utf-8")
+        (self.root / ".gitignore").write_text("*.log\n", encoding="utf-8")
+        out_path = self.root / "out.md"
+        profile_path = self.root / "profile.json"
+
+        result = self.run_gitree("--export", out_path.name,
+            "--profile-json", profile_path.name)
+
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        profile = json.loads(profile_path.read_text(encoding="utf-8"))
+        for phase in ("config_load", "traversal", "drawing", "content_read", "export", "flush"):
+            self.assertIn(phase, profile["phases"])
+        counters = profile["counters"]
+        self.assertGreater(counters["dirs_listed"], 0)
+        self.assertGreater(counters["gitignore_rules"], 0)
+        self.assertEqual(counters["bytes_written"], out_path.stat().st_size)
@@ -0,0 +1,72 @@
+# tests/test_startup.py
+
+"""
+Code file for TestStartup class.
+
+Guards the startup cost of plain listings: heavy dependencies of the other
+modes must not be imported, and importing gitree.main must stay within a
+time budget. The budget is about three times the import time measured
+(~50 ms), so regressions show while slower machines still pass; set
+GITREE_IMPORT_BUDGET_MS to tighten or relax it.
+"""
+
+import os
+import subprocess
+import sys
+
+from tests.base_setup import BaseCLISetup
+
+
+class TestStartup(BaseCLISetup):
+
+    # Modules only needed by --zip, --export/--copy and --interactive
+    HEAVY_MODULES = ("prompt_toolkit", "pyperclip", "zipfile", "tarfile",
+        "gitree.services.export_service", "gitree.services.zipping_service",
+        "gitree.services.interactive_selection_service")
+
+    DEFAULT_BUDGET_MS = 150
+
+
+    def _importtime(self, *args: str) -> dict[str, int]:
+        """
+        Run python -X importtime with the given args and return the cumulative
+        import time in microseconds of every module imported.
+        """
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=self.root,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+        )
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        times: dict[str, int] = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+        return times
+
+
+    def test_listing_skips_heavy_imports(self):
+        (self.root / "file.txt").write_text("hello", encoding="utf-8")
+
+        imported = self._importtime("-m", "gitree.main")
+
+        for module in self.HEAVY_MODULES:
+            self.assertNotIn(module, imported, msg=f"{module} imported for a plain listing")
+
+
+    def test_import_budget(self):
+        budget_ms = int(os.environ.get("GITREE_IMPORT_BUDGET_MS", self.DEFAULT_BUDGET_MS))
+
+        # Warm up the bytecode cache so only the import itself is measured
+        self._importtime("-c", "import gitree.main")
+        imported = self._importtime("-c", "import gitree.main")
+
+        self.assertIn("gitree.main", imported)
+        self.assertLessEqual(imported["gitree.main"] / 1000, budget_ms,
+            msg=f"importing gitree.main took {imported['gitree.main'] / 1000:.0f} ms")